@@ -0,0 +1,4 @@
+from .datasets import Sequence, find_sequences, load_groundtruth
+from .adapters import ADAPTERS, TrackerAdapter
+from .metrics import SequenceResult, iou, center_error, success_curve, precision_curve
+from .runner import run_sequence
@@ -0,0 +1,95 @@
+class TrackerAdapter:
+    # Same interface for every tracker of src/trackers, as main.py drives them:
+    #   init(frame, box) with box = (x1, y1, x2, y2), update(frame) -> (x1, y1, x2, y2) or None when lost.
+    # The defaults follow the common tracker protocol: the box is set on tracker.x1..y2 before
+    # tracker.init(frame), and after tracker.update(frame) the result is tracker.tl/br when has_result.
+    # Trackers are imported in the adapters so that only the benchmarked ones need their dependencies.
+    name = None
+
+    def init(self, frame, box):
+        (self.tracker.x1, self.tracker.y1, self.tracker.x2, self.tracker.y2) = (int(value) for value in box)
+        self.tracker.init(frame)
+
+    def update(self, frame):
+        self.tracker.update(frame)
+        if not self.tracker.has_result:
+            return None
+        (tl, br) = (self.tracker.tl, self.tracker.br)
+        return (int(tl[0]), int(tl[1]), int(br[0]), int(br[1]))
+
+class KCFAdapter(TrackerAdapter):
+    name = 'kcf'
+    LOST_PEAK = 0.25 # as main.py
+
+    def __init__(self, hog = True, fixed_window = False, multiscale = True):
+        from trackers.kcf_tracker import KCFTracker
+        self.tracker = KCFTracker(hog, fixed_window, multiscale)
+
+    def update(self, frame):
+        if not self.tracker.enable:
+            return None
+        (roi, _) = self.tracker.update(frame)
+        if self.tracker.peak_value < self.LOST_PEAK:
+            self.tracker.enable = False
+            return None
+        (x, y, w, h) = roi
+        return (int(x), int(y), int(x + w), int(y + h))
+
+class ColorAdapter(TrackerAdapter):
+    name = 'color'
+
+    def __init__(self, colors = ('red',)):
+        from trackers.color_tracker import ColorTracker
+        self.tracker = ColorTracker(colors = colors)
+
+    def init(self, frame, box):
+        (x1, y1, x2, y2) = box
+        self.tracker.init(frame, {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
+
+    def update(self, frame):
+        self.tracker.update(frame)
+        if self.tracker.consecutive_lost > 0 or self.tracker.box is None:
+            return None
+        (x, y, w, h) = self.tracker.box
+        return (int(x), int(y), int(x + w), int(y + h))
+
+class CMTAdapter(TrackerAdapter):
+    name = 'cmt'
+
+    def __init__(self, detector_threshold = 70, best_effort = False):
+        from trackers.cmt_tracker import CMTTracker
+        self.tracker = CMTTracker(True, False, cmt_detector_threshold = detector_threshold, best_effort = best_effort)
+
+    def init(self, frame, box):
+        (x1, y1, x2, y2) = box
+        (self.tracker.x1, self.tracker.y1, self.tracker.x2, self.tracker.y2) = box
+        self.tracker.init(frame, options = {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
+
+class TLDAdapter(TrackerAdapter):
+    name = 'tld'
+
+    def __init__(self):
+        from trackers.tld_tracker import TLDTracker
+        self.tracker = TLDTracker()
+
+class DLIBAdapter(TrackerAdapter):
+    name = 'dlib'
+    MIN_SCORE = 8 # as main.py
+
+    def __init__(self):
+        from trackers.dlib_tracker import DLIBTracker
+        self.tracker = DLIBTracker()
+
+    def update(self, frame):
+        (score, x1, y1, x2, y2) = self.tracker.update(frame)
+        if score <= self.MIN_SCORE:
+            return None
+        return (x1, y1, x2, y2)
+
+# MotionTracker and KPMTracker give detection hints, not a tracked box: not benchmarked
+ADAPTERS = {adapter.name: adapter for adapter in [KCFAdapter, ColorAdapter, CMTAdapter, TLDAdapter, DLIBAdapter]}
+
+def create(name, **kwargs):
+    if name not in ADAPTERS:
+        raise ValueError("Unknown tracker '{}', expected one of: {}".format(name, ", ".join(sorted(ADAPTERS))))
+    return ADAPTERS[name](**kwargs)
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+import os
+import glob
+
+from utils.common import image_extensions
+
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.m4v', '.mpg']
+GROUNDTRUTH_NAMES = ['groundtruth_rect.txt', 'groundtruth.txt'] # OTB, VOT
+
+def parse_box(line):
+    # One ground truth line: OTB "x,y,w,h" (comma, tab or space separated) or VOT "x1,y1,...,x4,y4" polygon.
+    # Returns (x1, y1, x2, y2) or None when the target is absent (NaN, zero size, empty line).
+    values = line.replace(',', ' ').replace('\t', ' ').split()
+    if len(values) == 0:
+        return None
+    try:
+        values = [float(value) for value in values]
+    except ValueError:
+        return None
+    if any(np.isnan(values)):
+        return None
+
+    if len(values) == 4:
+        (x, y, w, h) = values
+        (x1, y1, x2, y2) = (x, y, x + w, y + h)
+    elif len(values) >= 6 and len(values) % 2 == 0:
+        xs = values[0::2]
+        ys = values[1::2]
+        (x1, y1, x2, y2) = (min(xs), min(ys), max(xs), max(ys))
+    else:
+        raise ValueError("Unknown ground truth format: {!r}".format(line))
+
+    if x2 - x1 <= 0 or y2 - y1 <= 0:
+        return None
+    return (int(round(x1)), int(round(y1)), int(round(x2)), int(round(y2)))
+
+def load_groundtruth(path):
+    with open(path) as f:
+        return [parse_box(line) for line in f]
+
+class Sequence:
+    # A video (file or image directory) with one ground truth box (or None) per frame.
+    def __init__(self, name, source, boxes):
+        self.name = name
+        self.source = source # video file path or sorted list of image paths
+        self.boxes = boxes
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def frames(self):
+        if isinstance(self.source, list):
+            for path in self.source:
+                frame = cv2.imread(path)
+                if frame is None:
+                    return
+                yield frame
+        else:
+            stream = cv2.VideoCapture(self.source)
+            try:
+                while True:
+                    (grabbed, frame) = stream.read()
+                    if grabbed is not True:
+                        return
+                    yield frame
+            finally:
+                stream.release()
+
+def image_files(directory):
+    paths = [path for path in glob.glob(os.path.join(directory, '*')) if os.path.splitext(path)[1].lower() in image_extensions]
+    return sorted(paths)
+
+def find_sequences(root):
+    # Sequences under 'root', sorted by name:
+    #   <name>.mp4 (or another video extension) with <name>.txt or <name>.groundtruth.txt next to it
+    #   <name>/ with groundtruth_rect.txt (OTB) or groundtruth.txt (VOT), images in <name>/img, <name>/color or <name>
+    sequences = []
+    for entry in sorted(os.listdir(root)):
+        path = os.path.join(root, entry)
+        (name, ext) = os.path.splitext(entry)
+
+        if os.path.isfile(path) and ext.lower() in VIDEO_EXTENSIONS:
+            for groundtruth in [os.path.join(root, name + '.txt'), os.path.join(root, name + '.groundtruth.txt')]:
+                if os.path.isfile(groundtruth):
+                    sequences.append(Sequence(name, path, load_groundtruth(groundtruth)))
+                    break
+
+        elif os.path.isdir(path):
+            groundtruths = [os.path.join(path, gt) for gt in GROUNDTRUTH_NAMES if os.path.isfile(os.path.join(path, gt))]
+            if len(groundtruths) == 0:
+                continue
+            for directory in [os.path.join(path, 'img'), os.path.join(path, 'color'), path]:
+                images = image_files(directory)
+                if len(images) > 0:
+                    sequences.append(Sequence(entry, images, load_groundtruth(groundtruths[0])))
+                    break
+
+    return sequences
@@ -0,0 +1,243 @@
+import cv2
+import numpy as np
+
+import time
+import fnmatch
+
+# Tracking hot paths timed in isolation on reproducible synthetic inputs.
+# A kernel is a setup function (size, rng) -> zero argument callable, registered in KERNELS with the kind
+# of size it sweeps: 'patch' (KCF template side in pixels) or 'frame' (frame width, 16:9).
+# Trackers are imported in the setups, a kernel whose dependencies are missing is reported and skipped.
+
+KERNELS = {} # name -> (kind, setup)
+
+def kernel(name, kind):
+    def register(setup):
+        KERNELS[name] = (kind, setup)
+        return setup
+    return register
+
+def select(patterns):
+    # kernel names matching any of the fnmatch patterns, in name order
+    return sorted(name for name in KERNELS if any(fnmatch.fnmatch(name, pattern) for pattern in patterns))
+
+def synthetic_frame(width, rng, shift = (0, 0), height = None):
+    # textured background (blurred noise and rectangles, for keypoints and HOG) with a striped red target
+    # in the middle; 'shift' moves the target only, as a second frame of a still camera
+    height = height if height else width * 9 // 16
+    noise = rng.randint(40, 200, (max(height // 16, 1), max(width // 16, 1), 3)).astype(np.uint8)
+    frame = cv2.resize(noise, (width, height), interpolation = cv2.INTER_CUBIC)
+    frame[:, :, 2] //= 2
+    for _ in range(width // 8):
+        (x, y) = (rng.randint(0, width), rng.randint(0, height))
+        size = rng.randint(4, max(width // 20, 5))
+        cv2.rectangle(frame, (x, y), (x + size, y + size), tuple(int(c) for c in rng.randint(0, 160, 3)), -1)
+
+    (x1, y1, x2, y2) = target_box(width, height)
+    (x1, y1, x2, y2) = (x1 + shift[0], y1 + shift[1], x2 + shift[0], y2 + shift[1])
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), -1)
+    stripe = max((y2 - y1) // 5, 1)
+    for y in range(y1 + stripe, y2 - stripe, 2 * stripe):
+        cv2.rectangle(frame, (x1 + stripe, y), (x2 - stripe, y + stripe // 2), (0, 0, 160), -1)
+    return frame
+
+def target_box(width, height):
+    (w, h) = (max(width // 16, 8), max(width // 12, 10))
+    return (width // 2 - w // 2, height // 2 - h // 2, width // 2 + w // 2, height // 2 + h // 2)
+
+def frame_pair(width, rng):
+    # two frames of the same background, the target moved by a few pixels
+    state = rng.get_state()
+    frame0 = synthetic_frame(width, rng)
+    rng.set_state(state)
+    frame1 = synthetic_frame(width, rng, shift = (max(width // 160, 1), max(width // 320, 1)))
+    return frame0, frame1
+
+def run(fn, repeat = 50, warmup = 3, min_time = 0.0):
+    # per call times (ms): 'warmup' untimed calls (JIT, caches), then at least 'repeat' calls and 'min_time' seconds
+    for _ in range(warmup):
+        fn()
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < repeat or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(1000 * (time.perf_counter() - t0))
+    return samples
+
+def summarize(samples):
+    samples = np.asarray(samples)
+    return {'median': float(np.median(samples)), 'p90': float(np.percentile(samples, 90)),
+        'min': float(samples.min()), 'mean': float(samples.mean()), 'n': len(samples)}
+
+# fhog
+
+def hog_patch(size, rng):
+    frame = synthetic_frame(size * 4, rng)
+    (h, w) = frame.shape[:2]
+    return np.ascontiguousarray(frame[h // 2 - size // 2:h // 2 + size // 2, w // 2 - size // 2:w // 2 + size // 2])
+
+@kernel('fhog.getFeatureMaps', 'patch')
+def setup_get_feature_maps(size, rng):
+    from trackers.kcf_tracker import fhog
+    patch = hog_patch(size, rng)
+    return lambda: fhog.getFeatureMaps(patch, 4, {'sizeX': 0, 'sizeY': 0, 'numFeatures': 0, 'map': 0})
+
+@kernel('fhog.normalizeAndTruncate', 'patch')
+def setup_normalize_and_truncate(size, rng):
+    from trackers.kcf_tracker import fhog
+    mapp = fhog.getFeatureMaps(hog_patch(size, rng), 4, {'sizeX': 0, 'sizeY': 0, 'numFeatures': 0, 'map': 0})
+    return lambda: fhog.normalizeAndTruncate(dict(mapp), 0.2)
+
+@kernel('fhog.PCAFeatureMaps', 'patch')
+def setup_pca_feature_maps(size, rng):
+    from trackers.kcf_tracker import fhog
+    mapp = fhog.getFeatureMaps(hog_patch(size, rng), 4, {'sizeX': 0, 'sizeY': 0, 'numFeatures': 0, 'map': 0})
+    mapp = fhog.normalizeAndTruncate(mapp, 0.2)
+    return lambda: fhog.PCAFeatureMaps(dict(mapp))
+
+# KCF (HOG, multiscale as main.py); the template side is the swept size
+
+def kcf_tracker(size, rng):
+    from trackers.kcf_tracker import KCFTracker
+    (frame0, frame1) = frame_pair(max(size * 5, 320), rng)
+    tracker = KCFTracker(True, False, True)
+    tracker.template_size = size
+    (tracker.x1, tracker.y1, tracker.x2, tracker.y2) = target_box(frame0.shape[1], frame0.shape[0])
+    tracker.init(frame0)
+    return tracker, frame1
+
+@kernel('kcf.getFeatures', 'patch')
+def setup_kcf_get_features(size, rng):
+    (tracker, frame) = kcf_tracker(size, rng)
+    return lambda: tracker.getFeatures(frame, 0, 1.0)
+
+@kernel('kcf.gaussianCorrelation', 'patch')
+def setup_kcf_gaussian_correlation(size, rng):
+    (tracker, frame) = kcf_tracker(size, rng)
+    x = tracker.getFeatures(frame, 0, 1.0)
+    return lambda: tracker.gaussianCorrelation(x, tracker._tmpl)
+
+@kernel('kcf.detect', 'patch')
+def setup_kcf_detect(size, rng):
+    (tracker, frame) = kcf_tracker(size, rng)
+    x = tracker.getFeatures(frame, 0, 1.0)
+    return lambda: tracker.detect(tracker._tmpl, x)
+
+@kernel('kcf.train', 'patch')
+def setup_kcf_train(size, rng):
+    (tracker, frame) = kcf_tracker(size, rng)
+    x = tracker.getFeatures(frame, 0, 1.0)
+    return lambda: tracker.train(x, tracker.interp_factor)
+
+@kernel('kcf.update', 'patch')
+def setup_kcf_update(size, rng):
+    (tracker, frame) = kcf_tracker(size, rng)
+    roi = list(tracker._roi)
+    def update():
+        tracker._roi = list(roi)
+        tracker.update(frame)
+    return update
+
+# CMT
+
+def cmt_tracker(width, rng):
+    from trackers.cmt_tracker import CMTTracker
+    (frame0, frame1) = frame_pair(width, rng)
+    tracker = CMTTracker(True, False, cmt_detector_threshold = 70)
+    (x1, y1, x2, y2) = target_box(frame0.shape[1], frame0.shape[0])
+    (tracker.x1, tracker.y1, tracker.x2, tracker.y2) = (x1 - (x2 - x1), y1 - (y2 - y1), x2 + (x2 - x1), y2 + (y2 - y1))
+    tracker.init(frame0, options = None)
+    gray = cv2.GaussianBlur(cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY), (3, 3), 0)
+    return tracker, frame1, gray
+
+@kernel('cmt.track', 'frame')
+def setup_cmt_track(width, rng):
+    (tracker, _, gray) = cmt_tracker(width, rng)
+    keypoints = tracker.active_keypoints.copy()
+    return lambda: tracker.track(tracker.gray0, gray, keypoints)
+
+@kernel('cmt.estimate', 'frame')
+def setup_cmt_estimate(width, rng):
+    (tracker, _, gray) = cmt_tracker(width, rng)
+    (tracked_keypoints, _) = tracker.track(tracker.gray0, gray, tracker.active_keypoints.copy())
+    return lambda: tracker.estimate(tracked_keypoints)
+
+@kernel('cmt.match', 'frame')
+def setup_cmt_match(width, rng):
+    # the matching stage of update(): detection, description and both knnMatch calls
+    (tracker, _, gray) = cmt_tracker(width, rng)
+    def match():
+        keypoints_cv = tracker.detector.detect(gray)
+        (keypoints_cv, features) = tracker.descriptor.compute(gray, keypoints_cv)
+        tracker.matcher.knnMatch(features, tracker.features_database, 2)
+        tracker.matcher.knnMatch(features, tracker.selected_features, len(tracker.selected_features))
+    return match
+
+@kernel('cmt.update', 'frame')
+def setup_cmt_update(width, rng):
+    (tracker, frame, _) = cmt_tracker(width, rng)
+    gray0 = tracker.gray0
+    def update():
+        tracker.gray0 = gray0
+        tracker.update(frame)
+    return update
+
+# color
+
+def color_tracker(width, rng, colors = ('red',)):
+    from trackers.color_tracker import ColorTracker
+    (frame0, frame1) = frame_pair(width, rng)
+    tracker = ColorTracker(colors = colors)
+    (x1, y1, x2, y2) = target_box(frame0.shape[1], frame0.shape[0])
+    tracker.init(frame0, {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
+    return tracker, frame1
+
+@kernel('color.update', 'frame')
+def setup_color_update(width, rng):
+    (tracker, frame) = color_tracker(width, rng)
+    return lambda: tracker.update(frame)
+
+@kernel('color.update.colors', 'frame')
+def setup_color_update_colors(width, rng):
+    # one inRange per color
+    (tracker, frame) = color_tracker(width, rng, ('red', 'red2', 'yellow'))
+    return lambda: tracker.update(frame)
+
+@kernel('color.update.full', 'frame')
+def setup_color_update_full(width, rng):
+    # target lost: full frame search
+    (tracker, frame) = color_tracker(width, rng)
+    def update():
+        tracker.consecutive_lost = 1
+        tracker.update(frame)
+    return update
+
+# motion
+
+@kernel('motion.update', 'frame')
+def setup_motion_update(width, rng):
+    from trackers.motion_tracker import MotionTracker
+    (frame0, frame1) = frame_pair(width, rng)
+    tracker = MotionTracker()
+    return lambda: tracker.update(frame1, frame0)
+
+@kernel('motion.update.compensated', 'frame')
+def setup_motion_update_compensated(width, rng):
+    from trackers.motion_tracker import MotionTracker
+    (frame0, frame1) = frame_pair(width, rng)
+    tracker = MotionTracker()
+    return lambda: tracker.update(frame1, frame0, shift = (0.0, 0.0))
+
+@kernel('motion.background', 'frame')
+def setup_motion_background(width, rng):
+    # per frame cost of the background model plus a detection
+    from trackers.motion_tracker import MotionTracker
+    (frame0, frame1) = frame_pair(width, rng)
+    tracker = MotionTracker()
+    for _ in range(tracker.background.warmup):
+        tracker.feed(frame0)
+    def feed_detect():
+        tracker.feed(frame1)
+        tracker.detect()
+    return feed_detect
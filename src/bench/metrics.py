@@ -0,0 +1,109 @@
+import numpy as np
+
+# OTB style thresholds
+IOU_THRESHOLDS = np.linspace(0, 1, 21)
+CENTER_ERROR_THRESHOLDS = np.arange(0, 51)
+PRECISION_THRESHOLD = 20 # pixels, the usual single precision number
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+def iou(a, b):
+    # boxes (x1, y1, x2, y2), 0 when either one is None
+    if a is None or b is None:
+        return 0.0
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    intersection = float(w * h)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union
+
+def center_error(a, b):
+    # pixels between the box centers, inf when the tracker gave no box
+    if a is None or b is None:
+        return np.inf
+    return float(np.hypot((a[0] + a[2] - b[0] - b[2]) / 2.0, (a[1] + a[3] - b[1] - b[3]) / 2.0))
+
+def success_curve(ious, thresholds = IOU_THRESHOLDS):
+    # fraction of frames with IoU above each threshold
+    ious = np.asarray(ious, dtype = np.float64)
+    if len(ious) == 0:
+        return np.zeros(len(thresholds))
+    return (ious[None, :] > np.asarray(thresholds)[:, None]).mean(axis = 1)
+
+def precision_curve(errors, thresholds = CENTER_ERROR_THRESHOLDS):
+    # fraction of frames with the center error within each threshold
+    errors = np.asarray(errors, dtype = np.float64)
+    if len(errors) == 0:
+        return np.zeros(len(thresholds))
+    return (errors[None, :] <= np.asarray(thresholds)[:, None]).mean(axis = 1)
+
+def latency_summary(latencies):
+    # milliseconds
+    latencies = np.asarray(latencies, dtype = np.float64)
+    if len(latencies) == 0:
+        return {}
+    summary = {'p{}'.format(p): float(np.percentile(latencies, p)) for p in LATENCY_PERCENTILES}
+    summary['mean'] = float(latencies.mean())
+    summary['max'] = float(latencies.max())
+    summary['fps'] = float(1000.0 / latencies.mean()) if latencies.mean() > 0 else 0.0
+    return summary
+
+class SequenceResult:
+    # Per-frame record of one tracker run over one sequence; frames without ground truth are not scored.
+    def __init__(self, tracker, sequence):
+        self.tracker = tracker
+        self.sequence = sequence
+        self.latencies = [] # ms of update(), per tracked frame
+        self.init_latencies = [] # ms of init(), first frame and re-initializations (much slower for KCF/CMT)
+        self.ious = []
+        self.errors = []
+        self.failures = 0 # tracked -> lost (no box or IoU 0) transitions
+        self.reinits = 0
+        self.failed = False
+
+    def add(self, box, truth, latency):
+        self.latencies.append(latency)
+        if truth is None:
+            return False
+
+        overlap = iou(box, truth)
+        self.ious.append(overlap)
+        self.errors.append(center_error(box, truth))
+
+        failed = overlap == 0
+        if failed and not self.failed:
+            self.failures += 1
+        self.failed = failed
+        return failed
+
+    def summary(self):
+        success = success_curve(self.ious)
+        precision = precision_curve(self.errors)
+        return {
+            'tracker': self.tracker,
+            'sequence': self.sequence,
+            'frames': len(self.init_latencies) + len(self.latencies),
+            'scored_frames': len(self.ious),
+            'latency_ms': latency_summary(self.latencies),
+            'init_latency_ms': latency_summary(self.init_latencies),
+            'mean_iou': float(np.mean(self.ious)) if len(self.ious) > 0 else 0.0,
+            'success_auc': float(success.mean()),
+            'precision': float(precision[PRECISION_THRESHOLD]),
+            'failures': self.failures,
+            'reinits': self.reinits,
+            'success_curve': success.tolist(),
+            'precision_curve': precision.tolist(),
+        }
+
+def combine(results, tracker):
+    # all sequences of one tracker as a single run
+    combined = SequenceResult(tracker, '*')
+    for result in results:
+        combined.latencies += result.latencies
+        combined.init_latencies += result.init_latencies
+        combined.ious += result.ious
+        combined.errors += result.errors
+        combined.failures += result.failures
+        combined.reinits += result.reinits
+    return combined
@@ -0,0 +1,42 @@
+import time
+
+from bench import adapters
+from bench.metrics import SequenceResult
+
+REINIT_DELAY = 5 # frames skipped after a failure before re-initializing on the ground truth (VOT)
+
+def run_sequence(tracker, sequence, reinit = False, max_frames = None, **kwargs):
+    # Runs a new 'tracker' adapter headless over 'sequence', initialized on the first frame with a ground truth box.
+    # reinit: a failed tracker is re-initialized REINIT_DELAY frames later (VOT protocol), otherwise it stays lost.
+    result = SequenceResult(tracker, sequence.name)
+    adapter = None
+    restart_at = None
+
+    for (index, frame) in enumerate(sequence.frames()):
+        if max_frames is not None and index >= max_frames:
+            break
+        truth = sequence.boxes[index] if index < len(sequence.boxes) else None
+
+        if adapter is None or (restart_at is not None and index >= restart_at):
+            if truth is None:
+                continue
+            if adapter is not None:
+                result.reinits += 1
+            adapter = adapters.create(tracker, **kwargs)
+            start = time.perf_counter()
+            adapter.init(frame, truth)
+            result.init_latencies.append(1000 * (time.perf_counter() - start))
+            result.failed = False
+            restart_at = None
+            continue
+        if restart_at is not None:
+            continue # failed, waiting to be re-initialized
+
+        start = time.perf_counter()
+        box = adapter.update(frame)
+        latency = 1000 * (time.perf_counter() - start)
+
+        if result.add(box, truth, latency) and reinit and restart_at is None:
+            restart_at = index + REINIT_DELAY
+
+    return result
@@ -0,0 +1,90 @@
+# Headless tracker benchmark over videos with ground truth boxes (OTB/VOT text format), see bench/datasets.py
+#   python benchmark.py -p DATASET_DIR -t kcf,color --json results.json --csv results.csv
+#   python benchmark.py --synthetic 640,1280,1920 --scenes red,crowd -t color   # rendered scenes, see video/synthetic.py
+
+from __future__ import print_function
+
+import csv
+import json
+import argparse
+
+from bench import ADAPTERS, find_sequences, run_sequence
+from bench.metrics import combine, LATENCY_PERCENTILES
+from video.synthetic import SCENES, synthetic_sequences
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-p", "--path", help = "dataset directory: videos with <name>.txt or OTB/VOT sequence directories")
+ap.add_argument("--synthetic", help = "Comma separated frame widths of synthetic sequences (rendered, exact ground truth)")
+ap.add_argument("--scenes", help = "Comma separated synthetic scenes (default: all): " + ", ".join(sorted(SCENES)))
+ap.add_argument("--synthetic-frames", type=int, default=300, help = "# of frames per synthetic sequence")
+ap.add_argument("--seed", type=int, default=0, help = "Seed of the synthetic scenes")
+ap.add_argument("-t", "--trackers", default="kcf", help = "Comma separated trackers: " + ", ".join(sorted(ADAPTERS)))
+ap.add_argument("-s", "--sequences", help = "Comma separated sequence names (default: all)")
+ap.add_argument("-n", "--num-frames", type=int, help = "# of frames per sequence")
+ap.add_argument("--reinit", action="store_true", help = "Re-initialize failed trackers on the ground truth (VOT)")
+ap.add_argument("--colors", default="red,yellow", help = "Comma separated colors of the color tracker (the synthetic scenes use red and yellow targets)")
+ap.add_argument("--json", help = "Write per sequence and overall results (with curves) to this JSON file")
+ap.add_argument("--csv", help = "Write one summary row per tracker and sequence to this CSV file")
+args = vars(ap.parse_args())
+
+trackers = args['trackers'].split(',')
+for tracker in trackers:
+    if tracker not in ADAPTERS:
+        ap.error("unknown tracker '{}'".format(tracker))
+options = {'color': {'colors': args['colors'].split(',')}}
+
+if not args['path'] and not args['synthetic']:
+    ap.error("a dataset (-p) or synthetic sequences (--synthetic) are required")
+scenes = args['scenes'].split(',') if args['scenes'] else None
+for scene in scenes or []:
+    if scene not in SCENES:
+        ap.error("unknown scene '{}'".format(scene))
+
+sequences = find_sequences(args['path']) if args['path'] else []
+if args['synthetic']:
+    sequences += synthetic_sequences([int(width) for width in args['synthetic'].split(',')], args['synthetic_frames'], scenes, args['seed'])
+if args['sequences']:
+    names = args['sequences'].split(',')
+    sequences = [sequence for sequence in sequences if sequence.name in names]
+if len(sequences) == 0:
+    ap.error("no sequences with ground truth in {}".format(args['path'] or 'the synthetic scenes'))
+
+def print_summary(summary):
+    latency = summary['latency_ms']
+    print("{:<8} {:<24} {:>6} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>7.3f} {:>7.3f} {:>7.3f} {:>5}".format(
+        summary['tracker'], summary['sequence'][:24], summary['frames'], latency.get('fps', 0), latency.get('p50', 0),
+        latency.get('p99', 0), summary['init_latency_ms'].get('mean', 0), summary['mean_iou'], summary['success_auc'],
+        summary['precision'], summary['failures']))
+
+print("{:<8} {:<24} {:>6} {:>8} {:>8} {:>8} {:>8} {:>7} {:>7} {:>7} {:>5}".format(
+    'tracker', 'sequence', 'frames', 'fps', 'p50 ms', 'p99 ms', 'init ms', 'IoU', 'AUC', 'prec20', 'fail'))
+
+summaries = []
+overall = []
+for tracker in trackers:
+    results = []
+    for sequence in sequences:
+        result = run_sequence(tracker, sequence, reinit = args['reinit'], max_frames = args['num_frames'], **options.get(tracker, {}))
+        results.append(result)
+        summary = result.summary()
+        summaries.append(summary)
+        print_summary(summary)
+
+    summary = combine(results, tracker).summary()
+    overall.append(summary)
+    print_summary(summary)
+
+if args['json']:
+    with open(args['json'], 'w') as f:
+        json.dump({'sequences': summaries, 'overall': overall, 'options': args}, f, indent = 2)
+
+if args['csv']:
+    columns = ['tracker', 'sequence', 'frames', 'scored_frames', 'mean_iou', 'success_auc', 'precision', 'failures', 'reinits']
+    latency_columns = ['fps', 'mean', 'max'] + ['p{}'.format(p) for p in LATENCY_PERCENTILES]
+    init_latency_columns = ['mean', 'max']
+    with open(args['csv'], 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns + ['latency_' + column for column in latency_columns] + ['init_latency_' + column for column in init_latency_columns])
+        for summary in summaries + overall:
+            writer.writerow([summary[column] for column in columns] + [summary['latency_ms'].get(column, '') for column in latency_columns] +
+                [summary['init_latency_ms'].get(column, '') for column in init_latency_columns])
@@ -14,10 +14,10 @@ from imutils.video import WebcamVideoStream
 from imutils.video import FPS
 import hashlib
 
-from motor import Motor
+from motor import Motor, PTZSimulator, ZoomModel
+from video import SimulatedCamera
 
 import math
-from threading import Timer
 import time
 import datetime
 
@@ -37,6 +37,8 @@ ap.add_argument("-p", "--path", help = "path to video file")
 ap.add_argument("-d", "--display", action="store_true", help="Show display")
 ap.add_argument("-s", "--serial", help = "path to serial device")
 ap.add_argument("-z", "--zoom", help = "path to zoom control port")
+ap.add_argument("--auto", help = "Calibrate the FOV of every zoom preset and write the table (JSON) to this path")
+ap.add_argument("--simulate", action="store_true", help="Use the simulated motor, zoom and camera instead of hardware")
 
 args = vars(ap.parse_args())
 print("[INFO] Command: ", args)
@@ -50,7 +52,12 @@ HALF_HEIGHT = HEIGHT // 2
 MIN_SELECTION_WIDTH  = 16 # or 20, 10
 MIN_SELECTION_HEIGHT = 9 # or 20, 10
 
-if args['path']:
+if args['simulate'] is True:
+    simulator = PTZSimulator()
+    args['serial'] = simulator.motor_dev
+    args['zoom'] = simulator.zoom_dev
+    stream = SimulatedCamera(simulator, width = WIDTH, height = HEIGHT, targets = [])
+elif args['path']:
     stream = cv2.VideoCapture(args['path'])
 else:
     stream = cv2.VideoCapture(args['camera'])
@@ -62,8 +69,6 @@ stream.set(cv2.CAP_PROP_FRAME_HEIGHT, HEIGHT)
 pause_flag = False
 capture = None
 tracking_window = {'x1': -1, 'y1': -1, 'x2': -1, 'y2': -1, 'dragging': False, 'start': False}
-motor_is_moving_flag = False
-zoom_is_moving_flag = False
 fifo_enable_flag = False
 
 zooms = [1,2,4,8,16]
@@ -72,18 +77,6 @@ current_zoom = zooms[zoom_idx]
 color_select_flag = False
 set_preset_flag = False
 
-def motor_has_finished_moving(args):
-    global motor_is_moving_flag
-    motor_is_moving_flag = False
-    # print("[MOTOR] End of Moving")
-
-def zoom_has_finished_moving(args):
-    # zoom.stop_zooming()
-
-    global zoom_is_moving_flag
-    zoom_is_moving_flag = False
-    # print("[ZOOM] End of Zooming")
-
 def onmouse(event, x, y, flags, param):
     if event == cv2.EVENT_LBUTTONDOWN:
         param['dragging'] = True
@@ -132,6 +125,91 @@ if args['zoom']:
 else:
     zoom = None
 
+def read_settled(settle = 0.5):
+    # frames buffered by the driver are from before the move
+    time.sleep(settle)
+    for _ in range(5):
+        stream.grab()
+    grabbed, frame = stream.read()
+    if frame.shape[1] != WIDTH:
+        frame = cv2.resize(frame, (WIDTH, HEIGHT), interpolation = cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+def measure_shift(before, after, window):
+    # image shift in pixels, None if phase correlation is not confident
+    (dx, dy), response = cv2.phaseCorrelate(before, after, window)
+    if response < 0.05:
+        return None
+    return dx, dy
+
+def auto_calibrate(path, move_time = 0.5, probe_fraction = 0.125, repeat = 2):
+    # For every zoom preset move the camera by a known number of pulses along each axis (and back),
+    # measure the image shift with phase correlation and fit degrees per pixel (least squares through 0).
+    # half FOV = degrees per pixel * half of the screen. Presets that can't be measured are left out
+    # and interpolated by ZoomModel.
+    model = motor.zoom_model
+    window = cv2.createHanningWindow((WIDTH, HEIGHT), cv2.CV_32F)
+    half_fovs = {}
+
+    for z in (zooms if zoom else [current_zoom]):
+        if zoom:
+            zoom.zoom_to(z, dur = 3)
+            while zoom.is_zooming:
+                time.sleep(0.1)
+
+        # probe with ~1/8 of the screen according to the current table
+        (x_probe, y_probe) = model.pixel_to_pulse(WIDTH * probe_fraction, HEIGHT * probe_fraction, z)
+        fits = []
+        for (axis, pulses) in [(0, x_probe), (1, y_probe)]:
+            degrees = []
+            pixels = []
+            for _ in range(repeat):
+                for direction in [1, -1]:
+                    before = read_settled()
+                    x = direction * pulses if axis == 0 else 0
+                    y = direction * pulses if axis == 1 else 0
+                    motor.move(x = x, y = y, t = move_time)
+                    after = read_settled(move_time + 0.5)
+
+                    shift = measure_shift(before, after, window)
+                    if shift is not None:
+                        degrees.append(abs(direction * pulses * motor.DEGREE_PER_PULSE))
+                        pixels.append(abs(shift[axis]))
+
+            if len(pixels) == 0:
+                break
+            (degrees, pixels) = (np.array(degrees), np.array(pixels))
+            fits.append(np.dot(degrees, pixels) / np.dot(pixels, pixels))
+
+        if len(fits) < 2:
+            print("[CALIBRATE] x{}: no reliable shift, left out".format(z))
+            continue
+
+        half_fovs[z] = (fits[0] * HALF_WIDTH, fits[1] * HALF_HEIGHT)
+        print("[CALIBRATE] x{}: {:.4f}/{:.4f} degree per pixel, FOV {:.2f}x{:.2f}".format(z, fits[0], fits[1], 2 * half_fovs[z][0], 2 * half_fovs[z][1]))
+
+    if len(half_fovs) == 0:
+        print("[CALIBRATE] Failed, nothing written")
+        return None
+
+    calibrated = ZoomModel(half_fovs, model.speeds_table, screen_width = WIDTH, degree_per_pulse = motor.DEGREE_PER_PULSE)
+    calibrated.save(path)
+    print("[CALIBRATE] Written to {}".format(path))
+    return calibrated
+
+if args['auto']:
+    if motor is None:
+        print("[CALIBRATE] --auto needs the motor (--serial or --simulate)")
+    else:
+        auto_calibrate(args['auto'])
+        motor.close()
+        if zoom:
+            zoom.close()
+    stream.release()
+    if args['simulate'] is True:
+        simulator.close()
+    sys.exit(0)
+
 # Initialize to check if HSV min/max value changes
 hMin = sMin = vMin = hMax = sMax = vMax = 0
 phMin = psMin = pvMin = phMax = psMax = pvMax = 0
@@ -195,17 +273,13 @@ while True:
                     #
                     # # upper[0][0] =  upper[0][0] % 180
                     # print("Lower: {}, Upper: {}".format(lower, upper))
-                elif args['serial'] and motor_is_moving_flag is not True and zoom_is_moving_flag is not True:
+                elif args['serial'] and motor.is_moving is not True and (zoom is None or zoom.is_zooming is not True):
                     centerX = (tracking_window['x1'] + tracking_window['x2']) // 2
                     centerY = (tracking_window['y1'] + tracking_window['y2']) // 2
                     center_to_x = HALF_WIDTH - centerX
                     center_to_y = centerY - HALF_HEIGHT
 
-                    motor_timer = Timer(1, motor_has_finished_moving, args = [False])
-                    (x_to, y_to, z_to, f_to) = motor.pixel_to_pulse(center_to_x, center_to_y, current_zoom, limit = False)
-                    motor.move(x = x_to, y = y_to, z = z_to, f = f_to, t = 1)
-                    motor_timer.start()
-                    motor_is_moving_flag = True
+                    motor.move_to(center_to_x, center_to_y, current_zoom)
 
             capture = None
             tracking_window['start'] = False
@@ -305,23 +379,17 @@ while True:
         else:
             zoom.get_preset(preset)
     elif key == 65362: # 'up', 63232 for Mac
-        if zoom_is_moving_flag is not True and current_zoom < 16:
+        if zoom.is_zooming is not True and current_zoom < 16:
             zoom_idx += 1
             current_zoom = zooms[zoom_idx]
-            zoom.zoom_to(current_zoom)
-            zoom_is_moving_flag = True
-            zoom_timer = Timer(1, zoom_has_finished_moving, args = [False])
-            zoom_timer.start()
+            zoom.zoom_to(current_zoom, dur=1)
     elif key == 65364: # 'down', 63233 for Mac
-        if zoom_is_moving_flag is not True and current_zoom > 1:
+        if zoom.is_zooming is not True and current_zoom > 1:
             zoom_idx -= 1
             current_zoom = zooms[zoom_idx]
-            zoom.zoom_to(current_zoom)
-            zoom_is_moving_flag = True
-            zoom_timer = Timer(1, zoom_has_finished_moving, args = [False])
-            zoom_timer.start()
+            zoom.zoom_to(current_zoom, dur=1)
     elif key == 65361: # 'left', 63234 for Mac
-        if zoom_is_moving_flag is not True:
+        if zoom.is_zooming is not True:
             # print("[ZOOM] to 1")
             # zoom_idx = 0
             # current_zoom = zooms[zoom_idx]
@@ -331,7 +399,7 @@ while True:
             # zoom_timer.start()
             zoom.zoom('out')
     elif key == 65363: # 'right', 63235 for Mac
-        if zoom_is_moving_flag is not True:
+        if zoom.is_zooming is not True:
             # print("[ZOOM] to 20")
             # zoom_idx = 6
             # current_zoom = zooms[zoom_idx]
@@ -8,24 +8,27 @@ if PY3:
 
 import cv2
 import numpy as np
-import imutils
 
 from trackers.color_tracker import ColorTracker
-from trackers.kcf_tracker import KCFTracker
+from trackers.kcf_tracker import KCFTracker, Redetector
 from trackers.cmt_tracker import CMTTracker
 from trackers.tld_tracker import TLDTracker
 from trackers.dlib_tracker import DLIBTracker
 from trackers.motion_tracker import MotionTracker
 from trackers.kpm_tracker import KPMTracker
-from motor import Motor
+from motor import Motor, PTZController, PTZSimulator, ZoomModel
+from video import VideoStream, SimulatedCamera, SessionRecorder, SessionPlayer
+from pipeline import BoundedQueue, Stage
 
 import math
-from threading import Timer
+from threading import Timer, Thread, Event
 import time
 import datetime
 
 from utils import common
-from utils import util
+from utils import overlay
+from utils.profiler import StageProfiler
+from utils.metrics import Metrics, MetricsServer, profiler_collector
 
 import os
 import glob
@@ -47,7 +50,9 @@ ap.add_argument("-s", "--serial", help = "path to serial device")
 ap.add_argument("-z", "--zoom", help = "path to zoom control port")
 
 ap.add_argument("--color", action="store_true", help="Enable color tracking")
+ap.add_argument("--colors", default="red", help="Comma separated colors for color tracking: " + ", ".join(sorted(ColorTracker.COLORS)))
 ap.add_argument("--kcf", action="store_true", help="Enable KCF tracking")
+ap.add_argument("--redetect", action="store_true", help="Re-detect the target over the whole frame when KCF loses it")
 ap.add_argument("--cmt", action="store_true", help="Enable CMT tracking")
 ap.add_argument("--cmt-alone", action="store_true", help="Enable CMT tracking in best effort mode")
 ap.add_argument("--tld", action="store_true", help="Enable TLD tracking")
@@ -55,6 +60,17 @@ ap.add_argument("--dlib", action="store_true", help="Enable DLIB's correlation t
 ap.add_argument("--motion", action="store_true", help="Enable Motion subtracking")
 ap.add_argument("--kpm", action="store_true", help="Enable Keypoints match subtracking")
 ap.add_argument("--autozoom", action="store_true", help="Enable automatic zoom control")
+ap.add_argument("--simulate", action="store_true", help="Use the simulated motor, zoom and camera instead of hardware")
+ap.add_argument("--record", help="Record frames, selections, keys and motor commands to this directory")
+ap.add_argument("--replay", help="Replay a session recorded with --record at the recorded pace (motor and zoom simulated)")
+ap.add_argument("--replay-fast", action="store_true", help="Replay frames as fast as possible: frame inputs are the same, but motor/zoom timed decisions (is_moving, zooming) are not reproduced")
+ap.add_argument("--zoom-table", help="Zoom calibration table (JSON) written by calibrate.py --auto")
+ap.add_argument("--predictive", action="store_true", help="Enable predictive (latency compensated) motor control")
+ap.add_argument("--display-policy", default="drop_oldest", choices=BoundedQueue.POLICIES, help="Display queue policy when tracking outruns the GUI")
+ap.add_argument("--profile", action="store_true", help="Measure per stage latencies, 'p' key prints them, summary on exit")
+ap.add_argument("--profile-dump", help="Write the per stage latencies (JSON) to this path on exit")
+ap.add_argument("--metrics-port", type=int, help="Serve metrics (Prometheus text format) on http://127.0.0.1:PORT/metrics")
+ap.add_argument("--control-policy", default="drop_oldest", choices=BoundedQueue.POLICIES, help="Motor control queue policy when tracking outruns the motor")
 
 args = vars(ap.parse_args())
 # print("[INFO] Command: ", args)
@@ -67,16 +83,36 @@ HALF_HEIGHT = HEIGHT // 2
 MIN_SELECTION_WIDTH  = 16 # or 20, 10
 MIN_SELECTION_HEIGHT = 9 # or 20, 10
 
-if args['path']:
-    stream = cv2.VideoCapture(args['path'])
+# the tracking stage keeps the current and previous frames (the display stage gets copies)
+FRAMES_KEPT = 2
+
+profiler = StageProfiler(enabled = args['profile'] is True or args['profile_dump'] is not None or args['metrics_port'] is not None)
+
+player = None
+if args['replay']:
+    player = SessionPlayer(args['replay'], realtime = not args['replay_fast'])
+    recorded = sorted(key for (key, value) in player.options.items() if value is True)
+    print("[REPLAY] {} frames, recorded with: {}".format(len(player), ", ".join("--" + key.replace('_', '-') for key in recorded)))
+    simulator = PTZSimulator()
+    args['serial'] = simulator.motor_dev
+    args['zoom'] = simulator.zoom_dev
+    stream = VideoStream(player, width = WIDTH, height = HEIGHT, drop_frames = False, keep = FRAMES_KEPT, profiler = profiler if profiler.enabled else None).start()
+elif args['simulate'] is True:
+    simulator = PTZSimulator()
+    args['serial'] = simulator.motor_dev
+    args['zoom'] = simulator.zoom_dev
+    camera = SimulatedCamera(simulator, width = WIDTH, height = HEIGHT)
+    stream = VideoStream(camera, width = WIDTH, height = HEIGHT, keep = FRAMES_KEPT, profiler = profiler if profiler.enabled else None).start()
+elif args['path']:
+    stream = VideoStream(args['path'], width = WIDTH, height = HEIGHT, drop_frames = False, keep = FRAMES_KEPT, profiler = profiler if profiler.enabled else None).start()
 else:
-    stream = cv2.VideoCapture(args['camera'])
-
-stream.set(cv2.CAP_PROP_FRAME_WIDTH, WIDTH)
-stream.set(cv2.CAP_PROP_FRAME_HEIGHT, HEIGHT)
+    stream = VideoStream(args['camera'], width = WIDTH, height = HEIGHT, keep = FRAMES_KEPT, profiler = profiler if profiler.enabled else None).start()
 
 grabbed, frame = stream.read()
-frame = imutils.resize(frame, width=WIDTH)
+recorder = None
+if args['record']:
+    recorder = SessionRecorder(args['record'], options = args)
+    recorder.frame(frame, stream.frame_timestamp) # frame 0, the reference of the first tracked frame
 prev_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
 pause_flag = False
@@ -117,19 +153,23 @@ if args["display"] is True:
     cv2.namedWindow('Tracking')
     cv2.setMouseCallback('Tracking', onmouse, tracking_window)
 
+zoom_model = ZoomModel.load(args['zoom_table'], screen_width = WIDTH) if args['zoom_table'] else None
+
 if args['serial']:
-    motor = Motor(dev = args['serial'], baud = 115200, screen_width = WIDTH)
+    motor = Motor(dev = args['serial'], baud = 115200, screen_width = WIDTH, zoom_model = zoom_model)
+    if args['predictive'] is True:
+        motor.controller = PTZController(motor)
 else:
     motor = None
 
 if args['zoom']:
-    zoom = Motor(dev = args['zoom'], baud = 115200, screen_width = WIDTH)
+    zoom = Motor(dev = args['zoom'], baud = 115200, screen_width = WIDTH, zoom_model = zoom_model)
     zoom.zoom_x1()
 else:
     zoom = None
 
 if args['color'] is True:
-    color_tracker = ColorTracker()
+    color_tracker = ColorTracker(colors = args['colors'].split(','))
 else:
     color_tracker = None
 
@@ -138,6 +178,15 @@ if args['kcf'] is True:
 else:
     kcf_tracker = None
 
+if kcf_tracker and args['redetect'] is True:
+    redetector = Redetector(zoom_model = zoom.zoom_model if zoom else None)
+else:
+    redetector = None
+REDETECT_LEARN_PEAK = 0.5 # KCF boxes above this peak value become exemplars
+REDETECT_MIN_SCORE = 0.7
+KCF_SNAPSHOT_PEAK = 0.5 # models above this peak value are kept for restore()
+KCF_RESTORE_BLEND = 0.1 # weight of the new patch when a snapshot is restored
+
 if args['tld'] is True:
     tld_tracker = TLDTracker()
 else:
@@ -179,472 +228,669 @@ else:
     kpm_tracker = None
 
 
-tic = time.time()
-toc = time.time()
-
-while True:
-    if pause_flag is False:
-        grabbed, frame = stream.read()
-        if grabbed is not True:
-            # print("End of Frame")
-            break
-
-        frame = imutils.resize(frame, width=WIDTH)
-        frame_draw = np.copy(frame)
+display_queue = BoundedQueue(maxsize = 1, policy = args['display_policy'])  # track -> display
+control_queue = BoundedQueue(maxsize = 1, policy = args['control_policy'])  # track -> motor control
+key_queue = BoundedQueue(maxsize = 16, policy = 'block')                     # display -> track
+stop_event = Event()
+
+def control(command):
+    (name, center_to_x, center_to_y, current_zoom, timestamp) = command
+    if metrics:
+        metrics.inc('motor_commands_total', help = 'Motor commands issued', command = name)
+    if recorder:
+        recorder.event('motor', command = [name, center_to_x, center_to_y, current_zoom])
+    if name == 'move_to':
+        with profiler.time('motor.move_to'):
+            motor.move_to(center_to_x, center_to_y, current_zoom)
+    elif name == 'track' and motor.is_moving is not True: # stale: another command started while this one was queued
+        with profiler.time('motor.track'):
+            motor.track(center_to_x, center_to_y, current_zoom, timestamp)
+
+def collect_state(metrics):
+    # read at scrape time, nothing is published from the tracking loop
+    metrics.set_counter('frames_captured_total', stream.captured, help = 'Frames decoded by the capture thread')
+    metrics.set_counter('frames_dropped_total', stream.dropped, help = 'Frames decoded but never tracked')
+    if zoom:
+        metrics.set('zoom_level', zoom.current_zoom, help = 'Current zoom step')
+    if motor:
+        metrics.set('motor_moving', int(motor.is_moving), help = '1 while a move is in progress')
+    if kcf_tracker:
+        metrics.set('kcf_enabled', int(getattr(kcf_tracker, 'enable', False)), help = '1 while KCF tracks the target')
+        metrics.set('kcf_peak_value', getattr(kcf_tracker, 'peak_value', 0), help = 'KCF response peak of the last update')
+    if color_tracker:
+        metrics.set('color_consecutive_lost', getattr(color_tracker, 'consecutive_lost', 0), help = 'Frames since the color blob was last found')
+    if cmt_tracker and getattr(cmt_tracker, 'has_result', False):
+        metrics.set('cmt_inliers', len(cmt_tracker.tracked_keypoints), help = 'CMT tracked (inlier) keypoints')
+        metrics.set('cmt_outliers', len(cmt_tracker.outliers), help = 'CMT outlier keypoints')
+
+if args['metrics_port']:
+    metrics = Metrics()
+    metrics.add_collector(collect_state)
+    metrics.add_collector(profiler_collector(profiler))
+    metrics_server = MetricsServer(metrics, port = args['metrics_port']).start()
+    print("[INFO] Metrics on http://127.0.0.1:{}/metrics".format(metrics_server.port))
+else:
+    metrics = None
+    metrics_server = None
 
-    # if pause_flag is not True:
-        if tracking_window['start'] == True:
-            if((tracking_window['x2'] - tracking_window['x1']) > MIN_SELECTION_WIDTH) and ((tracking_window['y2'] - tracking_window['y1']) > MIN_SELECTION_HEIGHT):
-                selected_width = tracking_window['x2'] - tracking_window['x1']
-                selected_height = tracking_window['y2'] - tracking_window['y1']
-                if zoom:
-                    selected_width = int(selected_width / zoom.current_zoom)
-                    selected_height = int(selected_height / zoom.current_zoom)
+if motor:
+    control_stage = Stage('control', control, control_queue).start()
+else:
+    control_stage = None
 
-                # print("[KCF] User selected width {} and height {}".format(selected_width, selected_height) )
+tic = time.time()
+toc = time.time()
+selected_width = selected_height = 0
+dlib_scores = []
+
+def track(frame):
+    # returns the results for the display stage, nothing is drawn here
+    global tracking_processing_flag, selected_width, selected_height, dlib_scores, tic, toc
+    results = {}
+
+    if tracking_window['start'] == True:
+        if recorder:
+            recorder.event('select', x1 = tracking_window['x1'], y1 = tracking_window['y1'], x2 = tracking_window['x2'], y2 = tracking_window['y2'])
+        if((tracking_window['x2'] - tracking_window['x1']) > MIN_SELECTION_WIDTH) and ((tracking_window['y2'] - tracking_window['y1']) > MIN_SELECTION_HEIGHT):
+            selected_width = tracking_window['x2'] - tracking_window['x1']
+            selected_height = tracking_window['y2'] - tracking_window['y1']
+            if zoom:
+                selected_width = int(selected_width / zoom.current_zoom)
+                selected_height = int(selected_height / zoom.current_zoom)
+
+            # print("[KCF] User selected width {} and height {}".format(selected_width, selected_height) )
 
-                if color_tracker:
-                    if color_tracker.init(frame, options = tracking_window):
-                        print('[COLOR] Color Found at {}'.format(color_tracker.center))
-                    else:
-                        print('[COLOR] Color Not Found around at {}'.format(color_tracker.center))
-                    tracking_processing_flag = True # 초기화 결과에 상관없이 tracking 시작
-
-                if cmt_tracker:
-                    cmt_tracker.x1 = tracking_window['x1']
-                    cmt_tracker.y1 = tracking_window['y1']
-                    cmt_tracker.x2 = tracking_window['x2']
-                    cmt_tracker.y2 = tracking_window['y2']
-
-
-                    cmt_tracker.init(frame, options = tracking_window)
-                    print("[CMT] num_selected_keypoints is {}".format(cmt_tracker.num_initial_keypoints))
-                    if cmt_tracker.num_initial_keypoints == 0:
-                        print('[CMT] No keypoints found in selection')
-                        if tracking_processing_flag == True: # 이미 tracking 중이었으면 강제로 초기화
-                            tracking_window['start'] = True
-                        else:
-                            tracking_processing_flag = False
+            if color_tracker:
+                if color_tracker.init(frame, options = tracking_window):
+                    print('[COLOR] Color Found at {}'.format(color_tracker.center))
+                else:
+                    print('[COLOR] Color Not Found around at {}'.format(color_tracker.center))
+                tracking_processing_flag = True # 초기화 결과에 상관없이 tracking 시작
+
+            if cmt_tracker:
+                cmt_tracker.x1 = tracking_window['x1']
+                cmt_tracker.y1 = tracking_window['y1']
+                cmt_tracker.x2 = tracking_window['x2']
+                cmt_tracker.y2 = tracking_window['y2']
+
+
+                cmt_tracker.init(frame, options = tracking_window)
+                print("[CMT] num_selected_keypoints is {}".format(cmt_tracker.num_initial_keypoints))
+                if cmt_tracker.num_initial_keypoints == 0:
+                    print('[CMT] No keypoints found in selection')
+                    if tracking_processing_flag == True: # 이미 tracking 중이었으면 강제로 초기화
+                        tracking_window['start'] = True
                     else:
-                        tracking_processing_flag = True
+                        tracking_processing_flag = False
+                else:
+                    tracking_processing_flag = True
 
-                if kcf_tracker:
-                    kcf_tracker.x1 = tracking_window['x1']
-                    kcf_tracker.y1 = tracking_window['y1']
-                    kcf_tracker.x2 = tracking_window['x2']
-                    kcf_tracker.y2 = tracking_window['y2']
+            if kcf_tracker:
+                kcf_tracker.x1 = tracking_window['x1']
+                kcf_tracker.y1 = tracking_window['y1']
+                kcf_tracker.x2 = tracking_window['x2']
+                kcf_tracker.y2 = tracking_window['y2']
 
-                    #if you use hog feature, there will be a short pause after you draw a first boundingbox, that is due to the use of Numba.
+                #if you use hog feature, there will be a short pause after you draw a first boundingbox, that is due to the use of Numba.
+                with profiler.time('kcf.init'):
                     kcf_tracker.init(frame)
-                    tracking_processing_flag = True # 초기화 결과에 상관없이 tracking 시작
+                kcf_tracker.snapshots.clear() # a new target
+                kcf_tracker.take_snapshot(force = True)
+                tracking_processing_flag = True # 초기화 결과에 상관없이 tracking 시작
 
-                if tld_tracker:
-                    tld_tracker.x1 = tracking_window['x1']
-                    tld_tracker.y1 = tracking_window['y1']
-                    tld_tracker.x2 = tracking_window['x2']
-                    tld_tracker.y2 = tracking_window['y2']
+                if redetector:
+                    redetector.clear() # a new target
+                    redetector.learn(frame, (kcf_tracker.x1, kcf_tracker.y1, kcf_tracker.x2, kcf_tracker.y2), zoom.current_zoom if zoom else 1)
 
-                    res = tld_tracker.init(frame)
-                    if res:
-                        print("[TLD] init:", res)
-                        tracking_processing_flag = True
-                    else:
-                        print("[TLD] init failed:", res)
+            if tld_tracker:
+                tld_tracker.x1 = tracking_window['x1']
+                tld_tracker.y1 = tracking_window['y1']
+                tld_tracker.x2 = tracking_window['x2']
+                tld_tracker.y2 = tracking_window['y2']
 
-                if dlib_tracker:
-                    dlib_tracker.x1 = tracking_window['x1']
-                    dlib_tracker.y1 = tracking_window['y1']
-                    dlib_tracker.x2 = tracking_window['x2']
-                    dlib_tracker.y2 = tracking_window['y2']
-
-                    dlib_tracker.init(frame)
+                with profiler.time('tld.init'):
+                    res = tld_tracker.init(frame)
+                if res:
+                    print("[TLD] init:", res)
                     tracking_processing_flag = True
-                    dlib_scores = []
-
-            elif motor and motor.is_moving is not True:
-                centerX = (tracking_window['x1'] + tracking_window['x2']) // 2
-                centerY = (tracking_window['y1'] + tracking_window['y2']) // 2
-                center_to_x = HALF_WIDTH - centerX
-                center_to_y = centerY - HALF_HEIGHT
-                if zoom is None:
-                    motor.move_to(center_to_x, center_to_y)
-                elif zoom.is_zooming is not True:
-                    motor.move_to(center_to_x, center_to_y, zoom.current_zoom)
-
-            capture = None
-            tracking_window['start'] = False
+                else:
+                    print("[TLD] init failed:", res)
 
-        if tracking_processing_flag is True:
-            if show_lap_time_flag is True: # 'l' key
-                current_time = datetime.datetime.now().time().isoformat()
-                toc = time.time()
-                print("[INFO] Tracking duration: {:04.0f} ms @{}".format(1000*(toc-tic), current_time))
-                tic = toc
+            if dlib_tracker:
+                dlib_tracker.x1 = tracking_window['x1']
+                dlib_tracker.y1 = tracking_window['y1']
+                dlib_tracker.x2 = tracking_window['x2']
+                dlib_tracker.y2 = tracking_window['y2']
 
-            if color_tracker:
-                if kcf_tracker and kcf_tracker.enable:
+                with profiler.time('dlib.init'):
+                    dlib_tracker.init(frame)
+                tracking_processing_flag = True
+                dlib_scores = []
+
+        elif motor and motor.is_moving is not True:
+            centerX = (tracking_window['x1'] + tracking_window['x2']) // 2
+            centerY = (tracking_window['y1'] + tracking_window['y2']) // 2
+            center_to_x = HALF_WIDTH - centerX
+            center_to_y = centerY - HALF_HEIGHT
+            if zoom is None:
+                control_queue.put(('move_to', center_to_x, center_to_y, 1, frame_timestamp))
+            elif zoom.is_zooming is not True:
+                control_queue.put(('move_to', center_to_x, center_to_y, zoom.current_zoom, frame_timestamp))
+
+        tracking_window['start'] = False
+
+    if motion_tracker:
+        moving = (motor is not None and motor.is_moving) or (zoom is not None and zoom.is_zooming)
+        with profiler.time('motion.feed'):
+            motion_tracker.feed(frame, moving)
+
+    if tracking_processing_flag is True:
+        if show_lap_time_flag is True: # 'l' key
+            current_time = datetime.datetime.now().time().isoformat()
+            toc = time.time()
+            print("[INFO] Tracking duration: {:04.0f} ms @{}".format(1000*(toc-tic), current_time))
+            tic = toc
+
+        if color_tracker:
+            if kcf_tracker and kcf_tracker.enable:
+                with profiler.time('color.update'):
                     color_tracker.update(frame,  {'x1': kcf_tracker.x1, 'y1':kcf_tracker.y1, 'x2': kcf_tracker.x2, 'y2': kcf_tracker.y2})
-                else:
+            else:
+                with profiler.time('color.update'):
                     color_tracker.update(frame)
 
-                if color_tracker.consecutive_lost == 0:
-                    cv2.drawMarker(frame_draw, tuple(color_tracker.center), (0, 255, 255), 2)
+            if color_tracker.consecutive_lost == 0:
+                results['color'] = tuple(color_tracker.center)
 
-            elif cmt_tracker:
-                if cmt_tracker.force_init_flag is True:
-                    # print('[CMT]: Force init')
-                    cmt_tracker.force_init_flag = False
+        elif cmt_tracker:
+            if cmt_tracker.force_init_flag is True:
+                # print('[CMT]: Force init')
+                cmt_tracker.force_init_flag = False
+                with profiler.time('cmt.init'):
                     cmt_tracker.init(frame)
 
-                    if cmt_tracker.num_initial_keypoints == 0:
-                        print('[CMT] No keypoints found in selection for ({},{}), ({},{})'.format(cmt_tracker.x1, cmt_tracker.y1, cmt_tracker.x2, cmt_tracker.y2))
-                        cmt_tracker.force_init_flag = True
-                    # else:
-                    #     print("[CMT] num_selected_keypoints is {}".format(cmt_tracker.num_initial_keypoints))
+                if cmt_tracker.num_initial_keypoints == 0:
+                    print('[CMT] No keypoints found in selection for ({},{}), ({},{})'.format(cmt_tracker.x1, cmt_tracker.y1, cmt_tracker.x2, cmt_tracker.y2))
+                    cmt_tracker.force_init_flag = True
+                # else:
+                #     print("[CMT] num_selected_keypoints is {}".format(cmt_tracker.num_initial_keypoints))
 
-                else:
+            else:
+                with profiler.time('cmt.update'):
                     cmt_tracker.update(frame)
 
-                    # if cmt_tracker.best_effort is not True and cmt_tracker.tracked_keypoints.shape[0] < 10: # or cmt_tracker.active_keypoints.shape[0] < 10
-                    #     cmt_tracker.has_result = False
+                # if cmt_tracker.best_effort is not True and cmt_tracker.tracked_keypoints.shape[0] < 10: # or cmt_tracker.active_keypoints.shape[0] < 10
+                #     cmt_tracker.has_result = False
 
-                    if cmt_tracker.has_result:
-                        num_of_tracked_keypoints = len(cmt_tracker.tracked_keypoints)
+                if cmt_tracker.has_result:
+                    num_of_tracked_keypoints = len(cmt_tracker.tracked_keypoints)
 
-                        box_tl = cmt_tracker.tl
-                        box_br = cmt_tracker.br
+                    box_tl = cmt_tracker.tl
+                    box_br = cmt_tracker.br
 
-                        box_center = ((box_tl[0] + box_br[0]) // 2, (box_tl[1] + box_br[1]) // 2)
-                        cmt_tracker.box_center = box_center
+                    box_center = ((box_tl[0] + box_br[0]) // 2, (box_tl[1] + box_br[1]) // 2)
+                    cmt_tracker.box_center = box_center
 
-                        width = box_br[0] - box_tl[0]
-                        height = box_br[1] - box_tl[1]
+                    width = box_br[0] - box_tl[0]
+                    height = box_br[1] - box_tl[1]
 
-                        print("[CMT] {}. Tracked(inlier): {}, Outliers: {}, Votes: {}: Active: {}, Scale: {:02.2f}"
-                            .format(cmt_tracker.frame_idx, num_of_tracked_keypoints, len(cmt_tracker.outliers),
-                            len(cmt_tracker.votes), len(cmt_tracker.active_keypoints), cmt_tracker.scale_estimate))
+                    print("[CMT] {}. Tracked(inlier): {}, Outliers: {}, Votes: {}: Active: {}, Scale: {:02.2f}"
+                        .format(cmt_tracker.frame_idx, num_of_tracked_keypoints, len(cmt_tracker.outliers),
+                        len(cmt_tracker.votes), len(cmt_tracker.active_keypoints), cmt_tracker.scale_estimate))
 
-                        cmt_tracker.x1 = int(box_center[0] - width/2)
-                        cmt_tracker.y1 = int(box_center[1] - height/2)
-                        cmt_tracker.x2 = int(box_center[0] + width/2)
-                        cmt_tracker.y2 = int(box_center[1] + height/2)
+                    cmt_tracker.x1 = int(box_center[0] - width/2)
+                    cmt_tracker.y1 = int(box_center[1] - height/2)
+                    cmt_tracker.x2 = int(box_center[0] + width/2)
+                    cmt_tracker.y2 = int(box_center[1] + height/2)
 
-                        # util.draw_str(frame, (550, 20), 'Tracking')
-                        cv2.rectangle(frame_draw, cmt_tracker.tl, cmt_tracker.br, (0,165,255), 1)
-                        cv2.drawMarker(frame_draw, cmt_tracker.box_center, (0,165,255))
-                        # cv2.drawMarker(frame_draw, tuple(cmt_tracker.center.astype(np.int16)), (0, 0, 255))
+                    results['cmt'] = (cmt_tracker.tl, cmt_tracker.br, cmt_tracker.box_center)
+                    results['keypoints'] = (cmt_tracker.tracked_keypoints, cmt_tracker.votes[:, :2], cmt_tracker.outliers[:, :2])
 
-                        # util.draw_keypoints_by_number(cmt_tracker.tracked_keypoints, frame_draw, (0, 0, 255))
-                        # util.draw_keypoints_by_number(cmt_tracker.outliers, frame_draw, (255, 0, 0))
-                        util.draw_keypoints(cmt_tracker.tracked_keypoints, frame_draw, (255, 255, 255))
-                        util.draw_keypoints(cmt_tracker.votes[:, :2], frame_draw, (0, 255, 255))
-                        util.draw_keypoints(cmt_tracker.outliers[:, :2], frame_draw, (0, 0, 255))
+                else: # kcf_tracker.has_result == False
+                    results['status'] = 'CMT Lost'
 
-                    else: # kcf_tracker.has_result == False
-                        util.draw_str(frame_draw, (520, 20), 'CMT Lost')
-
-            elif tld_tracker:
-                if tld_tracker.force_init_flag is True:
-                    print('[TLD] Force init')
+        elif tld_tracker:
+            if tld_tracker.force_init_flag is True:
+                print('[TLD] Force init')
+                with profiler.time('tld.init'):
                     tld_tracker.init(frame)
-                    tld_tracker.force_init_flag = False
-                else:
+                tld_tracker.force_init_flag = False
+            else:
+                with profiler.time('tld.update'):
                     tld_tracker.update(frame)
 
-                    if tld_tracker.has_result:
-                        box_tl = tld_tracker.tl
-                        box_br = tld_tracker.br
+                if tld_tracker.has_result:
+                    box_tl = tld_tracker.tl
+                    box_br = tld_tracker.br
 
-                        box_center = ((box_tl[0] + box_br[0]) // 2, (box_tl[1] + box_br[1]) // 2)
-                        tld_tracker.box_center = box_center
+                    box_center = ((box_tl[0] + box_br[0]) // 2, (box_tl[1] + box_br[1]) // 2)
+                    tld_tracker.box_center = box_center
 
-                        width = box_br[0] - box_tl[0]
-                        height = box_br[1] - box_tl[1]
+                    width = box_br[0] - box_tl[0]
+                    height = box_br[1] - box_tl[1]
 
-                        tld_tracker.x1 = int(box_center[0] - width/2)
-                        tld_tracker.y1 = int(box_center[1] - height/2)
-                        tld_tracker.x2 = int(box_center[0] + width/2)
-                        tld_tracker.y2 = int(box_center[1] + height/2)
+                    tld_tracker.x1 = int(box_center[0] - width/2)
+                    tld_tracker.y1 = int(box_center[1] - height/2)
+                    tld_tracker.x2 = int(box_center[0] + width/2)
+                    tld_tracker.y2 = int(box_center[1] + height/2)
 
-                        # util.draw_str(frame, (550, 20), 'Tracking')
-                        cv2.rectangle(frame_draw, tld_tracker.tl, tld_tracker.br, (0,165,255), 1)
-                        cv2.drawMarker(frame_draw, tld_tracker.box_center, (0,165,255))
+                    results['tld'] = (tld_tracker.tl, tld_tracker.br, tld_tracker.box_center)
 
-                    else:
-                        util.draw_str(frame_draw, (520, 20), 'TLD Lost')
+                else:
+                    results['status'] = 'TLD Lost'
 
-            elif dlib_tracker:
-                if dlib_tracker.force_init_flag is True:
-                    print('[DLIB] Force init')
+        elif dlib_tracker:
+            if dlib_tracker.force_init_flag is True:
+                print('[DLIB] Force init')
+                with profiler.time('dlib.init'):
                     dlib_tracker.init(frame)
-                    dlib_tracker.force_init_flag = False
-                    dlib_scores = []
-                elif dlib_tracker.enable:
+                dlib_tracker.force_init_flag = False
+                dlib_scores = []
+            elif dlib_tracker.enable:
+                with profiler.time('dlib.update'):
                     score, x1, y1, x2, y2 = dlib_tracker.update(frame)
-                    # print("[DLIB] score:", score)
-
-                    if score > 8:
-                        box_center = ((x1 + x2) // 2, (y1 + y2) // 2)
-                        dlib_tracker.box_center = box_center
-
-                        width = x2 - x1
-                        height = y2 - y1
-
-                        dlib_scores.append(score)
-                        if len(dlib_scores) > 20:
-                            del dlib_scores[0]
-
-                        dlib_tracker.x1 = int(box_center[0] - width/2)
-                        dlib_tracker.y1 = int(box_center[1] - height/2)
-                        dlib_tracker.x2 = int(box_center[0] + width/2)
-                        dlib_tracker.y2 = int(box_center[1] + height/2)
-
-                        util.draw_str(frame_draw, (520, 20), 'Tracking: {}'.format(score))
-                        cv2.rectangle(frame_draw, (dlib_tracker.x1, dlib_tracker.y1),(dlib_tracker.x2, dlib_tracker.y2), (0,165,255), 1)
-                        cv2.drawMarker(frame_draw, dlib_tracker.box_center, (0,165,255))
-                    else:  # score <= 8:
-                        # print("[DLIB] Position change")
-                        util.draw_str(frame_draw, (520, 20), 'DLIB Lost')
-                        dlib_tracker.enable = False
-                else: # dlib_tracker.enable is False
-                    util.draw_str(frame_draw, (520, 20), 'DLIB Lost')
-
-            if kcf_tracker:
-                if kcf_tracker.force_init_flag is True:
+                # print("[DLIB] score:", score)
+
+                if score > 8:
+                    box_center = ((x1 + x2) // 2, (y1 + y2) // 2)
+                    dlib_tracker.box_center = box_center
+
+                    width = x2 - x1
+                    height = y2 - y1
+
+                    dlib_scores.append(score)
+                    if len(dlib_scores) > 20:
+                        del dlib_scores[0]
+
+                    dlib_tracker.x1 = int(box_center[0] - width/2)
+                    dlib_tracker.y1 = int(box_center[1] - height/2)
+                    dlib_tracker.x2 = int(box_center[0] + width/2)
+                    dlib_tracker.y2 = int(box_center[1] + height/2)
+
+                    results['status'] = 'Tracking: {}'.format(score)
+                    results['dlib'] = ((dlib_tracker.x1, dlib_tracker.y1), (dlib_tracker.x2, dlib_tracker.y2), dlib_tracker.box_center)
+                else:  # score <= 8:
+                    # print("[DLIB] Position change")
+                    results['status'] = 'DLIB Lost'
+                    dlib_tracker.enable = False
+            else: # dlib_tracker.enable is False
+                results['status'] = 'DLIB Lost'
+
+        if kcf_tracker:
+            if kcf_tracker.force_init_flag is True:
+                with profiler.time('kcf.restore'):
+                    restored = kcf_tracker.restore(frame, blend = KCF_RESTORE_BLEND)
+                if restored:
+                    print('[KCF] Restored a snapshot: peak value({:.02f})'.format(kcf_tracker.peak_value))
+                else:
                     print('[KCF] Force init')
-                    kcf_tracker.init(frame)
-                    kcf_tracker.force_init_flag = False
-                elif kcf_tracker.enable:
+                    with profiler.time('kcf.init'):
+                        kcf_tracker.init(frame)
+                kcf_tracker.force_init_flag = False
+            elif kcf_tracker.enable:
+                with profiler.time('kcf.update'):
                     boundingbox, loc = kcf_tracker.update(frame)
-                    boundingbox = list(map(int, boundingbox))
-
-                    # 이탈 정도(0.25), motion_tracker.interval, waitKey(x) 조정 필요
-                    if kcf_tracker.peak_value < 0.25:
-                        kcf_tracker.enable = False
-                        print('[KCF] Disabled: peak value({:.02f}) is too low'.format(kcf_tracker.peak_value))
-                        if color_tracker:
-                            color_tracker.consecutive_found = 0 # FOUND_CONDITION을 충족시키는 시간을 벌기위한 조치
-                        elif motion_tracker:
-                            if motor:
-                                motor.stop_moving = True
-                                motion_tracker.init(1) # stop_moving 처리 시간이 어차피 필요하니까 인자값을 더 크게?
-                            else:
-                                motion_tracker.init(1)
+                boundingbox = list(map(int, boundingbox))
 
-                    else:
-                        kcf_tracker.x1 = boundingbox[0]
-                        kcf_tracker.y1 = boundingbox[1]
-                        kcf_tracker.x2 = boundingbox[0] + boundingbox[2]
-                        kcf_tracker.y2 = boundingbox[1] + boundingbox[3]
-                        kcf_tracker.center = ((kcf_tracker.x1 + kcf_tracker.x2) // 2, (kcf_tracker.y1 + kcf_tracker.y2) // 2)
+                # 이탈 정도(0.25), motion_tracker.background, waitKey(x) 조정 필요
+                if kcf_tracker.peak_value < 0.25:
+                    kcf_tracker.enable = False
+                    print('[KCF] Disabled: peak value({:.02f}) is too low'.format(kcf_tracker.peak_value))
+                    if color_tracker:
+                        color_tracker.consecutive_found = 0 # FOUND_CONDITION을 충족시키는 시간을 벌기위한 조치
+                    elif motion_tracker:
+                        if motor:
+                            motor.stop_moving = True
+                            motion_tracker.init(1) # stop_moving 처리 시간이 어차피 필요하니까 인자값을 더 크게?
+                        else:
+                            motion_tracker.init(1)
 
-                    continue_flag = True
-                    wide_zoom_flag = False
+                else:
+                    kcf_tracker.x1 = boundingbox[0]
+                    kcf_tracker.y1 = boundingbox[1]
+                    kcf_tracker.x2 = boundingbox[0] + boundingbox[2]
+                    kcf_tracker.y2 = boundingbox[1] + boundingbox[3]
+                    kcf_tracker.center = ((kcf_tracker.x1 + kcf_tracker.x2) // 2, (kcf_tracker.y1 + kcf_tracker.y2) // 2)
+                    if kcf_tracker.peak_value > KCF_SNAPSHOT_PEAK:
+                        kcf_tracker.take_snapshot()
+                    if redetector and kcf_tracker.peak_value > REDETECT_LEARN_PEAK:
+                        redetector.learn(frame, (kcf_tracker.x1, kcf_tracker.y1, kcf_tracker.x2, kcf_tracker.y2), zoom.current_zoom if zoom else 1)
+
+                continue_flag = True
+                wide_zoom_flag = False
 
-                    if color_tracker:
-                        if color_tracker.consecutive_found > color_tracker.FOUND_CONDITION:
-                            diff_width = abs(color_tracker.center[0] - kcf_tracker.center[0])
-                            diff_height = abs(color_tracker.center[1] - kcf_tracker.center[1])
-                            if diff_width > boundingbox[2] // 6 or diff_height < boundingbox[3] // 6: # boundingbox[2] == width
-                                # print("[KCF] Adjust center with color object")
-                                # print("[KCF] Bounding({},{}) vs Mean({},{})".format(boundingbox[2], boundingbox[3], kcf_tracker.mean_width, kcf_tracker.mean_height))
-                                kcf_tracker.x1 = color_tracker.center[0] - kcf_tracker.mean_width // 2
-                                kcf_tracker.x2 = color_tracker.center[0] + kcf_tracker.mean_width // 2
-                                kcf_tracker.y1 = int(color_tracker.center[1] - kcf_tracker.mean_height / 4)
-                                kcf_tracker.y2 = int(color_tracker.center[1] + kcf_tracker.mean_height * 3 / 4)
-                                kcf_tracker.center = ((kcf_tracker.x1 + kcf_tracker.x2) // 2, (kcf_tracker.y1 + kcf_tracker.y2) // 2)
-                                print('[KCF] kcf and color center mismatch => force init')
-                                kcf_tracker.force_init_flag = True
-                                continue_flag = False
-
-                        elif color_tracker.consecutive_lost >= color_tracker.LOST_CONDITION:
-                            kcf_tracker.enable = False
-                            kcf_tracker.mean_width = selected_width
-                            kcf_tracker.mean_height = selected_height
-                            kcf_tracker.prev_widths = np.array([kcf_tracker.mean_width], dtype=np.int16)
-                            kcf_tracker.prev_heights = np.array([kcf_tracker.mean_height], dtype=np.int16)
+                if color_tracker:
+                    if color_tracker.consecutive_found > color_tracker.FOUND_CONDITION:
+                        diff_width = abs(color_tracker.center[0] - kcf_tracker.center[0])
+                        diff_height = abs(color_tracker.center[1] - kcf_tracker.center[1])
+                        if diff_width > boundingbox[2] // 6 or diff_height < boundingbox[3] // 6: # boundingbox[2] == width
+                            # print("[KCF] Adjust center with color object")
+                            # print("[KCF] Bounding({},{}) vs Mean({},{})".format(boundingbox[2], boundingbox[3], kcf_tracker.mean_width, kcf_tracker.mean_height))
+                            kcf_tracker.x1 = color_tracker.center[0] - kcf_tracker.mean_width // 2
+                            kcf_tracker.x2 = color_tracker.center[0] + kcf_tracker.mean_width // 2
+                            kcf_tracker.y1 = int(color_tracker.center[1] - kcf_tracker.mean_height / 4)
+                            kcf_tracker.y2 = int(color_tracker.center[1] + kcf_tracker.mean_height * 3 / 4)
+                            kcf_tracker.center = ((kcf_tracker.x1 + kcf_tracker.x2) // 2, (kcf_tracker.y1 + kcf_tracker.y2) // 2)
+                            print('[KCF] kcf and color center mismatch => force init')
+                            kcf_tracker.force_init_flag = True
                             continue_flag = False
-                            wide_zoom_flag = True
 
-                    elif motion_tracker and motion_tracker.motion_count != 0:
+                    elif color_tracker.consecutive_lost >= color_tracker.LOST_CONDITION:
+                        kcf_tracker.enable = False
+                        kcf_tracker.mean_width = selected_width
+                        kcf_tracker.mean_height = selected_height
+                        kcf_tracker.prev_widths = np.array([kcf_tracker.mean_width], dtype=np.int16)
+                        kcf_tracker.prev_heights = np.array([kcf_tracker.mean_height], dtype=np.int16)
                         continue_flag = False
-                        # wide_zoom_flag = True
-
-                    if continue_flag is True:
-                        kcf_tracker.prev_widths = np.append(kcf_tracker.prev_widths, boundingbox[2])
-                        kcf_tracker.prev_heights = np.append(kcf_tracker.prev_heights, boundingbox[3])
-
-                        if kcf_tracker.prev_widths.shape[0] > kcf_tracker.PREV_HISTORY_SIZE: # 10
-                            kcf_tracker.prev_widths = np.delete(kcf_tracker.prev_widths, (0), axis=0)
-                            kcf_tracker.prev_heights = np.delete(kcf_tracker.prev_heights, (0), axis=0)
-
-                        kcf_tracker.mean_width = np.round(np.mean(kcf_tracker.prev_widths)).astype(np.int)
-                        kcf_tracker.mean_height = np.round(np.mean(kcf_tracker.prev_heights)).astype(np.int)
-
-                        # str = "{}x{}({}x{})".format(kcf_tracker.mean_width, kcf_tracker.mean_height, selected_width, selected_height)
-                        # util.draw_str(frame_draw, (20, 20), str)
-                        # util.draw_str(frame_draw, (550, 20), 'Tracking')
-                        cv2.rectangle(frame_draw,(kcf_tracker.x1,kcf_tracker.y1), (kcf_tracker.x2,kcf_tracker.y2), (0,255,0), 1)
-                        cv2.drawMarker(frame_draw, tuple(kcf_tracker.center), (0,255,0))
-
-                        if args['autozoom'] and zoom.is_zooming is not True:
-                            next_zoom = zoom.find_next_auto_zoom(target_length = kcf_tracker.mean_width)
-                            if next_zoom != zoom.current_zoom:
-                                # print("[ZOOM] {} to {}".format(zoom.current_zoom, next_zoom))
-                                zoom.zoom_to(next_zoom, dur=3)
-
-                    if wide_zoom_flag is True:
-                        if zoom and zoom.current_zoom != 1:
-                            current_zoom = 1
-                            zoom.zoom_to(current_zoom, dur=3)
-
-                else: # kcf_tracker.enable is False
-                    if color_tracker and color_tracker.consecutive_found > color_tracker.FOUND_CONDITION and (zoom is None or zoom.is_zooming is False):
-                        kcf_tracker.x1 = color_tracker.center[0] - kcf_tracker.mean_width // 2
-                        kcf_tracker.x2 = color_tracker.center[0] + kcf_tracker.mean_width // 2
-                        kcf_tracker.y1 = int(color_tracker.center[1] - kcf_tracker.mean_height / 4)
-                        kcf_tracker.y2 = int(color_tracker.center[1] + kcf_tracker.mean_height * 3 / 4)
-                        kcf_tracker.center = ((kcf_tracker.x1 + kcf_tracker.x2) // 2, (kcf_tracker.y1 + kcf_tracker.y2) // 2)
-                        print('[KCF] kcf disabled and color found => force init')
-                        kcf_tracker.force_init_flag = True
-                    elif motion_tracker and (zoom is None or zoom.is_zooming is False) and (motor is None or motor.is_moving is False):
-                        if motion_tracker.check_interval():
-                            (x1, y1, x2, y2) = motion_tracker.update(frame, prev_frame)
-                            if x1 != -1:
-                                kcf_tracker.x1 = x1
-                                kcf_tracker.y1 = y1
-                                kcf_tracker.x2 = x2
-                                kcf_tracker.y2 = y2
-                                kcf_tracker.force_init_flag = True
-
-                            if motor:
-                                motor.stop_moving = False
-
-
-            if motor and motor.is_moving is not True and motor.stop_moving is False: # and zoom.is_zooming is not True:
-                motor.driving_flag = False
-
-                if kcf_tracker:
-                    if kcf_tracker.enable:
-                        cX, cY = kcf_tracker.center
-                        motor.driving_flag = True
-                elif color_tracker and color_tracker.consecutive_lost < color_tracker.FOUND_CONDITION:
-                    cX, cY = color_tracker.center
-                    motor.driving_flag = True
-                elif cmt_tracker and cmt_tracker.has_result:
-                    cX, cY = cmt_tracker.box_center
-                    motor.driving_flag = True
+                        wide_zoom_flag = True
+
+                elif motion_tracker and motion_tracker.motion_count != 0:
+                    continue_flag = False
+                    # wide_zoom_flag = True
+
+                if continue_flag is True:
+                    kcf_tracker.prev_widths = np.append(kcf_tracker.prev_widths, boundingbox[2])
+                    kcf_tracker.prev_heights = np.append(kcf_tracker.prev_heights, boundingbox[3])
+
+                    if kcf_tracker.prev_widths.shape[0] > kcf_tracker.PREV_HISTORY_SIZE: # 10
+                        kcf_tracker.prev_widths = np.delete(kcf_tracker.prev_widths, (0), axis=0)
+                        kcf_tracker.prev_heights = np.delete(kcf_tracker.prev_heights, (0), axis=0)
+
+                    kcf_tracker.mean_width = np.round(np.mean(kcf_tracker.prev_widths)).astype(np.int)
+                    kcf_tracker.mean_height = np.round(np.mean(kcf_tracker.prev_heights)).astype(np.int)
+
+                    # str = "{}x{}({}x{})".format(kcf_tracker.mean_width, kcf_tracker.mean_height, selected_width, selected_height)
+                    results['kcf'] = ((kcf_tracker.x1, kcf_tracker.y1), (kcf_tracker.x2, kcf_tracker.y2), tuple(kcf_tracker.center))
+
+                    if args['autozoom'] and zoom.is_zooming is not True:
+                        next_zoom = zoom.find_next_auto_zoom(target_length = kcf_tracker.mean_width)
+                        if next_zoom != zoom.current_zoom:
+                            # print("[ZOOM] {} to {}".format(zoom.current_zoom, next_zoom))
+                            zoom.zoom_to(next_zoom, dur=3)
+
+                if wide_zoom_flag is True:
+                    if zoom and zoom.current_zoom != 1:
+                        current_zoom = 1
+                        zoom.zoom_to(current_zoom, dur=3)
+
+            else: # kcf_tracker.enable is False
+                color_found = color_tracker and color_tracker.consecutive_found > color_tracker.FOUND_CONDITION and (zoom is None or zoom.is_zooming is False)
+                # the full frame re-detection (the costliest step of the loop) only when color did not re-find the target
+                if redetector and not color_found and (zoom is None or zoom.is_zooming is False):
+                    with profiler.time('redetect'):
+                        candidates = redetector.detect(frame, zoom.current_zoom if zoom else 1)
                 else:
-                    cX = HALF_WIDTH
-                    cY = HALF_HEIGHT
+                    candidates = []
+
+                if color_found:
+                    kcf_tracker.x1 = color_tracker.center[0] - kcf_tracker.mean_width // 2
+                    kcf_tracker.x2 = color_tracker.center[0] + kcf_tracker.mean_width // 2
+                    kcf_tracker.y1 = int(color_tracker.center[1] - kcf_tracker.mean_height / 4)
+                    kcf_tracker.y2 = int(color_tracker.center[1] + kcf_tracker.mean_height * 3 / 4)
+                    kcf_tracker.center = ((kcf_tracker.x1 + kcf_tracker.x2) // 2, (kcf_tracker.y1 + kcf_tracker.y2) // 2)
+                    print('[KCF] kcf disabled and color found => force init')
+                    kcf_tracker.force_init_flag = True
+                elif len(candidates) > 0 and candidates[0][0] > REDETECT_MIN_SCORE:
+                    (score, (kcf_tracker.x1, kcf_tracker.y1, kcf_tracker.x2, kcf_tracker.y2)) = candidates[0]
+                    kcf_tracker.center = ((kcf_tracker.x1 + kcf_tracker.x2) // 2, (kcf_tracker.y1 + kcf_tracker.y2) // 2)
+                    print('[KCF] kcf disabled and re-detected({:.02f}) => force init'.format(score))
+                    kcf_tracker.force_init_flag = True
+                    if motor:
+                        motor.stop_moving = False
+                elif motion_tracker and (zoom is None or zoom.is_zooming is False) and (motor is None or motor.is_moving is False) and motion_tracker.check_ready():
+                    with profiler.time('motion.detect'):
+                        (x1, y1, x2, y2) = motion_tracker.detect()
+                    if x1 != -1:
+                        kcf_tracker.x1 = x1
+                        kcf_tracker.y1 = y1
+                        kcf_tracker.x2 = x2
+                        kcf_tracker.y2 = y2
+                        kcf_tracker.force_init_flag = True
 
-                if args['serial'] and motor.driving_flag is True:
-                    # cv2.drawMarker(frame, (cX, cY), (0,0,255))
-                    center_to_x = HALF_WIDTH - cX
-                    center_to_y = cY - HALF_HEIGHT
-                    # print("[MOTOR] Distance from Center: ({}px, {}px)".format(center_to_x, center_to_y))
+                    if motor:
+                        motor.stop_moving = False
+                elif motion_tracker and motor and (zoom is None or zoom.is_zooming is False):
+                    # panning, or the background model still warming up after a pan: frame differencing with the
+                    # camera motion compensated (image_shift() is (0, 0) once the moves are over)
+                    shift = motor.image_shift(prev_frame_timestamp, frame_timestamp, zoom.current_zoom if zoom else 1)
+                    with profiler.time('motion.update'):
+                        (x1, y1, x2, y2) = motion_tracker.update(frame, prev_frame, shift = shift)
+                    if x1 != -1:
+                        kcf_tracker.x1 = x1
+                        kcf_tracker.y1 = y1
+                        kcf_tracker.x2 = x2
+                        kcf_tracker.y2 = y2
+                        kcf_tracker.force_init_flag = True
+                        motor.stop_moving = False
 
-                    if zoom is None:
-                        motor.track(center_to_x, center_to_y)
-                    else:
-                        motor.track(center_to_x, center_to_y, zoom.current_zoom)
 
-        cv2.line(frame_draw, (HALF_WIDTH, 0), (HALF_WIDTH, WIDTH), (200, 200, 200), 0)
-        cv2.line(frame_draw, (0, HALF_HEIGHT), (WIDTH, HALF_HEIGHT), (200, 200, 200), 0)
+        if motor and motor.is_moving is not True and motor.stop_moving is False: # and zoom.is_zooming is not True:
+            motor.driving_flag = False
+
+            if kcf_tracker:
+                if kcf_tracker.enable:
+                    cX, cY = kcf_tracker.center
+                    motor.driving_flag = True
+            elif color_tracker and color_tracker.consecutive_lost < color_tracker.FOUND_CONDITION:
+                cX, cY = color_tracker.center
+                motor.driving_flag = True
+            elif cmt_tracker and cmt_tracker.has_result:
+                cX, cY = cmt_tracker.box_center
+                motor.driving_flag = True
+            else:
+                cX = HALF_WIDTH
+                cY = HALF_HEIGHT
+
+            if args['serial'] and motor.driving_flag is True:
+                # cv2.drawMarker(frame, (cX, cY), (0,0,255))
+                center_to_x = HALF_WIDTH - cX
+                center_to_y = cY - HALF_HEIGHT
+                # print("[MOTOR] Distance from Center: ({}px, {}px)".format(center_to_x, center_to_y))
+
+                if zoom is None:
+                    control_queue.put(('track', center_to_x, center_to_y, 1, frame_timestamp))
+                else:
+                    control_queue.put(('track', center_to_x, center_to_y, zoom.current_zoom, frame_timestamp))
+
+    return results
+
+def handle_key(key):
+    global pause_flag, tracking_processing_flag, show_lap_time_flag
+
+    if key == ord(' '):
+        pause_flag = not pause_flag
+    elif key == ord('s'):
+        tracking_processing_flag = False
+    elif key == ord('f'):
+        if kcf_tracker:
+            # print("[DEBUG] kcf enabled: {}, zoom: {}, color: {}/{}".format(kcf_tracker.enable, zoom.is_moving, color_tracker.consecutive_lost, color_tracker.consecutive_found))
+            if motion_tracker:
+                if motor:
+                    kcf_tracker.enable = False
+                    motor.stop_moving = True
+                    motion_tracker.init(5) # stop_moving 처리 시간이 어차피 필요하니까 인자값을 더 크게?
+                else:
+                    motion_tracker.init(5)
+                    kcf_tracker.enable = False
+                    # 어차피 모터 제어가 안되면 기다리지 말고 바로 수행할 수도
+                    # (x1, y1, x2, y2) = motion_tracker.update(frame, prev_frame)
+                    # if x1 != -1:
+                    #     kcf_tracker.x1 = x1
+                    #     kcf_tracker.y1 = y1
+                    #     kcf_tracker.x2 = x2
+                    #     kcf_tracker.y2 = y2
+                    #     kcf_tracker.force_init_flag = True
+
+        # elif dlib_tracker:
+        #     dlib_tracker.match(frame)
+        #     dlib_tracker.find_motion(frame, prev_frame)
+
+    elif key == 65362: # 'up', 63232 for Mac
+        if zoom.is_zooming is not True:
+            next_zoom = zoom.find_next_zoom(dir='in')
+            if next_zoom != zoom.current_zoom:
+                zoom.zoom_to(next_zoom, dur=0.1)
+    elif key == 65364: # 'down', 63233 for Mac
+        if zoom.is_zooming is not True:
+            next_zoom = zoom.find_next_zoom(dir='out')
+            if next_zoom != zoom.current_zoom:
+                zoom.zoom_to(next_zoom, dur=0.1)
+    elif key == 65361: # 'left', 63234 for Mac
+        if zoom.is_zooming is not True:
+            next_zoom = zoom.find_next_zoom(dir='first')
+            if next_zoom != zoom.current_zoom:
+                zoom.zoom_to(next_zoom, dur=0.1)
+    elif key == 65363: # 'right', 63235 for Mac
+        if zoom.is_zooming is not True:
+            next_zoom = zoom.find_next_zoom(dir='last')
+            if next_zoom != zoom.current_zoom:
+                zoom.zoom_to(next_zoom, dur=0.1)
+    elif key == ord('d'):
+        print("[MOTOR] Degree: ({:.02f}, {:.02f})".format(motor.sum_of_x_degree, motor.sum_of_y_degree))
+    elif key == ord('t') and (args['cmt_alone'] or args['cmt']) is True:
+        gray0 = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray0 = cv2.GaussianBlur(gray0, (3, 3), 0)
+
+        for x in range(10, 500, 10):
+            detector = cv2.BRISK_create(x, 3, 3.0)
+            keypoints = detector.detect(gray0)
+            cmt_detector_threshold = x
+            if len(keypoints) < cmt_tracker.MIN_NUM_OF_KEYPOINTS_FOR_BRISK_THRESHOLD:
+                break
+        print("[CMT] BRISK threshold is set to {} with {} keypoints".format(x, len(keypoints)))
+        cmt_tracker.detector = detector
+        cmt_tracker.descriptor = detector
+    elif key == ord('l'):
+        show_lap_time_flag = not show_lap_time_flag
+    elif key == ord('i'):
+        if args['serial']:
+            motor.sum_of_x_degree = motor.sum_of_y_degree = 0
+    elif key == ord('p'):
+        if profiler.enabled:
+            print(profiler.report())
+
+def replay_events(index):
+    # recorded keys and selections of frame 'index', before it is tracked as during the recording
+    for event in player.events_for(index):
+        if event['type'] == 'key':
+            handle_key(event['key'])
+        elif event['type'] == 'select':
+            tracking_window.update({'x1': event['x1'], 'y1': event['y1'], 'x2': event['x2'], 'y2': event['y2'], 'start': True})
+
+def tracking_stage():
+    global frame, prev_frame, frame_timestamp, prev_frame_timestamp
+
+    frame_index = 1 # index of the frame in a recorded session, 0 is the first frame read above
+    try:
+        while not stop_event.is_set():
+            key = key_queue.get(timeout = 0.1 if pause_flag is True else 0)
+            if key is not None:
+                if recorder:
+                    recorder.event('key', key = key)
+                handle_key(key)
+                continue
+
+            if pause_flag is True:
+                continue
+
+            with profiler.time('read'): # waiting for the capture thread
+                grabbed, frame = stream.read()
+            if grabbed is not True:
+                # print("End of Frame")
+                break
+            frame_timestamp = stream.frame_timestamp
+
+            if player:
+                replay_events(frame_index)
+
+            with profiler.time('track'):
+                results = track(frame)
+            if metrics:
+                metrics.inc('frames_processed_total', help = 'Frames tracked')
+            if recorder:
+                recorder.frame(frame, frame_timestamp)
+            frame_index += 1
+
+            if args["display"] is True:
+                # a copy: the display may hold it (selection drag) while the stream recycles its buffers
+                display_queue.put((frame.copy(), results))
+
+            prev_frame = frame # still valid after the next read, see VideoStream 'keep'
+            prev_frame_timestamp = frame_timestamp
+    finally:
+        stop_event.set() # also when tracking raised: the display loop and the other stages stop
+
+prev_frame = frame
+frame_timestamp = prev_frame_timestamp = stream.frame_timestamp
+tracker_thread = Thread(target = tracking_stage, name = 'track')
+tracker_thread.start()
 
+if args["display"] is True:
+    last_frame = frame.copy()
+    frame_draw = np.empty_like(frame)
+    while not stop_event.is_set():
+        item = display_queue.get(timeout = 0.01)
+        if item is not None:
+            (last_frame, results) = item
 
-    if args["display"] is True:
         if tracking_window['dragging'] == True:
             pt1 = (tracking_window['x1'], tracking_window['y1'])
             pt2 = (tracking_window['x2'], tracking_window['y2'])
 
             if capture is None:
-                capture = np.copy(frame)
+                capture = np.copy(last_frame)
 
-            frame_draw = np.copy(capture)
+            np.copyto(frame_draw, capture)
             cv2.rectangle(frame_draw, pt1, pt2, (0, 255, 0,), 1)
-            cv2.imshow("Tracking", frame_draw)
-
-        # pause가 아닌 상태에서 Tracking window 보이기(당연),
-        # 그런데 pause 일때 굳이 동작 않도록 처리한 이유는? => pause 일때 마우스 조작이 일어나는 경우에 대처하기 위해, 즉, 다른곳에서 윈도우 처리
-        if pause_flag is False:
-            cv2.imshow("Tracking", frame_draw)
-
-        key = cv2.waitKey(11)
+            with profiler.time('display'):
+                cv2.imshow("Tracking", frame_draw)
+        else:
+            capture = None
+            if item is not None:
+                np.copyto(frame_draw, last_frame)
+                with profiler.time('draw'):
+                    overlay.draw_results(frame_draw, results)
+                with profiler.time('display'):
+                    cv2.imshow("Tracking", frame_draw)
+
+        # GUI events only, keys are handled by the tracking stage
+        with profiler.time('waitKey'):
+            key = cv2.waitKey(1)
         if key == 27 or key == ord('q'):
             break
-        elif key == ord(' '):
-            pause_flag = not pause_flag
-        elif key == ord('s'):
-            tracking_processing_flag = False
-        elif key == ord('f'):
-            if kcf_tracker:
-                # print("[DEBUG] kcf enabled: {}, zoom: {}, color: {}/{}".format(kcf_tracker.enable, zoom.is_moving, color_tracker.consecutive_lost, color_tracker.consecutive_found))
-                if motion_tracker:
-                    if motor:
-                        kcf_tracker.enable = False
-                        motor.stop_moving = True
-                        motion_tracker.init(5) # stop_moving 처리 시간이 어차피 필요하니까 인자값을 더 크게?
-                    else:
-                        motion_tracker.init(5)
-                        kcf_tracker.enable = False
-                        # 어차피 모터 제어가 안되면 기다리지 말고 바로 수행할 수도
-                        # (x1, y1, x2, y2) = motion_tracker.update(frame, prev_frame)
-                        # if x1 != -1:
-                        #     kcf_tracker.x1 = x1
-                        #     kcf_tracker.y1 = y1
-                        #     kcf_tracker.x2 = x2
-                        #     kcf_tracker.y2 = y2
-                        #     kcf_tracker.force_init_flag = True
-
-            # elif dlib_tracker:
-            #     dlib_tracker.match(frame)
-            #     dlib_tracker.find_motion(frame, prev_frame)
-
-        elif key == 65362: # 'up', 63232 for Mac
-            if zoom.is_zooming is not True:
-                next_zoom = zoom.find_next_zoom(dir='in')
-                if next_zoom != zoom.current_zoom:
-                    zoom.zoom_to(next_zoom, dur=0.1)
-        elif key == 65364: # 'down', 63233 for Mac
-            if zoom.is_zooming is not True:
-                next_zoom = zoom.find_next_zoom(dir='out')
-                if next_zoom != zoom.current_zoom:
-                    zoom.zoom_to(next_zoom, dur=0.1)
-        elif key == 65361: # 'left', 63234 for Mac
-            if zoom.is_zooming is not True:
-                next_zoom = zoom.find_next_zoom(dir='first')
-                if next_zoom != zoom.current_zoom:
-                    zoom.zoom_to(next_zoom, dur=0.1)
-        elif key == 65363: # 'right', 63235 for Mac
-            if zoom.is_zooming is not True:
-                next_zoom = zoom.find_next_zoom(dir='last')
-                if next_zoom != zoom.current_zoom:
-                    zoom.zoom_to(next_zoom, dur=0.1)
-        elif key == ord('d'):
-            print("[MOTOR] Degree: ({:.02f}, {:.02f})".format(motor.sum_of_x_degree, motor.sum_of_y_degree))
-        elif key == ord('t') and (args['cmt_alone'] or args['cmt']) is True:
-            grabbed, frame = stream.read()
-            frame = imutils.resize(frame, width=WIDTH)
-            gray0 = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray0 = cv2.GaussianBlur(gray0, (3, 3), 0)
-
-            for x in range(10, 500, 10):
-                detector = cv2.BRISK_create(x, 3, 3.0)
-                keypoints = detector.detect(gray0)
-                cmt_detector_threshold = x
-                if len(keypoints) < cmt_tracker.MIN_NUM_OF_KEYPOINTS_FOR_BRISK_THRESHOLD:
-                    break
-            print("[CMT] BRISK threshold is set to {} with {} keypoints".format(x, len(keypoints)))
-            cmt_tracker.detector = detector
-            cmt_tracker.descriptor = detector
-        elif key == ord('l'):
-            show_lap_time_flag = not show_lap_time_flag
-        elif key == ord('i'):
-            if args['serial']:
-                motor.sum_of_x_degree = motor.sum_of_y_degree = 0
-
-        prev_frame = np.copy(frame)
+        elif key != -1:
+            key_queue.put(key)
+else:
+    try:
+        while tracker_thread.is_alive():
+            tracker_thread.join(0.5)
+    except KeyboardInterrupt:
+        pass
+
 # do a bit of cleanup
+stop_event.set()
+stream.stop()
+tracker_thread.join()
+if control_stage:
+    control_stage.stop()
+if metrics_server:
+    metrics_server.stop()
+if motor:
+    motor.close()
+if zoom:
+    zoom.close()
 cv2.destroyAllWindows()
-stream.release()
+print("[INFO] Captured {} frames, dropped {}".format(stream.captured, stream.dropped))
+if profiler.enabled:
+    print(profiler.report())
+    if args['profile_dump']:
+        profiler.dump(args['profile_dump'])
+if recorder:
+    recorder.close()
+    print("[INFO] Recorded {} frames to {}".format(recorder.frame_index, args['record']))
+if args['replay']:
+    simulator.close()
+    print("[REPLAY] {} motor commands recorded, motor simulator: {}".format(player.motor_commands, simulator.stats()))
+if args['simulate'] is True:
+    simulator.close()
+    print("[SIM] {}, target error: {:.02f} deg mean, {:.02f} deg max".format(simulator.stats(), np.mean(camera.errors), np.max(camera.errors)))
@@ -0,0 +1,76 @@
+# Micro-benchmarks of the tracking kernels (bench/kernels.py) over patch and frame sizes
+#   python microbench.py -k 'kcf.*,fhog.*' --save baseline.json
+#   python microbench.py --compare baseline.json   # exit status 1 on regressions
+
+from __future__ import print_function
+
+import sys
+import json
+import platform
+import argparse
+
+import cv2
+import numpy as np
+
+from bench import kernels
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-k", "--kernels", default="*", help = "Comma separated kernel name patterns: " + ", ".join(sorted(kernels.KERNELS)))
+ap.add_argument("--patch-sizes", default="48,96,144", help = "Comma separated KCF template sizes (pixels)")
+ap.add_argument("--frame-widths", default="320,640,1280", help = "Comma separated frame widths (16:9)")
+ap.add_argument("-r", "--repeat", type=int, default=30, help = "Timed calls per kernel and size")
+ap.add_argument("--min-time", type=float, default=0.2, help = "Minimum seconds per kernel and size")
+ap.add_argument("--seed", type=int, default=0, help = "Seed of the synthetic inputs")
+ap.add_argument("--save", help = "Write the results as a baseline (JSON)")
+ap.add_argument("--compare", help = "Baseline (JSON) to compare the medians against")
+ap.add_argument("--tolerance", type=float, default=0.15, help = "Slowdown over the baseline reported as a regression")
+args = vars(ap.parse_args())
+
+names = kernels.select(args['kernels'].split(','))
+if len(names) == 0:
+    ap.error("no kernel matches '{}'".format(args['kernels']))
+sizes = {'patch': [int(size) for size in args['patch_sizes'].split(',')],
+    'frame': [int(width) for width in args['frame_widths'].split(',')]}
+
+baseline = {}
+if args['compare']:
+    with open(args['compare']) as f:
+        baseline = json.load(f)['results']
+
+print("{:<28} {:>6} {:>9} {:>9} {:>9} {:>6} {:>9}".format('kernel', 'size', 'median', 'p90', 'min', 'n', 'baseline'))
+
+results = {}
+regressions = []
+for name in names:
+    (kind, setup) = kernels.KERNELS[name]
+    for size in sizes[kind]:
+        key = "{}@{}".format(name, size)
+        try:
+            fn = setup(size, np.random.RandomState(args['seed']))
+            summary = kernels.summarize(kernels.run(fn, repeat = args['repeat'], min_time = args['min_time']))
+        except Exception as e:
+            # missing optional dependency (numba, scipy, ...) or a broken kernel: keep going with the others
+            print("{:<28} {:>6} skipped: {}: {}".format(name, size, type(e).__name__, e))
+            continue
+        results[key] = summary
+
+        change = ''
+        if key in baseline:
+            ratio = summary['median'] / baseline[key]['median'] - 1
+            change = "{:+.0%}".format(ratio)
+            if ratio > args['tolerance']:
+                regressions.append((key, ratio))
+                change += ' !'
+        print("{:<28} {:>6} {:>9.3f} {:>9.3f} {:>9.3f} {:>6} {:>9}".format(
+            name, size, summary['median'], summary['p90'], summary['min'], summary['n'], change))
+
+if args['save']:
+    with open(args['save'], 'w') as f:
+        json.dump({'results': results, 'seed': args['seed'],
+            'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'opencv': cv2.__version__,
+                'machine': platform.machine(), 'processor': platform.processor()}}, f, indent = 2, sort_keys = True)
+
+if len(regressions) > 0:
+    print("[BENCH] {} regression(s) over {:.0%}: {}".format(len(regressions), args['tolerance'],
+        ", ".join("{} {:+.0%}".format(key, ratio) for (key, ratio) in regressions)))
+    sys.exit(1)
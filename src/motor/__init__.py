@@ -1 +1,4 @@
 from .motor import Motor
+from .controller import PTZController
+from .zoom_model import ZoomModel
+from .simulator import PTZSimulator
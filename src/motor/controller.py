@@ -0,0 +1,128 @@
+import time
+import numpy as np
+
+class AlphaBetaFilter:
+    # position/velocity estimate of one axis from noisy position measurements
+    def __init__(self, alpha = 0.5, beta = 0.1):
+        self.alpha = alpha
+        self.beta = beta
+        self.reset()
+
+    def reset(self):
+        self.position = None
+        self.velocity = 0.0
+        self.timestamp = None
+
+    def update(self, measurement, timestamp):
+        if self.position is None:
+            self.position = measurement
+            self.velocity = 0.0
+            self.timestamp = timestamp
+            return
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return
+
+        predicted = self.position + self.velocity * dt
+        residual = measurement - predicted
+        self.position = predicted + self.alpha * residual
+        self.velocity += self.beta * residual / dt
+        self.timestamp = timestamp
+
+    def predict(self, timestamp):
+        return self.position + self.velocity * (timestamp - self.timestamp)
+
+
+class PTZController:
+    # Predictive replacement for the proportional rule of Motor.track().
+    # The target is tracked in pan/tilt degrees (camera angle + pixel offset), so the camera's own
+    # motion does not look like target motion. Each command moves the camera, over 'period' seconds,
+    # towards where the target will be when the command executes ('latency' after the frame was captured
+    # plus the processing time), with a velocity feed-forward term.
+    #
+    # GAINS: zoom -> (kp, kv), gain on the position error and on the target velocity.
+    # Lower gains at high zoom, where the same pulse error is many more pixels.
+    GAINS = {1: (0.6, 1.0), 2: (0.5, 1.0), 4: (0.45, 0.9), 8: (0.35, 0.8), 12: (0.3, 0.75), 16: (0.25, 0.7), 20: (0.2, 0.6)}
+    DEAD_ZONE = 2 # px
+    RESET_GAP = 0.5 # sec without measurement: target lost, start over
+    RESET_JUMP = 5.0 # degree between prediction and measurement: another target
+
+    def __init__(self, motor, latency = 0.03, period = 0.05, alpha = 0.5, beta = 0.1, gains = None):
+        self.motor = motor
+        self.latency = latency # serial write + device reaction
+        self.period = period # duration of each velocity command
+        self.gains = gains if gains else self.GAINS
+        self.gain_zooms = np.array(sorted(self.gains.keys()))
+        self.x = AlphaBetaFilter(alpha, beta)
+        self.y = AlphaBetaFilter(alpha, beta)
+
+    def reset(self):
+        self.x.reset()
+        self.y.reset()
+
+    def gain(self, zoom):
+        idx = max(np.searchsorted(self.gain_zooms, zoom, side = 'right') - 1, 0)
+        return self.gains[self.gain_zooms[idx]]
+
+    def camera_degree(self, timestamp):
+        # commanded camera angle at 'timestamp': total of all commands minus the part not executed yet.
+        # Read from the motor's own state (sum_of_*_degree, recent_moves), which drops a queued move when it is
+        # superseded; a move starts 'latency' after it was sent.
+        x = self.motor.sum_of_x_degree
+        y = self.motor.sum_of_y_degree
+        for (sent, duration, move_x, move_y) in tuple(self.motor.recent_moves):
+            end = sent + self.latency + duration
+            if duration > 0:
+                remaining = min(max((end - timestamp) / duration, 0.0), 1.0)
+            else:
+                remaining = 1.0 if timestamp < end else 0.0
+            x -= remaining * move_x * self.motor.DEGREE_PER_PULSE
+            y -= remaining * move_y * self.motor.DEGREE_PER_PULSE
+        return x, y
+
+    def track(self, center_to_x, center_to_y, current_zoom = 1, timestamp = None):
+        now = time.monotonic()
+        if timestamp is None:
+            timestamp = now
+
+        half_fov_x, half_fov_y = self.motor.zoom_model.half_fov[current_zoom]
+        offset_x = center_to_x / self.motor.HALF_WIDTH * half_fov_x
+        offset_y = center_to_y / self.motor.HALF_HEIGHT * half_fov_y
+        camera_x, camera_y = self.camera_degree(timestamp)
+        target_x = camera_x + offset_x
+        target_y = camera_y + offset_y
+
+        if self.x.timestamp is not None:
+            if timestamp - self.x.timestamp > self.RESET_GAP or \
+                max(abs(self.x.predict(timestamp) - target_x), abs(self.y.predict(timestamp) - target_y)) > self.RESET_JUMP:
+                self.reset()
+
+        self.x.update(target_x, timestamp)
+        self.y.update(target_y, timestamp)
+
+        if abs(center_to_x) <= self.DEAD_ZONE and abs(center_to_y) <= self.DEAD_ZONE:
+            return
+
+        # where the target is when the command starts, and how far it goes during the command
+        start = now + self.latency
+        kp, kv = self.gain(current_zoom)
+        camera_x, camera_y = self.camera_degree(start)
+        x_degree = kp * (self.x.predict(start) - camera_x) + kv * self.x.velocity * self.period
+        y_degree = kp * (self.y.predict(start) - camera_y) + kv * self.y.velocity * self.period
+
+        x_to = int(x_degree / self.motor.DEGREE_PER_PULSE)
+        y_to = int(y_degree / self.motor.DEGREE_PER_PULSE)
+
+        # keep within the speed the motor can do at this zoom
+        max_pulses = self.motor.zoom_model.speeds[current_zoom] * self.period
+        d = max(abs(x_to), abs(y_to))
+        if d > max_pulses:
+            x_to = int(x_to * max_pulses / d)
+            y_to = int(y_to * max_pulses / d)
+
+        if x_to == 0 and y_to == 0:
+            return
+
+        self.motor.move(x = x_to, y = y_to, t = self.period)
+        self.motor.moving_until = now + self.period
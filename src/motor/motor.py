@@ -1,7 +1,11 @@
-import struct
 import serial
 import time
-from threading import Timer
+from collections import deque
+from threading import Lock
+
+from motor.serial_worker import SerialWorker
+from motor.packet import MovePacket, PelcoPacket, crc8
+from motor.zoom_model import ZoomModel
 
 class Motor:
     TABLE = [0,  94, 188, 226,  97,  63, 221, 131, 194, 156, 126,  32, 163, 253,  31,  65,
@@ -21,16 +25,28 @@ class Motor:
         233, 183,  85,  11, 136, 214,  52, 106,  43, 117, 151, 201,  74,  20, 246, 168,
         116,  42, 200, 150,  21,  75, 169, 247, 182, 232,  10,  84, 215, 137, 107,  53]
 
-    def __init__(self, dev = '/dev/ttyUSB0', baud = 115200, screen_width = 640):
+    def __init__(self, dev = '/dev/ttyUSB0', baud = 115200, screen_width = 640, async_io = True, zoom_model = None):
         self.port = serial.Serial(dev, baud, timeout = 0, parity = serial.PARITY_NONE)
+        # async_io: packets are written by a SerialWorker thread, see write()
+        self.worker = SerialWorker(self.port) if async_io else None
+        self.pending_move_degree = (0, 0)
+        self.recent_moves = deque(maxlen = 8) # (time.monotonic(), duration, x, y) of the last moves sent, see image_shift()
+        self.move_packet = MovePacket()
+        self.pelco_packet = PelcoPacket()
+        self.controller = None # PTZController, replaces the proportional rule of track()
         self.sum_of_x_degree = 0
         self.sum_of_y_degree = 0
 
-        self.is_moving = False
-        self.is_zooming = False
+        # Expected completion (time.monotonic()) of the last move/zoom command.
+        # is_moving, is_zooming and current_zoom are derived from them, no timer threads.
+        self.moving_until = 0
+        self.zooming_until = 0
+        self.zoom_state_lock = Lock()
+        self.target_zoom = 1
+        self._current_zoom = 1
+
         self.stop_moving = False
         self.available_zooms = [1,2,4,8,16]
-        self.current_zoom = 1
 
         self.WIDTH = screen_width # 640x360, 1024x576, 1280x720, 1920x1080
         self.HEIGHT = int(self.WIDTH * 9 / 16)
@@ -39,83 +55,105 @@ class Motor:
 
         self.DEGREE_PER_PULSE = 0.00048 # 0.00048은 현재 사용 모터와 기어비로 결정되는 펄스 당 회전 각도 (degree)
 
+        # FOVS, pulse per pixel and speed for every zoom step, interpolated from a calibration table
+        self.zoom_model = zoom_model if zoom_model else ZoomModel(screen_width = screen_width, degree_per_pulse = self.DEGREE_PER_PULSE)
+        self.DEGREE_PER_PULSE = self.zoom_model.degree_per_pulse
+
         # FOVS 는 실제로는 Half FOVS를 표현
-        self.FOVS = [(62.5000/2, 34.5000/2), #1
-                    (62.5000/4, 34.5000/4), #2
-                    (0, 0),
-                    (62.5000/8, 34.5000/8), #4
-                    (0, 0),
-                    (0, 0),
-                    (0, 0),
-                    (62.5000/16, 34.5000/16), #8
-                    (0, 0),
-                    (0, 0),
-                    (0, 0),
-                    (62.5000/24, 34.5000/24), #12
-                    (0, 0),
-                    (0, 0),
-                    (0, 0),
-                    (62.5000/32, 34.5000/32), #16
-                    (0, 0),
-                    (0, 0),
-                    (0, 0),
-                    (62.5000/40, 34.5000/40), ] #20
-
-    def has_finished_moving(self, args):
-        self.is_moving = False
-        # print("[MOTOR] End of Moving")
-
-    def send_packet(self, buffer):
-        crc8 = self.crc8_calc(buffer[2:-1])
-        buffer[len(buffer) - 1] = crc8
+        self.FOVS = self.zoom_model.half_fovs
+
+    @property
+    def is_moving(self):
+        return time.monotonic() < self.moving_until
+
+    @property
+    def is_zooming(self):
+        with self.zoom_state_lock:
+            if self.zooming_until == 0:
+                return False
+            if time.monotonic() < self.zooming_until:
+                return True
+
+            # End of Zooming
+            self._current_zoom = self.target_zoom
+            self.zooming_until = 0
+            return False
+
+    @property
+    def current_zoom(self):
+        self.is_zooming # commits a finished zoom
+        return self._current_zoom
+
+    def write(self, bstr, key = None, hold = 0):
+        # hold: time the device needs before the next packet
+        if self.worker:
+            return self.worker.send(bstr, key = key, hold = hold)
+
+        self.port.write(bstr)
+        if hold > 0:
+            time.sleep(hold)
+        return False
+
+    def close(self):
+        if self.worker:
+            self.worker.close()
+        self.port.close()
+
+    def send_packet(self, buffer, key = None):
+        buffer[len(buffer) - 1] = crc8(bytearray(buffer), 2, -1)
 
         bstr = bytes(buffer)
 
-        self.port.write(bstr)
+        return self.write(bstr, key = key)
 
     def crc8_calc(self, data = []):
-        crc8 = 0;
-
         if len(data) == 0:
             test_data = [213, 26, 142, 255, 0, 0, 0, 255, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 64, 66, 15, 0, 0, 55]
             data = test_data[2:-1]
 
-        for x in data:
-            crc8 = Motor.TABLE[crc8 ^ x]
-
-        return crc8
+        return crc8(bytearray(data))
 
     def move(self, x = 255, y = 255, z = 0, f = 0,  t = 1, rel = 0xff):
+        t_sec = t
         t = int(t * 1000000) # sec to us
         # print("[MOTOR] Move: x: {} y: {} t: {} rel: {}".format(x, y, t, rel))
 
         if (self.sum_of_x_degree > 90 and x > 0) or (self.sum_of_x_degree < -90 and x < 0):
             x = 0
-        else:
-            self.sum_of_x_degree += (x * self.DEGREE_PER_PULSE)
+        x_degree = x * self.DEGREE_PER_PULSE
+        self.sum_of_x_degree += x_degree
 
         if (self.sum_of_y_degree > 90 and y > 0) or (self.sum_of_y_degree < -90 and y < 0):
             y = 0
-        else:
-            self.sum_of_y_degree += (y * self.DEGREE_PER_PULSE)
-
-        encoded = list(struct.pack("3i", *[x, y, t]))
-
-        buffer = [
-            0xd5, 0x1A, 0x8e,
-            encoded[0], encoded[1], encoded[2], encoded[3],
-            # (x & 0xff) , ((x >> 8) & 0xff), ((x >> 16) & 0xff), ((x >> 24) & 0xff),
-            encoded[4], encoded[5], encoded[6], encoded[7],
-            # (y & 0xff) , ((y >> 8) & 0xff), ((y >> 16) & 0xff), ((y >> 24) & 0xff),
-            0x00, 0x00, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00,
-            encoded[8], encoded[9], encoded[10], encoded[11],
-            # (t & 0xff) , ((t >> 8) & 0xff), ((t >> 16) & 0xff), ((t >> 24) & 0xff),
-            rel, 0xFF
-        ]
-
-        self.send_packet(buffer)
+        y_degree = y * self.DEGREE_PER_PULSE
+        self.sum_of_y_degree += y_degree
+
+        bstr = self.move_packet.encode(x, y, t, rel)
+
+        # A move still waiting in the queue is superseded: only the latest target is sent
+        if self.write(bstr, key = 'move'):
+            self.sum_of_x_degree -= self.pending_move_degree[0]
+            self.sum_of_y_degree -= self.pending_move_degree[1]
+            if self.recent_moves:
+                self.recent_moves.pop()
+        self.pending_move_degree = (x_degree, y_degree)
+        self.recent_moves.append((time.monotonic(), t_sec, x, y))
+
+    def image_shift(self, since, until, zoom = 1):
+        # Expected (dx, dy) pixel shift of the image between two time.monotonic() stamps (e.g. two frame
+        # timestamps), from the moves sent: a move is assumed to run at constant speed over its duration.
+        # A positive x pulse turns the camera left (the image moves right), a positive y pulse down (the image moves up).
+        x = y = 0.0
+        for (start, duration, move_x, move_y) in tuple(self.recent_moves):
+            if duration <= 0:
+                part = 1.0 if since <= start < until else 0.0
+            else:
+                part = max(0.0, min(until, start + duration) - max(since, start)) / duration
+            x += move_x * part
+            y += move_y * part
+
+        ppp = self.zoom_model.pulse_per_pixel[zoom]
+        return x / ppp[0], -y / ppp[1]
 
     def pixel_to_pulse(self, x_px, y_px, zoom = 1, limit = False):
         # Logitec
@@ -126,33 +164,26 @@ class Motor:
         # x_degree = x_px/self.HALF_WIDTH * 62.0000/2
         # y_degree = y_px/self.HALF_HEIGHT * 34.5000/2
 
-        x_degree = x_px/self.HALF_WIDTH * self.FOVS[zoom-1][0]
-        y_degree = y_px/self.HALF_HEIGHT * self.FOVS[zoom-1][1]
-
-        x = int(x_degree/self.DEGREE_PER_PULSE)
-        y = int(y_degree/self.DEGREE_PER_PULSE)
+        (x, y) = self.zoom_model.pixel_to_pulse(x_px, y_px, zoom)
         z = f = 0
 
-        # print("[MOTOR] ({}px, {}px) => ({:.4f}°, {:.4f}°) => ({}, {}) pulse".format(x_px, y_px, x_degree, y_degree, x, y))
+        # print("[MOTOR] ({}px, {}px) => ({}, {}) pulse".format(x_px, y_px, x, y))
         return x, y, z, f
 
     def move_to(self, x, y, current_zoom=1):
-        motor_timer = Timer(1, self.has_finished_moving, args = [False])
         (x_to, y_to, z_to, f_to) = self.pixel_to_pulse(x, y, current_zoom, limit = False)
         self.move(x = x_to, y = y_to, z = z_to, f = f_to, t = 1)
-        motor_timer.start()
-        self.is_moving = True
+        self.moving_until = time.monotonic() + 1
+
+    def track(self, center_to_x, center_to_y, current_zoom=1, timestamp=None):
+        # timestamp: time.monotonic() when the frame was captured, used by the controller
+        if self.controller:
+            return self.controller.track(center_to_x, center_to_y, current_zoom, timestamp)
 
-    def track(self, center_to_x, center_to_y, current_zoom=1):
         if abs(center_to_x) > 2 or abs(center_to_y) > 2:
             (x_to, y_to, z_to, f_to) = self.pixel_to_pulse(center_to_x, center_to_y, current_zoom, limit = True)
 
-            # SPEED = 12000 # full speed: 120000, half speed: 600000
-            # SPEEDS = list(map(lambda idx: int(120000 * self.FOVS[idx-1][0]/self.FOVS[0][0]), list(range(0,21))))
-            # SPEEDS = [3000, 60000, 30000, 0, 15000, 0, 0, 0, 7500, 0, 0, 0, 5000, 0, 0, 0, 3750, 0, 0, 0, 3000]
-            SPEEDS = [6000, 60000, 30000, 0, 30000, 0, 0, 0, 15000, 0, 0, 0, 10000, 0, 0, 0, 7500, 0, 0, 0, 6000]
-            # print(SPEEDS)
-            SPEED = SPEEDS[current_zoom]
+            SPEED = self.zoom_model.speeds[current_zoom]
             MAX_MOVING_TIME = 0.05 # 0.1 for 100 ms
             d = max(abs(x_to), abs(y_to))
             t_sec = d / SPEED
@@ -180,27 +211,15 @@ class Motor:
             self.move(x = x_to, y = y_to, z = z_to, f = f_to, t = t_sec)
 
             if t_sec > 0:
-                self.is_moving = True
-                motor_timer = Timer(t_sec, self.has_finished_moving, args = [False])
-                motor_timer.start()
-
-    def has_finished_zooming(self, zoom):
-        # zoom.stop_zooming()
-        self.is_zooming = False
-        self.current_zoom = zoom
-        # print("[ZOOM] End of Zooming")
+                self.moving_until = time.monotonic() + t_sec
 
     def zoom_x1(self):
         # print('[ZOOM] to x1')
-        buffer = [0xff,0x01,0x00,0x40,0x00,0x00,0x41]
-        bstr = bytes(buffer)
-        self.port.write(bstr)
+        self.write(self.pelco_packet.encode(PelcoPacket.ZOOM_WIDE))
 
     def zoom_x20(self):
         # print('[ZOOM] to x20')
-        buffer = [0xff,0x01,0x00,0x20,0x00,0x00,0x21]
-        bstr = bytes(buffer)
-        self.port.write(bstr)
+        self.write(self.pelco_packet.encode(PelcoPacket.ZOOM_TELE))
 
     def zoom_to(self, x, dur=0.1):
         # print('[ZOOM] to', x)
@@ -208,58 +227,30 @@ class Motor:
         # print('[Debug] x = ', x)
         preset = zoom_to_preset[x]
 
-        buffer = [0xff,0x01,0x00,0x07,0x00,preset,0x00]
-        checksum = 0
-        for el in buffer[1: -1]:
-            checksum += el
-
-        checksum = checksum % 256
-        buffer[-1] = checksum
-        bstr = bytes(buffer)
-        self.port.write(bstr)
+        self.write(self.pelco_packet.encode(PelcoPacket.GOTO_PRESET, preset), key = 'zoom')
 
-        self.is_zooming = True
-        zoom_timer = Timer(dur, self.has_finished_zooming, args = [x])
-        zoom_timer.start()
+        with self.zoom_state_lock:
+            if self.zooming_until != 0: # previous zoom superseded
+                self._current_zoom = self.target_zoom
+            self.target_zoom = x
+            self.zooming_until = time.monotonic() + dur
 
     def stop_zooming(self):
-        buffer = [0xff,0x01,0x00,0x00,0x00,0x00,0x01]
-        bstr = bytes(buffer)
-        self.port.write(bstr)
-        time.sleep(0.1)
+        self.write(self.pelco_packet.encode(PelcoPacket.STOP), hold = 0.1)
 
     def set_preset(self, num):
-        buffer = [0xff,0x01,0x00,0x03,0x00,num,0x00]
-        checksum = 0
-        for el in buffer[1: -1]:
-            checksum += el
-
-        checksum = checksum % 256
-        buffer[-1] = checksum
-        bstr = bytes(buffer)
-        self.port.write(bstr)
+        self.write(self.pelco_packet.encode(PelcoPacket.SET_PRESET, num))
 
     def get_preset(self, num):
-        buffer = [0xff,0x01,0x00,0x07,0x00,num,0x00]
-        checksum = 0
-        for el in buffer[1: -1]:
-            checksum += el
-
-        checksum = checksum % 256
-        buffer[-1] = checksum
-        bstr = bytes(buffer)
-        self.port.write(bstr)
+        self.write(self.pelco_packet.encode(PelcoPacket.GOTO_PRESET, num))
 
     def zoom(self, direction):
+        # zoom for 0.1 sec then stop, scheduled on the worker without blocking the caller
         if direction == 'in':
-            buffer = [0xff,0x01,0x00,0x20,0x00,0x00,0x21]
-            bstr = bytes(buffer)
-            self.port.write(bstr)
+            bstr = self.pelco_packet.encode(PelcoPacket.ZOOM_TELE)
         else:
-            buffer = [0xff,0x01,0x00,0x40,0x00,0x00,0x41]
-            bstr = bytes(buffer)
-            self.port.write(bstr)
-        time.sleep(0.1)
+            bstr = self.pelco_packet.encode(PelcoPacket.ZOOM_WIDE)
+        self.write(bstr, hold = 0.1)
         self.stop_zooming()
 
     def find_next_zoom(self, dir):
@@ -286,11 +277,12 @@ class Motor:
         zoom_in_idx = idx + 1 if idx < len(self.available_zooms) - 1 else len(self.available_zooms) - 1
         zoom_out_idx = idx - 1 if idx > 0 else 0
 
-        normalized_length = list(map(lambda idx: self.FOVS[0][0]/self.FOVS[idx-1][0], self.available_zooms))
-        # print("[ZOOM] Ratio in length", list(map(lambda i: round(i, 2), normalized_length)))
+        normalized_length = self.zoom_model.normalized_length # indexed by zoom
+        zoom_in = self.available_zooms[zoom_in_idx]
+        zoom_out = self.available_zooms[zoom_out_idx]
 
-        zoom_in_length = target_length * (normalized_length[zoom_in_idx]/normalized_length[idx])
-        zoom_out_length = target_length * (normalized_length[zoom_out_idx]/normalized_length[idx])
+        zoom_in_length = target_length * (normalized_length[zoom_in]/normalized_length[self.current_zoom])
+        zoom_out_length = target_length * (normalized_length[zoom_out]/normalized_length[self.current_zoom])
         max_length = self.WIDTH * 0.3
         # print("[ZOOM] Current: {:02.0f}, Zoom in: {:02.0f}, Zoom out: {:02.0f}".format(target_length, zoom_in_length, zoom_out_length))
 
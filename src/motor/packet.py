@@ -0,0 +1,99 @@
+import struct
+import numpy as np
+
+# Maxim/Dallas CRC8 (reflected 0x31), same values as Motor.TABLE
+CRC8_TABLE = bytes([0,  94, 188, 226,  97,  63, 221, 131, 194, 156, 126,  32, 163, 253,  31,  65,
+    157, 195,  33, 127, 252, 162,  64,  30,  95,   1, 227, 189,  62,  96, 130, 220,
+    35, 125, 159, 193,  66,  28, 254, 160, 225, 191,  93,   3, 128, 222,  60,  98,
+    190, 224,   2,  92, 223, 129,  99,  61, 124,  34, 192, 158,  29,  67, 161, 255,
+    70,  24, 250, 164,  39, 121, 155, 197, 132, 218,  56, 102, 229, 187,  89,   7,
+    219, 133, 103,  57, 186, 228,   6,  88,  25,  71, 165, 251, 120,  38, 196, 154,
+    101,  59, 217, 135,   4,  90, 184, 230, 167, 249,  27,  69, 198, 152, 122,  36,
+    248, 166,  68,  26, 153, 199,  37, 123,  58, 100, 134, 216,  91,   5, 231, 185,
+    140, 210,  48, 110, 237, 179,  81,  15,  78,  16, 242, 172,  47, 113, 147, 205,
+    17,  79, 173, 243, 112,  46, 204, 146, 211, 141, 111,  49, 178, 236,  14,  80,
+    175, 241,  19,  77, 206, 144, 114,  44, 109,  51, 209, 143,  12,  82, 176, 238,
+    50, 108, 142, 208,  83,  13, 239, 177, 240, 174,  76,  18, 145, 207,  45, 115,
+    202, 148, 118,  40, 171, 245,  23,  73,   8,  86, 180, 234, 105,  55, 213, 139,
+    87,   9, 235, 181,  54, 104, 138, 212, 149, 203,  41, 119, 244, 170,  72,  22,
+    233, 183,  85,  11, 136, 214,  52, 106,  43, 117, 151, 201,  74,  20, 246, 168,
+    116,  42, 200, 150,  21,  75, 169, 247, 182, 232,  10,  84, 215, 137, 107,  53])
+
+def crc8(data, start = 0, end = None):
+    crc = 0
+    for x in memoryview(data)[start:end]:
+        crc = CRC8_TABLE[crc ^ x]
+    return crc
+
+class MovePacket:
+    # Pan/tilt packet: d5 1A 8e | x y z f 0 t (int32 little endian) | rel | crc8 of bytes [2:-1]
+    #
+    # The packet is filled in place with struct.pack_into. The CRC has no init/xor-out, so it is linear:
+    # crc(template ^ fields) = crc(template) ^ crc(fields). The variable bytes (x, y, t) are read back
+    # as 16 bit words, each with its own 64K table of its crc contribution at that position, plus rel:
+    # 7 lookups per packet instead of 26 table steps.
+    SIZE = 29
+    HEADER = (0xd5, 0x1A, 0x8e)
+    FORMAT = '<2i12xiB' # x, y, (z, f, 0), t, rel from offset 3
+    FIELD_OFFSET = 3
+    CRC_START = 2
+    WORDS = [3, 5, 7, 9, 23, 25] # x, y, t as little endian uint16
+    WORD_FORMAT = '<4H12x2HB'
+    REL = 27
+
+    def __init__(self):
+        self.buffer = bytearray(self.SIZE)
+        self.buffer[:3] = bytes(self.HEADER)
+        self.base_crc = crc8(self.buffer, self.CRC_START, -1)
+
+        self.word_tables = []
+        for position in self.WORDS:
+            low = self.position_table(position)
+            high = self.position_table(position + 1)
+            self.word_tables.append(np.bitwise_xor.outer(high, low).ravel().tobytes())
+        self.rel_table = self.position_table(self.REL).tobytes()
+
+    def position_table(self, position):
+        # crc8 contribution of each byte value at 'position', i.e. followed by zeros up to the crc byte
+        zeros = self.SIZE - 2 - position
+        table = np.frombuffer(CRC8_TABLE, dtype=np.uint8)
+        step = table
+        for _ in range(zeros):
+            step = table[step]
+        return step
+
+    def encode(self, x, y, t, rel = 0xff):
+        # t in us, returns a bytes copy, the buffer is reused by the next call
+        buffer = self.buffer
+        struct.pack_into(self.FORMAT, buffer, self.FIELD_OFFSET, x, y, t, rel)
+
+        (x0, x1, y0, y1, t0, t1, rel) = struct.unpack_from(self.WORD_FORMAT, buffer, self.FIELD_OFFSET)
+        tables = self.word_tables
+        buffer[-1] = (self.base_crc ^ tables[0][x0] ^ tables[1][x1] ^ tables[2][y0] ^ tables[3][y1]
+            ^ tables[4][t0] ^ tables[5][t1] ^ self.rel_table[rel])
+        return bytes(buffer)
+
+class PelcoPacket:
+    # Pelco-D style zoom packet: ff addr 00 command 00 arg checksum, checksum = sum(bytes[1:-1]) & 0xff.
+    # There are only a few distinct packets, they are built once and cached.
+    SIZE = 7
+    ZOOM_TELE = 0x20
+    ZOOM_WIDE = 0x40
+    STOP = 0x00
+    SET_PRESET = 0x03
+    GOTO_PRESET = 0x07
+
+    def __init__(self, address = 0x01):
+        self.address = address
+        self.buffer = bytearray(self.SIZE)
+        self.cache = {}
+
+    def encode(self, command, arg = 0):
+        key = (command, arg)
+        packet = self.cache.get(key)
+        if packet is None:
+            buffer = self.buffer
+            struct.pack_into('7B', buffer, 0, 0xff, self.address, 0x00, command, 0x00, arg, 0x00)
+            buffer[-1] = (self.address + command + arg) & 0xff
+            packet = self.cache[key] = bytes(buffer)
+        return packet
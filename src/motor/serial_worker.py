@@ -0,0 +1,73 @@
+import time
+from threading import Thread, Condition
+
+class SerialWorker:
+    # Writes packets to the serial port on its own thread so the caller never blocks.
+    #   key   - a pending packet with the same key is replaced (only the latest pan/tilt target matters)
+    #   delay - the packet is written no earlier than 'delay' seconds from now
+    #   hold  - the port stays quiet for 'hold' seconds after the packet (replaces time.sleep())
+    def __init__(self, port):
+        self.port = port
+        self.pending = [] # [due, seq, key, data, hold]
+        self.seq = 0
+        self.quiet_until = 0
+        self.written = 0
+        self.coalesced = 0
+        self.stopped = False
+        self.condition = Condition()
+
+        self.thread = Thread(target = self.run, name = 'SerialWorker')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def send(self, data, key = None, delay = 0, hold = 0):
+        # returns True if a pending packet with the same key was replaced
+        due = time.monotonic() + delay
+        with self.condition:
+            replaced = False
+            if key is not None:
+                for entry in self.pending:
+                    if entry[2] == key:
+                        entry[0], entry[3], entry[4] = due, data, hold
+                        replaced = True
+                        self.coalesced += 1
+                        break
+
+            if replaced is False:
+                self.pending.append([due, self.seq, key, data, hold])
+                self.seq += 1
+
+            self.condition.notify_all()
+            return replaced
+
+    def next_entry(self):
+        # earliest due packet, and how long to wait for it
+        if len(self.pending) == 0:
+            return None, None
+        entry = min(self.pending, key = lambda e: (e[0], e[1]))
+        return entry, max(entry[0], self.quiet_until) - time.monotonic()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    entry, wait = self.next_entry()
+                    if entry is not None and wait <= 0:
+                        break
+                    if self.stopped and entry is None:
+                        return
+                    self.condition.wait(wait)
+                self.pending.remove(entry)
+
+            self.port.write(entry[3])
+            with self.condition:
+                self.written += 1
+                if entry[4] > 0:
+                    self.quiet_until = time.monotonic() + entry[4]
+
+    def close(self, timeout = 1):
+        # pending packets are still written before the thread exits
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
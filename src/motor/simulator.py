@@ -0,0 +1,178 @@
+import os
+import time
+import select
+import struct
+import numpy as np
+from threading import Thread, Lock
+
+from motor.packet import crc8
+
+class PTZSimulator:
+    # Pan/tilt and zoom hardware on two pseudo-terminals:
+    #   Motor(dev = simulator.motor_dev) - 0xd5 0x1A 0x8e pan/tilt packets, CRC8 checked
+    #   Motor(dev = simulator.zoom_dev)  - Pelco-D style 0xff 0x01 ... zoom packets, sum checksum
+    # The device state (pan/tilt in degrees, zoom level) is a function of time, see pose().
+    # video.SimulatedCamera renders the camera view from it.
+    MOVE_PACKET_SIZE = 29
+    ZOOM_PACKET_SIZE = 7
+    DEVICE_LATENCY = 0.005 # sec between packet and start of motion
+    ZOOM_SPEED = 2.0 # zoom doublings per second
+    MAX_ZOOM = 20
+    DEGREE_PER_PULSE = 0.00048 # same motor and gear ratio as Motor
+    FOV = (62.5, 34.5) # horizontal/vertical FOV at x1, FOV at zoom z is FOV / z
+
+    def __init__(self):
+        self.lock = Lock()
+
+        # pan/tilt: position at the start of the current motion, and the motion (start, duration, dx, dy)
+        self.pan = 0.0
+        self.tilt = 0.0
+        self.motion = None
+
+        # zoom in log2 space: value at t0, speed (doublings/sec) and where it stops
+        self.zoom_log = 0.0
+        self.zoom_t0 = 0.0
+        self.zoom_speed = 0.0
+        self.zoom_limit = 0.0
+        self.presets = {1: 1, 2: 2, 3: 4, 4: 8, 5: 16}
+
+        self.move_packets = 0
+        self.zoom_packets = 0
+        self.crc_errors = 0
+        self.last_frame_time = None # set by SimulatedCamera
+        self.command_latencies = [] # frame capture to pan/tilt command arrival
+
+        (self.motor_master, motor_slave) = os.openpty()
+        (self.zoom_master, zoom_slave) = os.openpty()
+        self.motor_dev = os.ttyname(motor_slave)
+        self.zoom_dev = os.ttyname(zoom_slave)
+        self.slaves = [motor_slave, zoom_slave]
+
+        self.stopped = False
+        self.thread = Thread(target = self.run, name = 'PTZSimulator')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        buffers = {self.motor_master: bytearray(), self.zoom_master: bytearray()}
+        while not self.stopped:
+            ready, _, _ = select.select(list(buffers.keys()), [], [], 0.1)
+            for fd in ready:
+                try:
+                    data = os.read(fd, 1024)
+                except OSError:
+                    continue
+                now = time.monotonic()
+                buffers[fd].extend(data)
+                if fd == self.motor_master:
+                    self.decode_move(buffers[fd], now)
+                else:
+                    self.decode_zoom(buffers[fd], now)
+
+    def decode_move(self, buffer, now):
+        while len(buffer) >= self.MOVE_PACKET_SIZE:
+            if buffer[0] != 0xd5 or buffer[1] != 0x1A or buffer[2] != 0x8e:
+                del buffer[0]
+                continue
+
+            packet = buffer[:self.MOVE_PACKET_SIZE]
+            if crc8(packet, 2, -1) != packet[-1]:
+                self.crc_errors += 1
+                del buffer[0]
+                continue
+
+            del buffer[:self.MOVE_PACKET_SIZE]
+            (x, y) = struct.unpack_from('2i', packet, 3)
+            (t,) = struct.unpack_from('i', packet, 23)
+            self.move(x, y, t / 1000000.0, packet[27], now)
+
+    def decode_zoom(self, buffer, now):
+        while len(buffer) >= self.ZOOM_PACKET_SIZE:
+            if buffer[0] != 0xff:
+                del buffer[0]
+                continue
+
+            packet = buffer[:self.ZOOM_PACKET_SIZE]
+            if sum(packet[1:-1]) % 256 != packet[-1]:
+                self.crc_errors += 1
+                del buffer[0]
+                continue
+
+            del buffer[:self.ZOOM_PACKET_SIZE]
+            self.zoom_command(packet[3], packet[5], now)
+
+    def move(self, x, y, duration, rel, now):
+        # a new command takes over from wherever the running one got to
+        with self.lock:
+            self.move_packets += 1
+            if self.last_frame_time is not None:
+                self.command_latencies.append(now - self.last_frame_time)
+
+            (self.pan, self.tilt) = self.pose(now)[:2]
+            dx = x * self.DEGREE_PER_PULSE
+            dy = y * self.DEGREE_PER_PULSE
+            if rel != 0xff: # absolute
+                dx -= self.pan
+                dy -= self.tilt
+            self.motion = (now + self.DEVICE_LATENCY, max(duration, 1e-3), dx, dy)
+
+    def zoom_command(self, command, data, now):
+        with self.lock:
+            self.zoom_packets += 1
+            self.zoom_log = np.log2(self.pose(now)[2])
+            self.zoom_t0 = now + self.DEVICE_LATENCY
+            max_log = np.log2(self.MAX_ZOOM)
+
+            if command == 0x07 and data in self.presets: # go to preset
+                self.zoom_limit = np.log2(self.presets[data])
+                self.zoom_speed = self.ZOOM_SPEED if self.zoom_limit > self.zoom_log else -self.ZOOM_SPEED
+            elif command == 0x03: # set preset
+                self.presets[data] = 2 ** self.zoom_log
+                self.zoom_speed = 0.0
+            elif command == 0x20: # tele
+                self.zoom_limit = max_log
+                self.zoom_speed = self.ZOOM_SPEED
+            elif command == 0x40: # wide
+                self.zoom_limit = 0.0
+                self.zoom_speed = -self.ZOOM_SPEED
+            else: # stop
+                self.zoom_speed = 0.0
+
+    def pose(self, now = None):
+        # (pan, tilt, zoom) at 'now'; pan/tilt in degrees, positive pulses
+        if now is None:
+            now = time.monotonic()
+
+        pan, tilt = self.pan, self.tilt
+        if self.motion:
+            (start, duration, dx, dy) = self.motion
+            frac = min(max((now - start) / duration, 0.0), 1.0)
+            pan += frac * dx
+            tilt += frac * dy
+
+        zoom_log = self.zoom_log
+        if self.zoom_speed != 0 and now > self.zoom_t0:
+            zoom_log += self.zoom_speed * (now - self.zoom_t0)
+            if self.zoom_speed > 0:
+                zoom_log = min(zoom_log, self.zoom_limit)
+            else:
+                zoom_log = max(zoom_log, self.zoom_limit)
+
+        return pan, tilt, 2 ** zoom_log
+
+    def fov(self, zoom):
+        return (self.FOV[0] / zoom, self.FOV[1] / zoom)
+
+    def stats(self):
+        latencies = np.array(self.command_latencies)
+        stats = {'move_packets': self.move_packets, 'zoom_packets': self.zoom_packets, 'crc_errors': self.crc_errors}
+        if len(latencies) > 0:
+            stats['command_latency_ms'] = {'p50': 1000 * np.percentile(latencies, 50), 'p95': 1000 * np.percentile(latencies, 95),
+                'max': 1000 * latencies.max()}
+        return stats
+
+    def close(self):
+        self.stopped = True
+        self.thread.join(1)
+        for fd in [self.motor_master, self.zoom_master] + self.slaves:
+            os.close(fd)
@@ -0,0 +1,77 @@
+import json
+import numpy as np
+
+class ZoomModel:
+    # Half FOV (degrees), pulse per pixel, relative object length and pan/tilt speed for every zoom step.
+    # The calibration table may leave steps out (0 or missing), they are interpolated in magnification
+    # (FOV(1) / FOV(zoom)), which is linear in zoom for a zoom lens. Every array is indexed by zoom
+    # (index 0 unused), so lookups are O(1).
+    MAX_ZOOM = 20
+
+    # uncalibrated default, FOV / zoom (FOVS_16092601 style table: half FOVs)
+    DEFAULT_HALF_FOVS = {1: (62.5000/2, 34.5000/2), 2: (62.5000/4, 34.5000/4), 4: (62.5000/8, 34.5000/8), 8: (62.5000/16, 34.5000/16),
+        12: (62.5000/24, 34.5000/24), 16: (62.5000/32, 34.5000/32), 20: (62.5000/40, 34.5000/40)}
+    # pan/tilt speed (pulse/sec) per zoom
+    # SPEED = 12000 # full speed: 120000, half speed: 600000
+    # SPEEDS = list(map(lambda idx: int(120000 * self.FOVS[idx-1][0]/self.FOVS[0][0]), list(range(0,21))))
+    DEFAULT_SPEEDS = {1: 60000, 2: 30000, 4: 30000, 8: 15000, 12: 10000, 16: 7500, 20: 6000}
+
+    def __init__(self, half_fovs = None, speeds = None, screen_width = 640, degree_per_pulse = 0.00048):
+        # half_fovs: {zoom: (half_fov_x, half_fov_y)} or a list indexed by zoom - 1 like Motor.FOVS
+        # speeds: {zoom: pulse/sec}
+        self.half_fovs_table = self.to_dict(half_fovs if half_fovs is not None else self.DEFAULT_HALF_FOVS)
+        self.speeds_table = self.to_dict(speeds if speeds is not None else self.DEFAULT_SPEEDS)
+        self.screen_width = screen_width
+        self.degree_per_pulse = degree_per_pulse
+        self.build()
+
+    @staticmethod
+    def to_dict(table):
+        if isinstance(table, dict):
+            items = table.items()
+        else:
+            items = enumerate(table, 1)
+        return {int(zoom): value for (zoom, value) in items if np.all(np.asarray(value) > 0)}
+
+    def build(self):
+        zooms = np.arange(self.MAX_ZOOM + 1)
+        zooms[0] = 1
+
+        known = sorted(self.half_fovs_table)
+        fovs = np.array([self.half_fovs_table[z] for z in known], dtype=np.float64)
+        magnification = fovs[0] / fovs # x and y
+        self.half_fov = np.empty((self.MAX_ZOOM + 1, 2))
+        for axis in range(2):
+            self.half_fov[:, axis] = fovs[0, axis] / np.interp(zooms, known, magnification[:, axis])
+
+        screen = np.array([self.screen_width // 2, int(self.screen_width * 9 / 16) // 2], dtype=np.float64)
+        self.pulse_per_pixel = self.half_fov / screen / self.degree_per_pulse
+        self.normalized_length = self.half_fov[1, 0] / self.half_fov[:, 0] # object length relative to x1
+
+        known = sorted(self.speeds_table)
+        self.speeds = np.interp(zooms, known, [self.speeds_table[z] for z in known]).astype(np.int64)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        # JSON: {"half_fovs": {"1": [31.25, 17.25], ...}, "speeds": {"1": 60000, ...}, "degree_per_pulse": 0.00048}
+        with open(path) as f:
+            table = json.load(f)
+        if 'degree_per_pulse' in table:
+            kwargs.setdefault('degree_per_pulse', table['degree_per_pulse'])
+        return cls(table['half_fovs'], table.get('speeds'), **kwargs)
+
+    def save(self, path):
+        table = {'half_fovs': {str(z): list(fov) for (z, fov) in sorted(self.half_fovs_table.items())},
+            'speeds': {str(z): int(speed) for (z, speed) in sorted(self.speeds_table.items())},
+            'degree_per_pulse': self.degree_per_pulse}
+        with open(path, 'w') as f:
+            json.dump(table, f, indent = 2)
+
+    @property
+    def half_fovs(self):
+        # Motor.FOVS layout: list of (half_fov_x, half_fov_y) indexed by zoom - 1
+        return [tuple(fov) for fov in self.half_fov[1:]]
+
+    def pixel_to_pulse(self, x_px, y_px, zoom = 1):
+        ppp = self.pulse_per_pixel[zoom]
+        return int(x_px * ppp[0]), int(y_px * ppp[1])
@@ -0,0 +1,2 @@
+from .bounded_queue import BoundedQueue
+from .stage import Stage
@@ -0,0 +1,61 @@
+from collections import deque
+from threading import Condition
+
+class BoundedQueue:
+    # Queue between pipeline stages. When it is full:
+    #   'block'       - put() waits for the consumer
+    #   'drop_oldest' - the oldest item is discarded (consumer always gets the latest results)
+    #   'drop_newest' - the new item is discarded
+    # Items must not be None: get() returns None on timeout or once the queue is closed.
+    POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+    def __init__(self, maxsize = 1, policy = 'drop_oldest'):
+        assert policy in self.POLICIES
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0
+        self.condition = Condition()
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item, timeout = None):
+        with self.condition:
+            if self.closed:
+                return False
+
+            if len(self.items) >= self.maxsize:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                elif self.policy == 'drop_oldest':
+                    self.items.popleft()
+                    self.dropped += 1
+                elif not self.condition.wait_for(lambda: self.closed or len(self.items) < self.maxsize, timeout) or self.closed:
+                    self.dropped += 1
+                    return False
+
+            self.items.append(item)
+            self.put_count += 1
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout = None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.closed or len(self.items) > 0, timeout):
+                return None
+            if len(self.items) == 0: # closed
+                return None
+
+            item = self.items.popleft()
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
@@ -0,0 +1,45 @@
+import traceback
+from threading import Thread
+
+class Stage:
+    # Worker thread calling func(item) for every item of 'input'.
+    # A result that is not None is passed on to 'output' (if any).
+    # An exception in func is printed and counted in 'errors', the stage goes on with the next item
+    # (a dead worker would leave its producers blocked on, or dropping into, a queue nobody reads).
+    def __init__(self, name, func, input, output = None):
+        self.name = name
+        self.func = func
+        self.input = input
+        self.output = output
+        self.processed = 0
+        self.errors = 0
+        self.thread = Thread(target = self.run, name = name)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        while True:
+            item = self.input.get()
+            if item is None: # input closed
+                break
+
+            try:
+                result = self.func(item)
+            except Exception:
+                self.errors += 1
+                print("[{}] Error in stage, item skipped:".format(self.name.upper()))
+                traceback.print_exc()
+                continue
+            self.processed += 1
+            if result is not None and self.output is not None:
+                self.output.put(result)
+
+        if self.output is not None:
+            self.output.close()
+
+    def stop(self, timeout = 1):
+        self.input.close()
+        self.thread.join(timeout)
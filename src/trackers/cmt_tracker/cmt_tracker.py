@@ -3,6 +3,7 @@ import cv2
 import numpy as np
 import imutils
 from utils import util
+from utils.keypoint_set import KeypointSet
 
 import itertools
 import scipy.spatial
@@ -122,11 +123,10 @@ class CMTTracker:
             # Set start image for tracking
             self.gray0 = gray
 
-            # Make keypoints 'active' keypoints
-            self.active_keypoints = np.copy(selected_keypoints)
-
-            # Attach class information to active keypoints
-            self.active_keypoints = np.hstack((selected_keypoints, self.selected_classes[:, None]))
+            # Make keypoints 'active' keypoints, with class information attached
+            self.active_set = KeypointSet(capacity = 4 * num_selected_keypoints, num_classes = num_selected_keypoints)
+            self.active_set.extend(selected_keypoints, self.selected_classes)
+            self.active_keypoints = self.active_set.keypoints
 
             # Remember number of initial keypoints
             self.num_initial_keypoints = len(selected_keypoints_cv)
@@ -158,7 +158,10 @@ class CMTTracker:
         keypoints_cv, features = self.descriptor.compute(gray, keypoints_cv)
 
         # Create list of active keypoints
-        active_keypoints = np.zeros((0, 3))
+        # (one row per class: a later match of the same class replaces the earlier one)
+        active = self.active_set
+        active.clear()
+        active.reserve(len(keypoints_cv) + len(tracked_keypoints))
 
         # Get the best two matches for each feature
         matches_all = self.matcher.knnMatch(features, self.features_database, 2)
@@ -205,8 +208,7 @@ class CMTTracker:
                 if ratio < self.THR_RATIO and combined[0] > self.THR_CONF and keypoint_class != 0:
                     # print('[CMT] {}: {}: combined {}: ratio: {}, Class[{}] => {}'.format(i, location, combined[0], ratio, bestInd, keypoint_class))
                     # Add keypoint to active keypoints
-                    new_kpt = np.append(location, keypoint_class)
-                    active_keypoints = np.append(active_keypoints, np.array([new_kpt]), axis=0)
+                    active.put(location[0], location[1], keypoint_class)
 
                 # In a second step, try to match difficult keypoints
                 # If structural constraints are applicable
@@ -250,35 +252,18 @@ class CMTTracker:
 
                     # If distance ratio is ok and absolute distance is ok and keypoint class is not background
                     if ratio < self.THR_RATIO and combined[bestInd] > self.THR_CONF and keypoint_class != 0:
-                        # Add keypoint to active keypoints
-                        new_kpt = np.append(location, keypoint_class)
-
-                        # Check whether same class already exists
-                        if active_keypoints.size > 0:
-                            same_class = np.nonzero(active_keypoints[:, 2] == keypoint_class)
-                            active_keypoints = np.delete(active_keypoints, same_class, axis=0)
-
-                        active_keypoints = np.append(active_keypoints, np.array([new_kpt]), axis=0)
+                        # Add keypoint to active keypoints, replacing the same class if it already exists
+                        active.put(location[0], location[1], keypoint_class)
 
-        # If some keypoints have been tracked
+        # If some keypoints have been tracked, add all tracked keypoints that have not been matched
         if tracked_keypoints.size > 0:
-            # Extract the keypoint classes
-            tracked_classes = tracked_keypoints[:, 2]
-
-            # If there already are some active keypoints
-            if active_keypoints.size > 0:
-                # Add all tracked keypoints that have not been matched
-                associated_classes = active_keypoints[:, 2]
-                missing = ~np.in1d(tracked_classes, associated_classes)
-                active_keypoints = np.append(active_keypoints, tracked_keypoints[missing, :], axis=0)
-            else: # Else use all tracked keypoints
-                active_keypoints = tracked_keypoints
+            active.merge_missing(tracked_keypoints)
 
         self.center = center
         self.scale_estimate = scale_estimate
         self.rotation_estimate = rotation_estimate
         self.tracked_keypoints = tracked_keypoints
-        self.active_keypoints = active_keypoints
+        self.active_keypoints = active.keypoints # view into active_set, valid until the next update()
         self.gray0 = gray
         self.frame_idx += 1
 
@@ -2,22 +2,84 @@
 import cv2
 import numpy as np
 from utils import util
+from utils import blobs
 
 class ColorTracker():
 
     CENTER_DISPLACEMENT = 50
     LOST_CONDITION = 150 # 30ms * 100 = 3 sec
     FOUND_CONDITION = 2
+    MERGE_SIZE = 11 # blobs closer than this are one blob (was the (11, 11) blur before findContours)
+    SEARCH_RATIO = 3.0 # search window around the last blob when no region is given
+    MIN_SEARCH_SIZE = 32
+
+    # HSV ranges (lower, upper) for cv2.inRange
+    COLORS = {
+        'red': ([0, 150, 100], [5, 255, 255]),
+        'red2': ([165, 90, 90], [180, 255, 255]),
+        'yellow': ([15, 120, 120], [35, 255, 255]),
+    }
+
+    def __init__(self, colors = ('red',)):
+        # colors: names in COLORS, a pixel in any of them belongs to the target
+        self.ranges = [tuple(np.array(bound, dtype = "uint8") for bound in self.COLORS[color]) for color in colors]
+        (self.lower, self.upper) = self.ranges[0]
+        self.box = None # (x, y, w, h) of the last blob found
+
+    def threshold(self, image):
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        # hsv[:,:,2] = cv2.equalizeHist(hsv[:,:,2])
+
+        binary = cv2.inRange(hsv, self.lower, self.upper)
+        for (lower, upper) in self.ranges[1:]:
+            cv2.bitwise_or(binary, cv2.inRange(hsv, lower, upper), dst = binary)
+        return binary
+
+    def find_blobs(self, frame, x1, y1, x2, y2):
+        # Only (x1, y1)-(x2, y2) (inclusive, as cv2.rectangle) is converted and thresholded.
+        # A margin is kept for the merge so that the result is the same as masking the full frame.
+        # Blob stats (see blobs.find_blobs()) are in frame coordinates, largest first.
+        (frame_height, frame_width) = frame.shape[:2]
+        x1 = max(x1, 0)
+        y1 = max(y1, 0)
+        x2 = min(x2 + 1, frame_width)
+        y2 = min(y2 + 1, frame_height)
+        if x2 <= x1 or y2 <= y1:
+            return np.empty((0, 5), dtype=np.int32)
+
+        margin = self.MERGE_SIZE // 2
+        rx1 = max(x1 - margin, 0)
+        ry1 = max(y1 - margin, 0)
+        rx2 = min(x2 + margin, frame_width)
+        ry2 = min(y2 + margin, frame_height)
+
+        binary = self.threshold(frame[ry1:ry2, rx1:rx2])
+        binary[:y1 - ry1] = 0
+        binary[y2 - ry1:] = 0
+        binary[:, :x1 - rx1] = 0
+        binary[:, x2 - rx1:] = 0
+        # cv2.imshow('Binary', binary)
+
+        (stats, _) = blobs.find_blobs(binary, merge = self.MERGE_SIZE, offset = (rx1, ry1))
+        return stats
+
+    def enlarged_region(self, frame, x1, y1, x2, y2, ratio):
+        # the selection and its enlarged version (both corner orders, as filled by cv2.rectangle)
+        (ex1, ey1), (ex2, ey2) = util.selection_enlarged(frame[:, :, 0], x1, y1, x2, y2, ratio=ratio)
+        return min(x1, x2, ex1, ex2), min(y1, y2, ey1, ey2), max(x1, x2, ex1, ex2), max(y1, y2, ey1, ey2)
+
+    def search_region(self, frame):
+        # around the last blob while it is being tracked, the full frame (fallback) once it is lost
+        (frame_height, frame_width) = frame.shape[:2]
+        if self.box is None or self.consecutive_lost > 0:
+            return 0, 0, frame_width, frame_height
+
+        (x, y, w, h) = self.box
+        half_w = max(int(w * self.SEARCH_RATIO), self.MIN_SEARCH_SIZE) // 2
+        half_h = max(int(h * self.SEARCH_RATIO), self.MIN_SEARCH_SIZE) // 2
+        (cx, cy) = (x + w // 2, y + h // 2)
+        return cx - half_w, cy - half_h, cx + half_w, cy + half_h
 
-    def __init__(self):
-        # red
-        self.lower = np.array([0, 150, 100], dtype = "uint8")
-        self.upper = np.array([5, 255, 255], dtype = "uint8")
-        # self.lower = np.array([165, 90, 90], dtype = "uint8")
-        # self.upper = np.array([180, 255, 255], dtype = "uint8")
-        # yellow
-        # self.lower = np.array([15, 120, 120], dtype = "uint8")
-        # self.upper = np.array([35, 255, 255], dtype = "uint8")
     def init(self, frame, options):
         x1 = options['x1']
         x2 = options['x2']
@@ -26,24 +88,12 @@ class ColorTracker():
         self.consecutive_lost = 0
         self.consecutive_found = 0
 
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        # hsv[:,:,2] = cv2.equalizeHist(hsv[:,:,2])
-
-        mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
-        cv2.rectangle(mask, (x1, y1), (x2, y2), 255, -1)
-        (x1, y1), (x2, y2) = util.selection_enlarged(mask, x1, y1, x2, y2, ratio=1.5)
-        cv2.rectangle(mask, (x1, y1), (x2, y2), 255, -1)
-        hsv = cv2.bitwise_and(hsv, hsv, mask=mask)
-
-        binary = cv2.inRange(hsv, self.lower, self.upper)
-        binary = cv2.GaussianBlur(binary, (11, 11), 0)
-        # cv2.imshow('Binary', binary)
-
-        (_, contours, _) = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if len(contours) > 0:
-            contour = sorted(contours, key=cv2.contourArea, reverse=True)[0]
+        self.box = None
 
-            (x, y, w, h) = cv2.boundingRect(contour)
+        stats = self.find_blobs(frame, *self.enlarged_region(frame, x1, y1, x2, y2, ratio=1.5))
+        if len(stats) > 0:
+            (x, y, w, h) = stats[0, :4]
+            self.box = (x, y, w, h)
             # cv2.rectangle(frame, (x,y), (x+w, y+h), (255,0,0), 2)
 
             self.center = np.int32([x + w//2, y + h//2])
@@ -60,40 +110,28 @@ class ColorTracker():
             return False
 
 
-    def update(self, frame, options = {'x1': 0, 'y1':0, 'x2': 640, 'y2': 360}):
-        x1 = options['x1']
-        x2 = options['x2']
-        y1 = options['y1']
-        y2 = options['y2']
-
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        # hsv[:,:,2] = cv2.equalizeHist(hsv[:,:,2])
-
-        mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
-        cv2.rectangle(mask, (x1, y1), (x2, y2), 255, -1)
-        (x1, y1), (x2, y2) = util.selection_enlarged(mask, x1, y1, x2, y2, ratio=1.0)
-        cv2.rectangle(mask, (x1, y1), (x2, y2), 255, -1)
-        hsv = cv2.bitwise_and(hsv, hsv, mask=mask)
-
-        binary = cv2.inRange(hsv, self.lower, self.upper)
-        binary = cv2.GaussianBlur(binary, (11, 11), 0)
-
-        (_, contours, _) = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        # print("[COLOR] I found {} contours".format(len(contours)))
-        cv2.drawContours(frame, contours, -1, (255, 0, 0), 1)
-
-        num_of_contours = len(contours)
-        if num_of_contours > 0:
-            sorted_contours = sorted(contours, key=cv2.contourArea, reverse=True)
-            contour_largest = sorted_contours[0]
-
-            (x0, y0, w0, h0) = cv2.boundingRect(contour_largest)
+    def update(self, frame, options = None):
+        # options: region to search ({'x1', 'y1', 'x2', 'y2'}), default: see search_region()
+        if options is None:
+            (x1, y1, x2, y2) = self.search_region(frame)
+        else:
+            x1 = options['x1']
+            x2 = options['x2']
+            y1 = options['y1']
+            y2 = options['y2']
+            (x1, y1, x2, y2) = self.enlarged_region(frame, x1, y1, x2, y2, ratio=1.0)
+
+        stats = self.find_blobs(frame, x1, y1, x2, y2)
+        # print("[COLOR] I found {} blobs".format(len(stats)))
+
+        num_of_blobs = len(stats)
+        if num_of_blobs > 0:
+            (x0, y0, w0, h0) = stats[0, :4]
             center0 = np.int32([x0 + w0//2, y0 + h0//2])
             dist0 = util.distance(center0, self.center)
 
-            if num_of_contours > 1:
-                contour_second_largest = sorted_contours[1]
-                (x1, y1, w1, h1) = cv2.boundingRect(contour_second_largest)
+            if num_of_blobs > 1:
+                (x1, y1, w1, h1) = stats[1, :4]
                 center1 = np.int32([x1 + w1//2, y1 + h1//2])
                 dist1 = util.distance(center1, self.center)
             else:
@@ -104,11 +142,13 @@ class ColorTracker():
             # print("[COLOR] prev center({}) to largest({}) and to the next largest({})".format(self.cener, dist0, dist1))
             if dist0 <= dist1: # and dist0 < self.CENTER_DISPLACEMENT:
                 self.center = center0
+                self.box = (x0, y0, w0, h0)
                 # cv2.rectangle(frame, (x0,y0), (x0+w0, y0+h0), (255,0,0), 2)
                 self.consecutive_lost = 0
                 self.consecutive_found += 1
             else: # elif dist0 > dist1: # and dist1 < self.CENTER_DISPLACEMENT:
                 self.center = center1
+                self.box = (x1, y1, w1, h1)
                 # cv2.rectangle(frame, (x1,y1), (x1+w1, y1+h1), (255,0,0), 2)
                 self.consecutive_lost = 0
                 self.consecutive_found += 1
@@ -1 +1,2 @@
 from .kcf_tracker import KCFTracker
+from .redetector import Redetector
@@ -1,5 +1,6 @@
 import numpy as np
 import cv2
+from collections import deque
 
 import sys
 PY3 = sys.version_info[0] == 3
@@ -97,6 +98,8 @@ def subwindow(img, window, borderType=cv2.BORDER_CONSTANT):
 # KCF tracker
 class KCFTracker:
     PREV_HISTORY_SIZE = 10
+    SNAPSHOT_SIZE = 4 # model snapshots kept for restore()
+    SNAPSHOT_INTERVAL = 30 # frames between snapshots
 
     def __init__(self, hog=False, fixed_window=True, multiscale=False):
         self.lambdar = 0.0001   # regularization
@@ -139,6 +142,9 @@ class KCFTracker:
         self._tmpl = None  # numpy.ndarray    raw: (size_patch[0], size_patch[1])   hog: (size_patch[2], size_patch[0]*size_patch[1])
         self.hann = None  # numpy.ndarray    raw: (size_patch[0], size_patch[1])   hog: (size_patch[2], size_patch[0]*size_patch[1])
 
+        self.snapshots = deque(maxlen = self.SNAPSHOT_SIZE)  # model states of confident frames, see take_snapshot()
+        self.snapshot_count = 0
+
     def subPixelPeak(self, left, center, right):
         divisor = 2*center - right - left   #float
         return (0 if abs(divisor)<1e-3 else 0.5*(right-left)/divisor)
@@ -419,3 +425,83 @@ class KCFTracker:
         # hl1sqi
         self.peak_value = peak_value
         return self._roi, loc
+
+    def take_snapshot(self, force = False):
+        # Keeps the current model (one every SNAPSHOT_INTERVAL calls unless forced), call it on confident frames.
+        # train() rebinds _tmpl and _alphaf, the arrays are never modified in place: no copies needed.
+        self.snapshot_count += 1
+        if not force and len(self.snapshots) > 0 and self.snapshot_count < self.SNAPSHOT_INTERVAL:
+            return False
+        self.snapshot_count = 0
+
+        self.snapshots.append({
+            'tmpl': self._tmpl, 'alphaf': self._alphaf, 'prob': self._prob, 'hann': self.hann,
+            'tmpl_sz': list(self._tmpl_sz), 'size_patch': list(self.size_patch), 'scale': self._scale,
+            'size': (self._roi[2], self._roi[3])})
+        return True
+
+    def restore(self, image, blend = 0.0, min_peak = 0.3):
+        # Re-initialization from the snapshot that responds best at the box (x1, y1, x2, y2), instead of init():
+        # the snapshot size is scaled to the box area, the box only gives the position and the scale.
+        # blend > 0 trains the restored model with the new patch as update() does with interp_factor.
+        # Returns False (model unchanged) without snapshots or when no snapshot peaks above min_peak.
+        if len(self.snapshots) == 0:
+            return False
+
+        state = (self._tmpl, self._alphaf, self._prob, self.hann, self._tmpl_sz, self.size_patch, self._scale, self._roi)
+        cx = (self.x1 + self.x2) / 2.0
+        cy = (self.y1 + self.y2) / 2.0
+        area = max((self.x2 - self.x1) * (self.y2 - self.y1), 1)
+
+        best = None
+        for snapshot in self.snapshots:
+            (w, h) = snapshot['size']
+            ratio = np.sqrt(area / (w * h))
+            self._tmpl = snapshot['tmpl']
+            self._alphaf = snapshot['alphaf']
+            self._prob = snapshot['prob']
+            self.hann = snapshot['hann']
+            self._tmpl_sz = list(snapshot['tmpl_sz'])
+            self.size_patch = list(snapshot['size_patch'])
+            self._scale = snapshot['scale'] * ratio
+            self._roi = [cx - w * ratio / 2.0, cy - h * ratio / 2.0, w * ratio, h * ratio]
+
+            loc, peak_value = self.detect(self._tmpl, self.getFeatures(image, 0, 1.0))
+            if best is None or peak_value > best[0]:
+                best = (peak_value, loc, snapshot, ratio)
+
+        (peak_value, loc, snapshot, ratio) = best
+        if peak_value < min_peak:
+            (self._tmpl, self._alphaf, self._prob, self.hann, self._tmpl_sz, self.size_patch, self._scale, self._roi) = state
+            return False
+
+        (w, h) = snapshot['size']
+        self._tmpl = snapshot['tmpl']
+        self._alphaf = snapshot['alphaf']
+        self._prob = snapshot['prob']
+        self.hann = snapshot['hann']
+        self._tmpl_sz = list(snapshot['tmpl_sz'])
+        self.size_patch = list(snapshot['size_patch'])
+        self._scale = snapshot['scale'] * ratio
+        self._roi = [cx - w * ratio / 2.0 + loc[0]*self.cell_size*self._scale, cy - h * ratio / 2.0 + loc[1]*self.cell_size*self._scale, w * ratio, h * ratio]
+
+        if blend > 0:
+            self.train(self.getFeatures(image, 0, 1.0), blend)
+
+        self.force_init_flag = False
+        self.peak_value = peak_value
+
+        self.x1 = int(self._roi[0])
+        self.y1 = int(self._roi[1])
+        self.x2 = int(self._roi[0] + self._roi[2])
+        self.y2 = int(self._roi[1] + self._roi[3])
+        self.center = ((self.x1 + self.x2) // 2, (self.y1 + self.y2) // 2)
+
+        self.mean_width = self.x2 - self.x1
+        self.mean_height = self.y2 - self.y1
+
+        self.prev_widths = np.array([self.mean_width], dtype=np.int16)
+        self.prev_heights = np.array([self.mean_height], dtype=np.int16)
+
+        self.enable = True
+        return True
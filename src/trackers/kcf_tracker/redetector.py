@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+from collections import deque
+
+class Redetector:
+    # Global re-detection after KCF lost the target: a small bank of gray exemplars of the target, learned
+    # from confident KCF boxes, searched over the whole frame coarse-to-fine.
+    #   coarse: normalized correlation (cv2.matchTemplate, DFT based for large templates) of every exemplar
+    #           on a downscaled frame, a few best peaks per exemplar
+    #   fine:   the same at full resolution in a small window around every peak
+    # detect() returns candidates [(score, (x1, y1, x2, y2)), ...], best first, within a single frame.
+    BANK_SIZE = 5
+    LEARN_INTERVAL = 15 # frames between exemplars
+    MIN_COARSE_SIZE = 8 # pixels, smallest exemplar side at the coarse scale
+
+    def __init__(self, coarse_scale = 0.25, candidates = 3, zoom_model = None):
+        self.coarse_scale = coarse_scale
+        self.candidates = candidates
+        self.zoom_model = zoom_model
+        self.bank = deque(maxlen = self.BANK_SIZE) # (full resolution gray patch, zoom)
+        self.learn_count = 0
+        self.gray = None
+
+    def clear(self):
+        self.bank.clear()
+        self.learn_count = 0
+
+    def learn(self, frame, box, zoom = 1):
+        # box: (x1, y1, x2, y2) of a confident KCF result; one exemplar every LEARN_INTERVAL calls
+        self.learn_count += 1
+        if len(self.bank) > 0 and self.learn_count < self.LEARN_INTERVAL:
+            return False
+        self.learn_count = 0
+
+        (h, w) = frame.shape[:2]
+        (x1, y1, x2, y2) = (max(int(box[0]), 0), max(int(box[1]), 0), min(int(box[2]), w), min(int(box[3]), h))
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return False
+
+        patch = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        self.bank.append((patch, zoom))
+        return True
+
+    def exemplar(self, patch, patch_zoom, zoom):
+        # exemplar at the current zoom: the target looks larger by the magnification ratio
+        if self.zoom_model is None or patch_zoom == zoom:
+            return patch
+
+        ratio = self.zoom_model.normalized_length[zoom] / self.zoom_model.normalized_length[patch_zoom]
+        size = (max(int(patch.shape[1] * ratio), 4), max(int(patch.shape[0] * ratio), 4))
+        return cv2.resize(patch, size, interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR)
+
+    def detect(self, frame, zoom = 1):
+        if len(self.bank) == 0:
+            return []
+
+        if self.gray is None or self.gray.shape != frame.shape[:2]:
+            self.gray = np.empty(frame.shape[:2], dtype = np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst = self.gray)
+        (h, w) = self.gray.shape
+
+        small_images = {} # scale -> downscaled frame, shared by the exemplars
+        results = []
+        for (patch, patch_zoom) in self.bank:
+            template = self.exemplar(patch, patch_zoom, zoom)
+            (th, tw) = template.shape
+            if tw > w or th > h:
+                continue
+
+            # small exemplars are searched at a finer coarse scale
+            scale = min(max(self.coarse_scale, self.MIN_COARSE_SIZE / float(min(tw, th))), 1.0)
+            if scale < 1.0:
+                small = small_images.get(scale)
+                if small is None:
+                    small = small_images[scale] = cv2.resize(self.gray, (int(w * scale), int(h * scale)), interpolation = cv2.INTER_AREA)
+                small_template = cv2.resize(template, (max(int(tw * scale), 1), max(int(th * scale), 1)), interpolation = cv2.INTER_AREA)
+                response = cv2.matchTemplate(small, small_template, cv2.TM_CCOEFF_NORMED)
+            else:
+                response = cv2.matchTemplate(self.gray, template, cv2.TM_CCOEFF_NORMED)
+
+            for (cx, cy) in self.peaks(response, small_template.shape if scale < 1.0 else template.shape):
+                if scale < 1.0:
+                    results.append(self.refine(template, cx / scale, cy / scale, 1.0 / scale))
+                else:
+                    results.append((float(response[cy, cx]), (cx, cy, cx + tw, cy + th)))
+
+        results.sort(key = lambda result: -result[0])
+        return self.suppress(results)[:self.candidates]
+
+    def peaks(self, response, template_shape):
+        # best 'candidates' maxima, each one masks out a template sized neighborhood
+        response = response.copy()
+        (th, tw) = template_shape[:2]
+        peaks = []
+        for _ in range(self.candidates):
+            (_, value, _, (x, y)) = cv2.minMaxLoc(response)
+            if value <= 0:
+                break
+            peaks.append((x, y))
+            response[max(y - th // 2, 0):y + th // 2 + 1, max(x - tw // 2, 0):x + tw // 2 + 1] = -1
+        return peaks
+
+    def refine(self, template, x, y, margin):
+        # full resolution match in the coarse peak +- 'margin' (one coarse pixel and a bit)
+        (h, w) = self.gray.shape
+        (th, tw) = template.shape
+        margin = int(np.ceil(margin)) + 1
+        x1 = min(max(int(x) - margin, 0), w - tw)
+        y1 = min(max(int(y) - margin, 0), h - th)
+        x2 = min(int(x) + margin + tw, w)
+        y2 = min(int(y) + margin + th, h)
+
+        response = cv2.matchTemplate(self.gray[y1:y2, x1:x2], template, cv2.TM_CCOEFF_NORMED)
+        (_, score, _, (px, py)) = cv2.minMaxLoc(response)
+        return float(score), (x1 + px, y1 + py, x1 + px + tw, y1 + py + th)
+
+    @staticmethod
+    def suppress(results):
+        # drop candidates whose center falls in a better one (several exemplars find the same target)
+        kept = []
+        for (score, box) in results:
+            cx = (box[0] + box[2]) / 2.0
+            cy = (box[1] + box[3]) / 2.0
+            if all(not (b[0] <= cx <= b[2] and b[1] <= cy <= b[3]) for (_, b) in kept):
+                kept.append((score, box))
+        return kept
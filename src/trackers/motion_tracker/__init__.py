@@ -1 +1,3 @@
 from .motion_tracker import MotionTracker
+from .background_model import BackgroundModel
+from .global_motion import GlobalMotion
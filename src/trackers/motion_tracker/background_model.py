@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+
+class BackgroundModel:
+    # Running average background of a downscaled, blurred gray image.
+    # Buffers are allocated on the first frame and updated in place, the foreground mask
+    # (same downscaled size) is available on every frame once 'warmup' frames have been seen.
+    def __init__(self, scale = 0.25, alpha = 0.05, threshold = 10, warmup = 15, blur = (5, 5)):
+        self.scale = scale
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.blur = blur
+        self.count = 0
+        self.gray = None
+        self.foreground = None
+
+    def allocate(self, frame):
+        (h, w) = frame.shape[:2]
+        self.size = (max(int(w * self.scale), 1), max(int(h * self.scale), 1))
+        self.gray = np.empty((h, w), dtype=np.uint8)
+        self.small = np.empty((self.size[1], self.size[0]), dtype=np.uint8)
+        self.average = np.zeros(self.small.shape, dtype=np.float32)
+        self.background = np.empty_like(self.small)
+        self.diff = np.empty_like(self.small)
+        self.foreground = np.zeros_like(self.small)
+
+    def reset(self):
+        # e.g. while the camera moves, the average starts over from the next frame
+        self.count = 0
+
+    @property
+    def ready(self):
+        return self.count >= self.warmup
+
+    def apply(self, frame):
+        if self.gray is None or self.gray.shape != frame.shape[:2]:
+            self.allocate(frame)
+
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        cv2.resize(self.gray, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self.small, self.blur, 0, dst=self.small)
+
+        if self.count == 0:
+            self.average[...] = self.small
+        else:
+            cv2.convertScaleAbs(self.average, dst=self.background)
+            cv2.absdiff(self.small, self.background, dst=self.diff)
+            cv2.threshold(self.diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self.foreground)
+            # plain mean while warming up, running average after that
+            cv2.accumulateWeighted(self.small, self.average, max(self.alpha, 1.0 / (self.count + 1)))
+        self.count += 1
+
+        return self.foreground
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+class GlobalMotion:
+    # Image translation between two gray frames (the camera pan/tilt), from sparse LK flow of a fixed grid
+    # of points on a downscaled image: the median of the tracked points is robust to a moving target
+    # covering a few of them.
+    # 'hint' is the predicted shift (e.g. Motor.image_shift() from the pulses sent), used as the initial
+    # flow so that fast pans stay in the pyramid search range, and returned as is when too few points
+    # could be tracked (no texture).
+    def __init__(self, scale = 0.5, grid = (16, 9), win_size = (15, 15), max_level = 2, min_points = 8):
+        self.scale = scale
+        self.grid = grid
+        self.min_points = min_points
+        self.lk_params = dict(winSize = win_size, maxLevel = max_level,
+            criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.size = None
+
+    def allocate(self, shape):
+        (h, w) = shape[:2]
+        self.size = (max(int(w * self.scale), 1), max(int(h * self.scale), 1))
+        self.prev_small = np.empty((self.size[1], self.size[0]), dtype=np.uint8)
+        self.small = np.empty_like(self.prev_small)
+
+        # grid cell centers, away from the border by half a cell
+        xs = (np.arange(self.grid[0]) + 0.5) * self.size[0] / self.grid[0]
+        ys = (np.arange(self.grid[1]) + 0.5) * self.size[1] / self.grid[1]
+        self.points = np.array([(x, y) for y in ys for x in xs], dtype=np.float32).reshape(-1, 1, 2)
+        self.shape = shape[:2]
+
+    def estimate(self, prev_gray, gray, hint = None):
+        # (dx, dy) in pixels of 'gray': gray(x + dx, y + dy) ~ prev_gray(x, y)
+        if self.size is None or self.shape != gray.shape[:2]:
+            self.allocate(gray.shape)
+
+        cv2.resize(prev_gray, self.size, dst=self.prev_small, interpolation=cv2.INTER_AREA)
+        cv2.resize(gray, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+
+        if hint is not None:
+            guess = self.points + np.float32(hint) * self.scale
+            flags = cv2.OPTFLOW_USE_INITIAL_FLOW
+        else:
+            guess = self.points.copy()
+            flags = 0
+
+        (moved, status, _) = cv2.calcOpticalFlowPyrLK(self.prev_small, self.small, self.points, guess, flags = flags, **self.lk_params)
+        good = status.ravel() == 1
+        if np.count_nonzero(good) < self.min_points:
+            return tuple(hint) if hint is not None else (0.0, 0.0)
+
+        (dx, dy) = np.median((moved - self.points)[good].reshape(-1, 2), axis=0) / self.scale
+        return float(dx), float(dy)
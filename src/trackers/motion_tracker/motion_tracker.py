@@ -3,17 +3,50 @@ import cv2
 import numpy as np
 import imutils
 from utils import util
+from utils import blobs
+from trackers.motion_tracker.background_model import BackgroundModel
+from trackers.motion_tracker.global_motion import GlobalMotion
 import itertools
 
 class MotionTracker:
-    def __init__(self):
-        self.interval = 100
+    MERGE_SIZE = 5 # in the background model scale, ~20 px in the frame as update()
+    MIN_AREA = 2
+
+    def __init__(self, scale = 0.25):
         self.motion_count = 0
+        self.background = BackgroundModel(scale = scale)
+        self.global_motion = GlobalMotion()
 
     def init(self, count):
         self.motion_count = count
 
-    def update(self, frame, prev_frame):
+    def feed(self, frame, moving = False):
+        # every frame: the background model restarts while the camera moves or zooms
+        if moving:
+            self.background.reset()
+        else:
+            self.background.apply(frame)
+
+    def check_ready(self):
+        # detect() as soon as the background model has settled
+        self.motion_count += 1
+        return self.background.ready
+
+    def detect(self):
+        # largest foreground region of the background model, in frame coordinates, as update()
+        self.motion_count = 0
+
+        (stats, _) = blobs.find_blobs(self.background.foreground, merge = self.MERGE_SIZE, min_area = self.MIN_AREA)
+        if len(stats) == 0:
+            return -1, -1, -1, -1
+
+        (x, y, w, h) = (stats[0, :4] / self.background.scale).astype(int).tolist()
+        (x1, y1), (x2, y2) = util.selection_enlarged(self.background.gray, x, y, x+w, y+h, ratio=0.8)
+        return x1, y1, x2, y2
+
+    def update(self, frame, prev_frame, shift = None):
+        # shift: camera moving, (dx, dy) pixels predicted from the motor (Motor.image_shift) or (0, 0).
+        # The global motion is estimated and prev_frame aligned to frame before differencing.
         self.motion_count = 0
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
@@ -21,43 +54,45 @@ class MotionTracker:
         gray = cv2.GaussianBlur(gray, (7,7), 0)
         prev_gray = cv2.GaussianBlur(prev_gray, (7,7), 0)
 
+        if shift is not None:
+            (dx, dy) = self.global_motion.estimate(prev_gray, gray, shift)
+            (h, w) = gray.shape[:2]
+            # the strip that came into view keeps the pixels of gray: no difference there
+            aligned = gray.copy()
+            cv2.warpAffine(prev_gray, np.float32([[1, 0, dx], [0, 1, dy]]), (w, h), dst=aligned,
+                flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_TRANSPARENT)
+            prev_gray = aligned
+
         diffed = cv2.absdiff(prev_gray, gray)
 
         # 아래의 파라메터는 설계 인자
         T1 = 10
         T2 = 50
         BLUR_SIZE = (3, 3)
+        MERGE_SIZE = 21 # was: contours drawn 10 thick, then an (11, 11) blur
+        BLOB_SCALE = 4 # the box is only a motion hint for KCF init, 4 px is precise enough
 
         (T, thresholded) = cv2.threshold(diffed, T1, 255, cv2.THRESH_BINARY)
         blurred = cv2.GaussianBlur(thresholded, BLUR_SIZE, 0)
         (T, rethresholded) = cv2.threshold(blurred, T2, 255, cv2.THRESH_BINARY)
-        (_, cnts, _) = cv2.findContours(rethresholded.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
 
         # mean_thresholded = cv2.adaptiveThreshold(diffed, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 11, 4)
         # blurred = cv2.GaussianBlur(mean_thresholded, BLUR_SIZE, 0)
         # (_, cnts, _) = cv2.findContours(mean_thresholded.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         # cv2.imshow('Compare', np.hstack((thresholded, rethresholded, mean_thresholded)))
 
-        # print("I count {} contours in this image".format(len(cnts)))
-        cv2.drawContours(frame, cnts, -1, (0, 0, 255), 10)
-        # for (i, c) in enumerate(cnts):
-        #     if cv2.contourArea(c) > 20:
-        #         cv2.drawContours(frame, [c], -1, (0, 0, 255), 10)
-
-        binary = cv2.inRange(frame, (0,0,255), (0,0,255))
-        binary = cv2.GaussianBlur(binary, (11, 11), 0)
-        (_, contours, _) = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if len(contours) > 0:
-            contour = sorted(contours, key=cv2.contourArea, reverse=True)[0]
-            (x, y, w, h) = cv2.boundingRect(contour)
+        # nearby blobs are merged by dilation, the largest one is the motion
+        (stats, _) = blobs.find_blobs(rethresholded, merge = MERGE_SIZE, scale = BLOB_SCALE)
+        # print("I count {} blobs in this image".format(len(stats)))
+        if len(stats) > 0:
+            (x, y, w, h) = stats[0, :4]
             # cv2.rectangle(frame, (x,y), (x+w, y+h), (255,0,0), 2)
             # rect = np.int32(cv2.boxPoints(cv2.minAreaRect(contour)))
             # cv2.drawContours(frame, [rect], -1, (0, 255, 0), 2)
             # cv2.imshow('Motion', frame)
             # return x, y, x+w, y+h
 
-            mask = np.zeros(frame.shape[:2], dtype=np.uint8)
-            (x1, y1), (x2, y2) = util.selection_enlarged(mask, x, y, x+w, y+h, ratio=0.8)
+            (x1, y1), (x2, y2) = util.selection_enlarged(rethresholded, x, y, x+w, y+h, ratio=0.8)
             # print(x, y, x+w, y+h, '=>', x1, y1, x2, y2)
             return x1, y1, x2, y2
         else:
@@ -87,7 +122,3 @@ class MotionTracker:
         #     self.cY = int(res[:,1].mean())
         #     self.x1 = self.cX - (self.w // 2)
         #     self.y1 = self.cY - (self.h // 2)
-
-    def check_interval(self):
-        self.motion_count += 1
-        return self.motion_count % self.interval == 0
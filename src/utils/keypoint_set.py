@@ -0,0 +1,89 @@
+import numpy as np
+
+class KeypointSet:
+    # (x, y, class) rows kept in a preallocated float32 buffer.
+    # class_rows maps a keypoint class to its row in the buffer (-1 if absent),
+    # so insert-or-replace by class is O(1) and no row is ever copied around.
+    def __init__(self, capacity = 256, num_classes = 0):
+        self.buffer = np.empty((capacity, 3), dtype=np.float32)
+        self.class_rows = np.full(num_classes + 1, -1, dtype=np.int32)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def keypoints(self):
+        # view, valid until the next clear()/reserve()
+        return self.buffer[:self.size]
+
+    def clear(self):
+        if self.size > 0:
+            self.class_rows[self.buffer[:self.size, 2].astype(np.intp)] = -1
+        self.size = 0
+
+    def reserve(self, capacity):
+        if capacity > self.buffer.shape[0]:
+            buffer = np.empty((max(capacity, 2 * self.buffer.shape[0]), 3), dtype=np.float32)
+            buffer[:self.size] = self.buffer[:self.size]
+            self.buffer = buffer
+
+    def put(self, x, y, keypoint_class):
+        # insert, or replace the location of an already active class
+        keypoint_class = int(keypoint_class)
+        row = self.class_rows[keypoint_class]
+        if row < 0:
+            if self.size == self.buffer.shape[0]:
+                self.reserve(self.size + 1)
+            row = self.size
+            self.class_rows[keypoint_class] = row
+            self.buffer[row, 2] = keypoint_class
+            self.size += 1
+
+        self.buffer[row, 0] = x
+        self.buffer[row, 1] = y
+
+    def extend(self, keypoints, classes = None):
+        # bulk insert of (x, y[, class]) rows, existing classes are replaced
+        keypoints = np.asarray(keypoints)
+        if keypoints.size == 0:
+            return
+
+        if classes is None:
+            classes = keypoints[:, 2]
+        classes = np.asarray(classes).astype(np.intp)
+
+        # last occurrence of a class wins, as with repeated put()
+        classes_rev = classes[::-1]
+        _, first_rev = np.unique(classes_rev, return_index=True)
+        keep = np.sort(len(classes) - 1 - first_rev)
+        keypoints = keypoints[keep]
+        classes = classes[keep]
+
+        rows = self.class_rows[classes]
+        present = rows >= 0
+        self.buffer[rows[present], :2] = keypoints[present, :2]
+
+        self.merge_missing(keypoints[~present, :2], classes[~present])
+
+    def merge_missing(self, keypoints, classes = None):
+        # bulk append of the rows whose class is not active yet (np.in1d replacement)
+        keypoints = np.asarray(keypoints)
+        if keypoints.size == 0:
+            return
+
+        if classes is None:
+            classes = keypoints[:, 2]
+        classes = np.asarray(classes).astype(np.intp)
+
+        missing = self.class_rows[classes] < 0
+        num_missing = np.count_nonzero(missing)
+        if num_missing == 0:
+            return
+
+        self.reserve(self.size + num_missing)
+        rows = np.arange(self.size, self.size + num_missing)
+        self.buffer[rows, :2] = keypoints[missing, :2]
+        self.buffer[rows, 2] = classes[missing]
+        self.class_rows[classes[missing]] = rows
+        self.size += num_missing
@@ -0,0 +1,113 @@
+from threading import Thread, Lock
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+class Metrics:
+    # Gauges, counters and summaries in the Prometheus text exposition format (version 0.0.4).
+    # set()/inc() are cheap dict stores meant for the tracking loop; collectors (fn(metrics)) run at
+    # scrape time for values that are only read then (stream counters, zoom level, StageProfiler).
+    def __init__(self, prefix = 'tracker'):
+        self.prefix = prefix
+        self.families = {} # name -> [type, help, {labels: value}]
+        self.collectors = []
+        self.lock = Lock() # new families and render()
+
+    def family(self, name, kind, help):
+        family = self.families.get(name)
+        if family is None:
+            with self.lock:
+                family = self.families.setdefault(name, [kind, help, {}])
+        return family
+
+    def set(self, name, value, help = '', **labels):
+        self.family(name, 'gauge', help)[2][tuple(sorted(labels.items()))] = value
+
+    def inc(self, name, amount = 1, help = '', **labels):
+        # counters end with _total
+        values = self.family(name, 'counter', help)[2]
+        key = tuple(sorted(labels.items()))
+        values[key] = values.get(key, 0) + amount
+
+    def set_counter(self, name, value, help = '', **labels):
+        # counter kept elsewhere (e.g. VideoStream.captured)
+        self.family(name, 'counter', help)[2][tuple(sorted(labels.items()))] = value
+
+    def set_summary(self, name, quantiles, total, count, help = '', **labels):
+        # quantiles: {0.5: value, ...}; total and count over the whole run
+        values = self.family(name, 'summary', help)[2]
+        for (quantile, value) in quantiles.items():
+            values[tuple(sorted(labels.items())) + (('quantile', str(quantile)),)] = value
+        values[('_sum',) + tuple(sorted(labels.items()))] = total
+        values[('_count',) + tuple(sorted(labels.items()))] = count
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    @staticmethod
+    def format_labels(labels):
+        if len(labels) == 0:
+            return ''
+        return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for (key, value) in labels) + '}'
+
+    def render(self):
+        for collector in self.collectors:
+            collector(self)
+
+        lines = []
+        with self.lock:
+            families = sorted(self.families.items())
+        for (name, (kind, help, values)) in families:
+            metric = '{}_{}'.format(self.prefix, name)
+            if help:
+                lines.append('# HELP {} {}'.format(metric, help))
+            lines.append('# TYPE {} {}'.format(metric, kind))
+            for (labels, value) in sorted(list(values.items()), key = lambda item: str(item[0])):
+                suffix = ''
+                if len(labels) > 0 and labels[0] in ('_sum', '_count'):
+                    (suffix, labels) = (labels[0], labels[1:])
+                lines.append('{}{}{} {}'.format(metric, suffix, self.format_labels(labels), float(value)))
+        return '\n'.join(lines) + '\n'
+
+def profiler_collector(profiler, name = 'stage_latency_seconds'):
+    # StageProfiler stages as one summary family, labelled by stage, in seconds
+    def collect(metrics):
+        for (stage, stats) in profiler.summary().items():
+            quantiles = {p / 100.0: stats['p{}'.format(p)] / 1000.0 for p in profiler.PERCENTILES}
+            metrics.set_summary(name, quantiles, stats['total'] / 1000.0, stats['count'],
+                help = 'Stage latency, quantiles over the last {} measurements'.format(profiler.capacity), stage = stage)
+    return collect
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # no line per scrape
+
+class MetricsServer:
+    # HTTP endpoint (GET /metrics) on its own daemon thread, localhost only by default
+    def __init__(self, metrics, port = 9100, host = '127.0.0.1'):
+        self.metrics = metrics
+        self.server = HTTPServer((host, port), MetricsHandler)
+        self.server.metrics = metrics
+        self.thread = Thread(target = self.server.serve_forever, name = 'metrics')
+        self.thread.daemon = True
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
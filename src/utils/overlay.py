@@ -0,0 +1,34 @@
+import cv2
+from utils import util
+
+def draw_results(image, results):
+    # Visualization of the results returned by main.track(), only used with --display
+    height, width = image.shape[:2]
+    half_width = width // 2
+    half_height = height // 2
+
+    if 'color' in results:
+        cv2.drawMarker(image, results['color'], (0, 255, 255), 2)
+
+    for name in ('cmt', 'tld', 'dlib'):
+        if name in results:
+            (tl, br, center) = results[name]
+            cv2.rectangle(image, tl, br, (0,165,255), 1)
+            cv2.drawMarker(image, center, (0,165,255))
+
+    if 'keypoints' in results:
+        (tracked, votes, outliers) = results['keypoints']
+        util.draw_keypoints(tracked, image, (255, 255, 255))
+        util.draw_keypoints(votes, image, (0, 255, 255))
+        util.draw_keypoints(outliers, image, (0, 0, 255))
+
+    if 'kcf' in results:
+        (tl, br, center) = results['kcf']
+        cv2.rectangle(image, tl, br, (0,255,0), 1)
+        cv2.drawMarker(image, center, (0,255,0))
+
+    if 'status' in results:
+        util.draw_str(image, (width - 120, 20), results['status'])
+
+    cv2.line(image, (half_width, 0), (half_width, width), (200, 200, 200), 0)
+    cv2.line(image, (0, half_height), (width, half_height), (200, 200, 200), 0)
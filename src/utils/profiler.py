@@ -0,0 +1,103 @@
+import time
+import json
+from threading import Lock
+
+import numpy as np
+
+class StageTimer:
+    # 'with profiler.time(stage):' block, see StageProfiler.time()
+    __slots__ = ('profiler', 'stage', 'start')
+
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.stage, time.perf_counter() - self.start)
+        return False
+
+class NullTimer:
+    # disabled profiler: nothing measured or stored
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+class StageRing:
+    # the last 'capacity' durations (seconds) of one stage, plus lifetime count, total and max
+    __slots__ = ('values', 'count', 'total', 'max')
+
+    def __init__(self, capacity):
+        self.values = [0.0] * capacity
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+class StageProfiler:
+    # Per stage latencies of the pipeline (capture, trackers, motor, display, ...) in fixed size rings,
+    # one perf_counter() pair and a list store per measurement; percentiles are only computed by summary().
+    # A stage is expected to be measured by one thread at a time (stages of different threads are independent).
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, capacity = 1024, enabled = True):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.stages = {}
+        self.lock = Lock() # new stages only
+        self.created = time.monotonic()
+
+    def time(self, stage):
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(self, stage)
+
+    def add(self, stage, seconds):
+        if not self.enabled:
+            return
+        ring = self.stages.get(stage)
+        if ring is None:
+            with self.lock:
+                ring = self.stages.setdefault(stage, StageRing(self.capacity))
+        ring.values[ring.count % self.capacity] = seconds
+        ring.count += 1
+        ring.total += seconds
+        if seconds > ring.max:
+            ring.max = seconds
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+        self.created = time.monotonic()
+
+    def summary(self):
+        # {stage: {'count', 'rate', 'mean', 'p50', 'p95', 'p99', 'max', 'total'}}, milliseconds over the last 'capacity'
+        # measurements, count/rate (per second)/max/total over the whole run
+        elapsed = max(time.monotonic() - self.created, 1e-9)
+        summary = {}
+        for (stage, ring) in list(self.stages.items()):
+            count = ring.count
+            if count == 0:
+                continue
+            values = 1000 * np.array(ring.values[:min(count, self.capacity)])
+            stats = {'p{}'.format(p): float(v) for (p, v) in zip(self.PERCENTILES, np.percentile(values, self.PERCENTILES))}
+            stats.update({'count': count, 'rate': count / elapsed, 'mean': float(values.mean()), 'max': 1000 * ring.max, 'total': 1000 * ring.total})
+            summary[stage] = stats
+        return summary
+
+    def report(self):
+        lines = ["{:<20} {:>8} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8}".format('stage', 'count', 'rate', 'mean', 'p50', 'p95', 'p99', 'max')]
+        for (stage, stats) in sorted(self.summary().items()):
+            lines.append("{:<20} {:>8} {:>7.1f} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f}".format(stage, stats['count'], stats['rate'],
+                stats['mean'], stats['p50'], stats['p95'], stats['p99'], stats['max']))
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent = 2, sort_keys = True)
@@ -57,8 +57,8 @@ def out_of_rect(keypoints, tl, br):
 
     return result
 
-def keypoints_cv_to_np(keypoints_cv):
-    keypoints = np.array([k.pt for k in keypoints_cv])
+def keypoints_cv_to_np(keypoints_cv, dtype=np.float64):
+    keypoints = np.array([k.pt for k in keypoints_cv], dtype=dtype)
     return keypoints
 
 def squeeze_pts(X):
@@ -0,0 +1,5 @@
+from .video_stream import VideoStream
+from .frame_pool import FramePool
+from .simulated_camera import SimulatedCamera, SimulatedTarget
+from .session import SessionRecorder, SessionPlayer
+from .synthetic import SyntheticScene, SyntheticTarget, SyntheticOccluder, SyntheticSequence
@@ -0,0 +1,33 @@
+import numpy as np
+from collections import deque
+
+class FramePool:
+    # keep + 2 preallocated frames used round-robin by a single producer and a single reader.
+    # acquire() never returns the published frame nor one of the last 'keep' frames handed
+    # to the reader by take(), so those stay valid without copying (current/previous frame).
+    def __init__(self, shape, keep = 2, dtype = np.uint8):
+        self.frames = [np.empty(shape, dtype=dtype) for _ in range(keep + 2)]
+        self.shape = tuple(shape)
+        self.latest = None # published, not taken yet
+        self.held = deque(maxlen=keep) # taken, most recent last
+        self.next_index = 0
+
+    def acquire(self):
+        for _ in range(len(self.frames)):
+            index = self.next_index
+            self.next_index = (index + 1) % len(self.frames)
+            if index != self.latest and index not in self.held:
+                return index
+        raise RuntimeError('No free frame in the pool')
+
+    def publish(self, index):
+        # returns True if the previously published frame was never taken
+        dropped = self.latest is not None
+        self.latest = index
+        return dropped
+
+    def take(self):
+        index = self.latest
+        self.latest = None
+        self.held.append(index)
+        return self.frames[index]
@@ -0,0 +1,144 @@
+import cv2
+import os
+import json
+import time
+import numpy as np
+from threading import Lock
+
+from pipeline import BoundedQueue, Stage
+
+# A recorded session is a directory:
+#   session.json  - start time and the command line options of the recording
+#   frames/       - one JPEG per tracked frame, 000000.jpg, 000001.jpg, ...
+#   events.jsonl  - one JSON object per line, in order:
+#       {"type": "frame", "frame": 12, "t": 0.4, "timestamp": 123.4}      capture time (time.monotonic())
+#       {"type": "select", "frame": 12, "t": ..., "x1": .., "y1": .., "x2": .., "y2": ..}
+#       {"type": "key", "frame": 12, "t": ..., "key": 102}
+#       {"type": "motor", "frame": 12, "t": ..., "command": ["track", -12, 3, 1]}
+# 'frame' is the index of the frame being (or about to be) tracked when the event happened, so that replaying
+# the events before tracking that frame gives the same sequence of inputs whatever the speed of the replay.
+
+FRAME_NAME = '{:06d}.jpg'
+
+class SessionRecorder:
+    # JPEG encoding and file writes run on a 'record' stage; frames are copied (the stream reuses its buffers)
+    # and the queue blocks when the disk falls behind, no frame of the session is lost.
+    def __init__(self, path, options = None, quality = 90, queue_size = 64):
+        self.path = path
+        os.makedirs(os.path.join(path, 'frames'), exist_ok = True)
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.start = time.monotonic()
+        self.frame_index = 0 # index of the next frame
+        self.events = open(os.path.join(path, 'events.jsonl'), 'w')
+        self.lock = Lock() # motor commands come from the control stage
+
+        with open(os.path.join(path, 'session.json'), 'w') as f:
+            json.dump({'start': time.time(), 'options': options or {}}, f, indent = 2, sort_keys = True)
+
+        self.queue = BoundedQueue(maxsize = queue_size, policy = 'block')
+        self.stage = Stage('record', self.write, self.queue).start()
+
+    def write(self, item):
+        (index, frame) = item
+        cv2.imwrite(os.path.join(self.path, 'frames', FRAME_NAME.format(index)), frame, self.params)
+
+    def event(self, kind, **data):
+        with self.lock:
+            data.update({'type': kind, 'frame': self.frame_index, 't': round(time.monotonic() - self.start, 6)})
+            self.events.write(json.dumps(data, sort_keys = True) + '\n')
+
+    def frame(self, frame, timestamp):
+        # after tracking it: the events of the frame (selection) are recorded with its index
+        self.event('frame', timestamp = timestamp)
+        self.queue.put((self.frame_index, frame.copy()))
+        with self.lock:
+            self.frame_index += 1
+
+    def close(self):
+        self.stage.stop(timeout = None) # all queued frames are written
+        self.events.close()
+
+class SessionPlayer:
+    # cv2.VideoCapture look-alike for VideoStream (use drop_frames = False: every frame in order), plus the
+    # recorded events by frame index.
+    # realtime: frames are paced as recorded, otherwise as fast as they are consumed. The simulated motor and zoom
+    # run on time.monotonic() deadlines, so only a realtime replay reproduces the decisions gated on them
+    # (motor.is_moving, zoom.is_zooming, stale motor commands); the frame level inputs are the same either way.
+    def __init__(self, path, realtime = True):
+        self.path = path
+        self.realtime = realtime
+        with open(os.path.join(path, 'session.json')) as f:
+            self.session = json.load(f)
+
+        self.events = {} # frame index -> [event, ...] except the frames themselves
+        self.frame_times = []
+        self.motor_commands = 0
+        with open(os.path.join(path, 'events.jsonl')) as f:
+            for line in f:
+                event = json.loads(line)
+                if event['type'] == 'frame':
+                    self.frame_times.append(event['t'])
+                    continue
+                if event['type'] == 'motor':
+                    self.motor_commands += 1
+                self.events.setdefault(event['frame'], []).append(event)
+
+        self.index = 0
+        self.start = None
+        first = self.load(0)
+        (self.height, self.width) = first.shape[:2] if first is not None else (0, 0)
+
+    @property
+    def options(self):
+        return self.session.get('options', {})
+
+    def __len__(self):
+        return len(self.frame_times)
+
+    def events_for(self, index, kinds = ('select', 'key')):
+        return [event for event in self.events.get(index, []) if event['type'] in kinds]
+
+    def load(self, index, image = None):
+        if index >= len(self.frame_times):
+            return None
+        frame = cv2.imread(os.path.join(self.path, 'frames', FRAME_NAME.format(index)))
+        if frame is None:
+            return None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return image
+        return frame
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        elif prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.frame_times)
+        return 0
+
+    def read(self, image = None):
+        frame = self.load(self.index, image)
+        if frame is None:
+            return False, None
+
+        if self.realtime:
+            now = time.monotonic()
+            if self.start is None:
+                self.start = now - self.frame_times[self.index]
+            delay = self.start + self.frame_times[self.index] - now
+            if delay > 0:
+                time.sleep(delay)
+
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
@@ -0,0 +1,126 @@
+import cv2
+import time
+import numpy as np
+
+class SimulatedTarget:
+    # red box (world degrees) bouncing around inside +-limit, striped so that KCF/CMT have texture
+    def __init__(self, x = 0.0, y = 0.0, vx = 4.0, vy = 1.5, size = (3.0, 4.0), limit = (40.0, 15.0), color = (0, 0, 255)):
+        self.x0 = x
+        self.y0 = y
+        self.vx = vx
+        self.vy = vy
+        self.size = size
+        self.limit = limit
+        self.color = color
+
+    def position(self, t):
+        return (self.bounce(self.x0 + self.vx * t, self.limit[0]), self.bounce(self.y0 + self.vy * t, self.limit[1]))
+
+    @staticmethod
+    def bounce(value, limit):
+        period = 4 * limit
+        value = (value + limit) % period
+        return value - limit if value < 2 * limit else 3 * limit - value
+
+class SimulatedCamera:
+    # cv2.VideoCapture look-alike for VideoStream: renders what a camera on the PTZSimulator sees.
+    # The background is a fixed panorama in world degrees (x to the right, y down), the view
+    # center is at (-pan, tilt) as a positive pan pulse turns the camera to the left (see Motor.track).
+    # The ground truth of the targets in the last frame is in 'truth': [(x1, y1, x2, y2), ...] in pixels.
+    PANORAMA_SIZE = (200, 100) # degrees
+    PANORAMA_RESOLUTION = 16 # pixels per degree
+
+    def __init__(self, simulator, width = 640, height = None, fps = 30, targets = None, seed = 0):
+        self.simulator = simulator
+        self.width = width
+        self.height = height if height else width * 9 // 16
+        self.interval = 1.0 / fps
+        self.targets = targets if targets is not None else [SimulatedTarget()]
+        self.panorama = self.make_panorama(seed)
+        self.grab_buffer = np.empty((self.height, self.width, 3), dtype = np.uint8)
+        self.truth = []
+        self.errors = [] # degrees from the view center to the first target, per frame
+        self.start_time = None
+        self.next_time = None
+
+    def make_panorama(self, seed):
+        rng = np.random.RandomState(seed)
+        w = self.PANORAMA_SIZE[0] * self.PANORAMA_RESOLUTION
+        h = self.PANORAMA_SIZE[1] * self.PANORAMA_RESOLUTION
+        noise = rng.randint(40, 200, (h // 32, w // 32, 3)).astype(np.uint8)
+        panorama = cv2.resize(noise, (w, h), interpolation = cv2.INTER_CUBIC)
+        panorama[:, :, 2] //= 2 # keep the background out of the red hue band
+        for _ in range(200): # corners for the keypoint trackers
+            (x, y) = (rng.randint(0, w), rng.randint(0, h))
+            cv2.rectangle(panorama, (x, y), (x + rng.randint(8, 64), y + rng.randint(8, 64)), tuple(int(c) for c in rng.randint(0, 160, 3)), -1)
+        return panorama
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        elif prop == cv2.CAP_PROP_FPS:
+            return 1.0 / self.interval
+        return 0
+
+    def grab(self):
+        return self.read(self.grab_buffer)[0]
+
+    def read(self, image = None):
+        # paced like a real camera: one frame every 'interval'
+        now = time.monotonic()
+        if self.next_time is None:
+            self.start_time = self.next_time = now
+        elif now < self.next_time:
+            time.sleep(self.next_time - now)
+            now = self.next_time
+        self.next_time = max(self.next_time + self.interval, now)
+
+        if image is None:
+            image = np.empty((self.height, self.width, 3), dtype = np.uint8)
+        self.render(image, now)
+        self.simulator.last_frame_time = now
+        return True, image
+
+    def render(self, image, now):
+        (pan, tilt, zoom) = self.simulator.pose(now)
+        (fov_x, _) = self.simulator.fov(zoom)
+        ppd = self.width / fov_x # pixels per degree in the view
+        (cx, cy) = (-pan, tilt)
+
+        # view pixel -> panorama pixel
+        scale = self.PANORAMA_RESOLUTION / ppd
+        tx = self.PANORAMA_RESOLUTION * (cx - self.width / 2.0 / ppd + self.PANORAMA_SIZE[0] / 2.0)
+        ty = self.PANORAMA_RESOLUTION * (cy - self.height / 2.0 / ppd + self.PANORAMA_SIZE[1] / 2.0)
+        M = np.array([[scale, 0, tx], [0, scale, ty]], dtype = np.float64)
+        cv2.warpAffine(self.panorama, M, (self.width, self.height), dst = image,
+            flags = cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode = cv2.BORDER_REFLECT)
+
+        self.truth = []
+        t = now - self.start_time
+        for i, target in enumerate(self.targets):
+            (x, y) = target.position(t)
+            if i == 0:
+                self.errors.append(np.hypot(x - cx, y - cy))
+
+            u = self.width / 2.0 + (x - cx) * ppd
+            v = self.height / 2.0 + (y - cy) * ppd
+            half_w = target.size[0] * ppd / 2
+            half_h = target.size[1] * ppd / 2
+            (x1, y1, x2, y2) = (int(u - half_w), int(v - half_h), int(u + half_w), int(v + half_h))
+            self.truth.append((x1, y1, x2, y2))
+
+            cv2.rectangle(image, (x1, y1), (x2, y2), target.color, -1)
+            stripe = max(int((y2 - y1) / 5), 1)
+            for y in range(y1 + stripe, y2 - stripe, 2 * stripe):
+                cv2.rectangle(image, (x1 + stripe, y), (x2 - stripe, y + stripe // 2), (0, 0, 160), -1)
+
+    def release(self):
+        pass
@@ -0,0 +1,258 @@
+import cv2
+import numpy as np
+
+from video.simulated_camera import SimulatedTarget
+
+# Deterministic synthetic footage with exact ground truth, for benchmarks at any resolution without files.
+# The scene is in world degrees as SimulatedCamera (x to the right, y down), seen through a fixed field of view
+# 'fov' (horizontal degrees) so that the same scene rendered 640, 1280 or 1920 pixels wide is the same footage
+# scaled. Frame 'index' is at t = index / fps: rendering is a pure function of the index.
+
+TEXTURES = ('stripes', 'checker', 'noise')
+
+class SyntheticTarget(SimulatedTarget):
+    # SimulatedTarget (bouncing box) with a scale change and a texture.
+    # growth: the size oscillates between (1 - growth) and (1 + growth) times 'size', over 'period' seconds
+    # texture: 'stripes' (darker stripes of the color, in the same ColorTracker range for red/yellow),
+    #          'checker' or 'noise' (random pattern with the color as mean, for KCF/CMT)
+    def __init__(self, x = 0.0, y = 0.0, vx = 4.0, vy = 1.5, size = (3.0, 4.0), limit = (40.0, 15.0), color = (0, 0, 255),
+            growth = 0.0, period = 8.0, texture = 'stripes', seed = 0):
+        SimulatedTarget.__init__(self, x, y, vx, vy, size, limit, color)
+        if texture not in TEXTURES:
+            raise ValueError("Unknown texture '{}', one of {}".format(texture, ", ".join(TEXTURES)))
+        self.growth = growth
+        self.period = period
+        self.texture = texture
+        self.seed = seed
+
+    def scale(self, t):
+        return 1.0 + self.growth * np.sin(2 * np.pi * t / self.period)
+
+    def box(self, t):
+        # (x1, y1, x2, y2) in world degrees
+        (x, y) = self.position(t)
+        scale = self.scale(t)
+        (half_w, half_h) = (self.size[0] * scale / 2, self.size[1] * scale / 2)
+        return (x - half_w, y - half_h, x + half_w, y + half_h)
+
+    def make_texture(self, ppd):
+        # at the largest size, resized down to the box each frame
+        w = max(int(np.ceil(self.size[0] * (1 + abs(self.growth)) * ppd)), 2)
+        h = max(int(np.ceil(self.size[1] * (1 + abs(self.growth)) * ppd)), 2)
+        color = np.array(self.color, dtype = np.float32)
+        texture = np.empty((h, w, 3), dtype = np.uint8)
+        texture[:] = self.color
+
+        if self.texture == 'stripes':
+            stripe = max(h // 10, 1)
+            for y in range(2 * stripe, h - 2 * stripe, 4 * stripe):
+                texture[y:y + stripe, 2 * stripe:w - 2 * stripe] = (0.63 * color).astype(np.uint8)
+        elif self.texture == 'checker':
+            cell = max(min(w, h) // 4, 1)
+            (ys, xs) = np.mgrid[0:h, 0:w]
+            texture[((xs // cell + ys // cell) % 2) == 1] = (0.5 * color).astype(np.uint8)
+        else:
+            rng = np.random.RandomState(self.seed)
+            noise = rng.uniform(0.4, 1.2, (max(h // 6, 2), max(w // 6, 2), 1)).astype(np.float32)
+            noise = cv2.resize(noise, (w, h), interpolation = cv2.INTER_CUBIC)[:, :, None]
+            texture[:] = np.clip(noise * np.maximum(color, 40), 0, 255).astype(np.uint8)
+        return texture
+
+class SyntheticOccluder(SimulatedTarget):
+    # gray box drawn over the targets, out of the ColorTracker hues
+    def __init__(self, x = 0.0, y = 0.0, vx = 6.0, vy = 0.0, size = (6.0, 12.0), limit = (40.0, 15.0), color = (110, 110, 110)):
+        SimulatedTarget.__init__(self, x, y, vx, vy, size, limit, color)
+
+    def box(self, t):
+        (x, y) = self.position(t)
+        return (x - self.size[0] / 2, y - self.size[1] / 2, x + self.size[0] / 2, y + self.size[1] / 2)
+
+class SyntheticScene:
+    # Textured background, targets (drawn in order, a later one hides an earlier one) and occluders (over all the
+    # targets), seen by a camera panning at 'pan' degrees/second, bouncing inside +-pan_limit.
+    # truth(index): per target (x1, y1, x2, y2) in pixels clipped to the frame, or None when less than
+    # MIN_VISIBLE of the target is in the frame and not hidden (absent, as in OTB/VOT ground truth).
+    MIN_VISIBLE = 0.3
+    MARGIN = 4 # degrees of background around the panned view
+
+    def __init__(self, width = 640, height = None, fps = 30, fov = 60.0, targets = None, occluders = None,
+            pan = (0.0, 0.0), pan_limit = (20.0, 8.0), seed = 0):
+        self.width = width
+        self.height = height if height else width * 9 // 16
+        self.fps = fps
+        self.ppd = width / fov # pixels per degree
+        self.targets = targets if targets is not None else [SyntheticTarget()]
+        self.occluders = occluders if occluders is not None else []
+        self.pan = pan
+        self.pan_limit = pan_limit
+        self.textures = [target.make_texture(self.ppd) for target in self.targets]
+
+        # background from -extent to +extent degrees, at the view resolution: rendering is a translation
+        view = (self.width / self.ppd / 2, self.height / self.ppd / 2)
+        self.extent = (view[0] + abs(pan_limit[0]) + self.MARGIN, view[1] + abs(pan_limit[1]) + self.MARGIN)
+        self.background = self.make_background(seed)
+
+    def make_background(self, seed):
+        # blurred noise and rectangles (corners and HOG texture), red halved to stay out of the red hue band
+        rng = np.random.RandomState(seed)
+        (w, h) = (int(2 * self.extent[0] * self.ppd), int(2 * self.extent[1] * self.ppd))
+        cell = max(int(2 * self.ppd), 1) # noise cells and rectangles in degrees, the same footage at any width
+        noise = rng.randint(40, 200, (max(h // cell, 2), max(w // cell, 2), 3)).astype(np.uint8)
+        background = cv2.resize(noise, (w, h), interpolation = cv2.INTER_CUBIC)
+        for _ in range(int(4 * self.extent[0] * self.extent[1] / 8)):
+            (x, y) = (rng.uniform(0, w), rng.uniform(0, h))
+            (rw, rh) = rng.uniform(0.5, 4.0, 2) * self.ppd
+            color = tuple(int(c) for c in rng.randint(0, 160, 3))
+            cv2.rectangle(background, (int(x), int(y)), (int(x + rw), int(y + rh)), color, -1)
+        background[:, :, 2] //= 2
+        return background
+
+    def time(self, index):
+        return index / float(self.fps)
+
+    def view(self, t):
+        # view center in world degrees
+        return (SimulatedTarget.bounce(self.pan[0] * t, self.pan_limit[0]) if self.pan_limit[0] > 0 else 0.0,
+            SimulatedTarget.bounce(self.pan[1] * t, self.pan_limit[1]) if self.pan_limit[1] > 0 else 0.0)
+
+    def to_pixels(self, box, center):
+        (cx, cy) = center
+        (x1, y1, x2, y2) = box
+        return (self.width / 2.0 + (x1 - cx) * self.ppd, self.height / 2.0 + (y1 - cy) * self.ppd,
+            self.width / 2.0 + (x2 - cx) * self.ppd, self.height / 2.0 + (y2 - cy) * self.ppd)
+
+    def layout(self, index):
+        # pixel boxes (floats) of the targets and occluders of frame 'index'
+        t = self.time(index)
+        center = self.view(t)
+        targets = [self.to_pixels(target.box(t), center) for target in self.targets]
+        occluders = [self.to_pixels(occluder.box(t), center) for occluder in self.occluders]
+        return center, targets, occluders
+
+    def truth(self, index):
+        (_, targets, occluders) = self.layout(index)
+        boxes = []
+        for (i, box) in enumerate(targets):
+            (x1, y1, x2, y2) = [int(round(v)) for v in box]
+            (w, h) = (x2 - x1, y2 - y1)
+            if w <= 0 or h <= 0:
+                boxes.append(None)
+                continue
+
+            # visible pixels of the target box: in the frame, not under a later target or an occluder
+            visible = np.zeros((h, w), dtype = np.uint8)
+            visible[max(-y1, 0):min(self.height - y1, h), max(-x1, 0):min(self.width - x1, w)] = 1
+            for (ox1, oy1, ox2, oy2) in targets[i + 1:] + occluders:
+                (ox1, oy1, ox2, oy2) = (int(round(ox1)) - x1, int(round(oy1)) - y1, int(round(ox2)) - x1, int(round(oy2)) - y1)
+                visible[max(oy1, 0):max(oy2, 0), max(ox1, 0):max(ox2, 0)] = 0
+            if visible.sum() < self.MIN_VISIBLE * w * h:
+                boxes.append(None)
+                continue
+            boxes.append((max(x1, 0), max(y1, 0), min(x2, self.width), min(y2, self.height)))
+        return boxes
+
+    def render(self, index, image = None):
+        if image is None:
+            image = np.empty((self.height, self.width, 3), dtype = np.uint8)
+        (center, targets, occluders) = self.layout(index)
+
+        # sub-pixel pan: background pixel = view pixel + offset
+        tx = (center[0] + self.extent[0]) * self.ppd - self.width / 2.0
+        ty = (center[1] + self.extent[1]) * self.ppd - self.height / 2.0
+        M = np.array([[1, 0, tx], [0, 1, ty]], dtype = np.float64)
+        cv2.warpAffine(self.background, M, (self.width, self.height), dst = image,
+            flags = cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode = cv2.BORDER_REFLECT)
+
+        for (texture, box) in zip(self.textures, targets):
+            self.paste(image, texture, box)
+        for (occluder, box) in zip(self.occluders, occluders):
+            (x1, y1, x2, y2) = [int(round(v)) for v in box]
+            cv2.rectangle(image, (x1, y1), (x2 - 1, y2 - 1), occluder.color, -1)
+        return image
+
+    def paste(self, image, texture, box):
+        (x1, y1, x2, y2) = [int(round(v)) for v in box]
+        if x2 - x1 <= 0 or y2 - y1 <= 0:
+            return
+        (cx1, cy1, cx2, cy2) = (max(x1, 0), max(y1, 0), min(x2, self.width), min(y2, self.height))
+        if cx2 <= cx1 or cy2 <= cy1:
+            return
+        patch = cv2.resize(texture, (x2 - x1, y2 - y1), interpolation = cv2.INTER_AREA)
+        image[cy1:cy2, cx1:cx2] = patch[cy1 - y1:cy2 - y1, cx1 - x1:cx2 - x1]
+
+    def frames(self, count, start = 0):
+        # (frame, truth) for frames start .. start + count - 1, a new image each (trackers may keep them)
+        for index in range(start, start + count):
+            yield self.render(index), self.truth(index)
+
+class SyntheticSequence:
+    # bench.Sequence look-alike (name, boxes, frames()) rendering 'scene' on the fly, the ground truth of target 'target'
+    def __init__(self, name, scene, length, target = 0):
+        self.name = name
+        self.scene = scene
+        self.source = None
+        self.target = target
+        self.boxes = [scene.truth(index)[target] for index in range(length)]
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def frames(self):
+        for index in range(len(self.boxes)):
+            yield self.scene.render(index)
+
+# Scenes of the benchmark, (width, seed) -> SyntheticScene; the last target is the tracked one (drawn on top).
+# Red and yellow targets are in the ColorTracker ranges, distractors of the crowd are not.
+
+def red_scene(width, seed):
+    return SyntheticScene(width, targets = [SyntheticTarget(vx = 3.0, vy = 1.0, limit = (20.0, 8.0), seed = seed)], seed = seed)
+
+def yellow_scene(width, seed):
+    return SyntheticScene(width, targets = [SyntheticTarget(vx = 3.0, vy = -1.5, limit = (20.0, 8.0), color = (0, 255, 255),
+        texture = 'checker', seed = seed)], seed = seed)
+
+def fast_scene(width, seed):
+    return SyntheticScene(width, targets = [SyntheticTarget(vx = 15.0, vy = 6.0, limit = (20.0, 8.0), texture = 'noise', seed = seed)], seed = seed)
+
+def scale_scene(width, seed):
+    return SyntheticScene(width, targets = [SyntheticTarget(vx = 2.0, vy = 0.5, limit = (20.0, 8.0), growth = 0.5, period = 6.0,
+        texture = 'noise', seed = seed)], seed = seed)
+
+def occlusion_scene(width, seed):
+    return SyntheticScene(width, targets = [SyntheticTarget(vx = 2.0, vy = 0.0, limit = (20.0, 8.0), seed = seed)],
+        occluders = [SyntheticOccluder(x = 15.0, vx = -5.0, limit = (20.0, 8.0))], seed = seed)
+
+def pan_scene(width, seed):
+    # the camera follows the target from afar: background and target both move in the image
+    return SyntheticScene(width, targets = [SyntheticTarget(vx = 4.0, vy = 1.0, limit = (25.0, 10.0), texture = 'noise', seed = seed)],
+        pan = (6.0, 2.0), pan_limit = (15.0, 5.0), seed = seed)
+
+def crowd_scene(width, seed, count = 12):
+    rng = np.random.RandomState(seed)
+    targets = []
+    for i in range(count - 1):
+        color = tuple(int(c) for c in (rng.randint(100, 256), rng.randint(60, 256), rng.randint(0, 60))) # blues, greens, cyans
+        targets.append(SyntheticTarget(x = rng.uniform(-20, 20), y = rng.uniform(-8, 8), vx = rng.uniform(-6, 6), vy = rng.uniform(-3, 3),
+            size = tuple(rng.uniform(2.0, 5.0, 2)), limit = (20.0, 8.0), color = color, growth = rng.uniform(0, 0.3),
+            texture = TEXTURES[i % len(TEXTURES)], seed = seed + i + 1))
+    targets.append(SyntheticTarget(vx = 3.0, vy = 1.0, limit = (20.0, 8.0), seed = seed))
+    return SyntheticScene(width, targets = targets, seed = seed)
+
+SCENES = {
+    'red': red_scene,
+    'yellow': yellow_scene,
+    'fast': fast_scene,
+    'scale': scale_scene,
+    'occlusion': occlusion_scene,
+    'pan': pan_scene,
+    'crowd': crowd_scene,
+}
+
+def synthetic_sequences(widths = (640, 1280, 1920), length = 300, scenes = None, seed = 0):
+    # one SyntheticSequence per scene and width, named '<scene>@<width>'
+    sequences = []
+    for name in (scenes if scenes else sorted(SCENES)):
+        for width in widths:
+            scene = SCENES[name](width, seed)
+            sequences.append(SyntheticSequence('{}@{}'.format(name, width), scene, length, target = len(scene.targets) - 1))
+    return sequences
@@ -0,0 +1,121 @@
+import cv2
+import time
+from threading import Thread, Condition
+
+from video.frame_pool import FramePool
+
+class VideoStream:
+    # cv2.VideoCapture read on its own thread, same start()/read()/stop() as imutils.video.WebcamVideoStream.
+    # Only the newest decoded frame is kept: a frame that was never read is counted in 'dropped'.
+    # With drop_frames = False (video files) the capture thread waits for the reader instead.
+    #
+    # Frames are decoded and resized into a FramePool, nothing is allocated per frame.
+    # A frame returned by read() stays valid for the next 'keep' - 1 reads (keep = 2: current and previous).
+    # 'src' may also be an already opened capture object with the same read()/set()/release(), e.g. SimulatedCamera.
+    # profiler: StageProfiler, gets the 'capture' (decode) and 'resize' times.
+    def __init__(self, src = 0, width = 640, height = None, drop_frames = True, keep = 2, profiler = None):
+        self.stream = src if hasattr(src, 'read') else cv2.VideoCapture(src)
+        self.width = width
+        self.height = height if height else width * 9 // 16
+        self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+        self.drop_frames = drop_frames
+        self.keep = keep
+        self.pool = None # allocated once the source frame size is known
+        self.frame = None
+        self.frame_timestamp = 0 # capture time (time.monotonic()) of the frame returned by read()
+        self.timestamp = 0
+        self.captured = 0 # number of frames decoded
+        self.consumed = 0 # index of the last frame handed out by read()
+        self.dropped = 0
+        self.stopped = False
+        self.condition = Condition()
+        self.profiler = profiler
+
+    def start(self):
+        thread = Thread(target = self.update, name = 'VideoStream')
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def update(self):
+        raw = None # decode buffer when the source has to be resized
+        resize = True
+
+        while True:
+            if self.drop_frames is False:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.stopped or self.consumed == self.captured)
+
+            if self.stopped:
+                break
+
+            if self.pool is None:
+                grabbed, raw = self.stream.read()
+                if grabbed is not True:
+                    break
+
+                (h, w) = raw.shape[:2]
+                resize = w != self.width
+                size = (self.width, int(h * self.width / float(w))) # same as imutils.resize
+                self.pool = FramePool((size[1], size[0]) + raw.shape[2:], keep = self.keep, dtype = raw.dtype)
+
+                index = self.pool.acquire()
+                frame = self.pool.frames[index]
+                if resize:
+                    cv2.resize(raw, size, dst = frame, interpolation = cv2.INTER_AREA)
+                else:
+                    frame[...] = raw
+            else:
+                with self.condition:
+                    index = self.pool.acquire()
+                frame = self.pool.frames[index]
+
+                start = time.perf_counter()
+                if resize:
+                    grabbed, raw = self.stream.read(raw)
+                    if grabbed is not True:
+                        break
+                    decoded = time.perf_counter()
+                    cv2.resize(raw, size, dst = frame, interpolation = cv2.INTER_AREA)
+                else:
+                    grabbed, _ = self.stream.read(frame) # decode straight into the pool
+                    if grabbed is not True:
+                        break
+                    decoded = time.perf_counter()
+                if self.profiler:
+                    self.profiler.add('capture', decoded - start)
+                    if resize:
+                        self.profiler.add('resize', time.perf_counter() - decoded)
+            timestamp = time.monotonic()
+
+            with self.condition:
+                if self.pool.publish(index):
+                    self.dropped += 1
+                self.timestamp = timestamp
+                self.captured += 1
+                self.condition.notify_all()
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.stream.release()
+
+    def read(self, timeout = None):
+        # newest frame not returned yet, (False, None) once the stream has ended
+        with self.condition:
+            self.condition.wait_for(lambda: self.stopped or self.consumed < self.captured, timeout)
+            if self.consumed == self.captured:
+                return False, None
+
+            self.consumed = self.captured
+            self.frame = self.pool.take()
+            self.frame_timestamp = self.timestamp
+            self.condition.notify_all()
+            return True, self.frame
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()